@@ -5,47 +5,112 @@ from itertools import batched
 
 from beartype import beartype
 from temporalio import activity
+from xxhash import xxh3_64_hexdigest as xxhash_key
 
 from ..clients import cozo, litellm
 from ..common.storage_handler import auto_blob_store
-from ..env import testing
+from ..common.utils.embedding_batcher import EmbeddingBatcher
+from ..env import (
+    embedding_batch_max_wait,
+    embedding_batch_size,
+    embedding_dimensions,
+    embedding_model_id,
+    testing,
+)
 from ..models.docs.embed_snippets import embed_snippets as embed_snippets_query
+from ..models.docs.get_snippet_embeddings import (
+    get_snippet_embeddings as get_snippet_embeddings_query,
+)
 from .types import EmbedDocsPayload
 
 
+async def _embed(texts: list[str]) -> list[list[float]]:
+    return await litellm.aembedding(inputs=texts)
+
+
+# Shared by all the embed_docs activities running in this worker
+embedding_batcher = EmbeddingBatcher(
+    _embed, max_batch_size=embedding_batch_size, max_wait=embedding_batch_max_wait
+)
+
+
+def snippet_fingerprint(text: str) -> str:
+    """Fingerprint of the exact text embedded for a snippet (title and instruction included)."""
+    return xxhash_key(f"{embedding_model_id}:{embedding_dimensions}:{text}".encode())
+
+
 @auto_blob_store
 @beartype
 async def embed_docs(
     payload: EmbedDocsPayload, cozo_client=None, max_batch_size: int = 100
 ) -> None:
+    cozo_client = cozo_client or cozo.get_async_cozo_client()
     indices, snippets = list(zip(*enumerate(payload.content)))
-    batched_snippets = batched(snippets, max_batch_size)
     embed_instruction: str = payload.embed_instruction or ""
     title: str = payload.title or ""
 
-    async def embed_batch(snippets):
-        return await litellm.aembedding(
-            inputs=[
-                (
-                    embed_instruction + (title + "\n\n" + snippet) if title else snippet
-                ).strip()
-                for snippet in snippets
-            ]
+    texts = [
+        (embed_instruction + (title + "\n\n" + snippet) if title else snippet).strip()
+        for snippet in snippets
+    ]
+    fingerprints = [snippet_fingerprint(text) for text in texts]
+
+    # Snippets whose exact text was embedded before reuse that embedding
+    embeddings_by_fingerprint = {
+        row["fingerprint"]: row["embedding"]
+        for row in await get_snippet_embeddings_query(
+            developer_id=payload.developer_id,
+            fingerprints=sorted(set(fingerprints)),
+            client=cozo_client,
         )
+    }
 
-    embeddings = reduce(
-        operator.add,
-        await asyncio.gather(*[embed_batch(snippets) for snippets in batched_snippets]),
-    )
+    texts_to_embed = {
+        fingerprint: text
+        for fingerprint, text in zip(fingerprints, texts)
+        if fingerprint not in embeddings_by_fingerprint
+    }
+
+    async def embed_batch(texts):
+        return await embedding_batcher.embed(texts)
+
+    if texts_to_embed:
+        embeddings = reduce(
+            operator.add,
+            await asyncio.gather(
+                *[
+                    embed_batch(texts)
+                    for texts in batched(texts_to_embed.values(), max_batch_size)
+                ]
+            ),
+        )
 
-    embed_snippets_query(
+        embeddings_by_fingerprint.update(zip(texts_to_embed, embeddings))
+
+    await embed_snippets_query(
         developer_id=payload.developer_id,
         doc_id=payload.doc_id,
         snippet_indices=indices,
-        embeddings=embeddings,
-        client=cozo_client or cozo.get_cozo_client(),
+        embeddings=[
+            embeddings_by_fingerprint[fingerprint] for fingerprint in fingerprints
+        ],
+        fingerprints=fingerprints,
+        client=cozo_client,
+    )
+
+
+@auto_blob_store
+@beartype
+async def embed_docs_batch(payloads: list[EmbedDocsPayload], cozo_client=None) -> int:
+    """Embeds a chunk of docs concurrently, so that their snippets share batches."""
+    cozo_client = cozo_client or cozo.get_async_cozo_client()
+
+    await asyncio.gather(
+        *[embed_docs(payload, cozo_client=cozo_client) for payload in payloads]
     )
 
+    return len(payloads)
+
 
 async def mock_embed_docs(
     payload: EmbedDocsPayload, cozo_client=None, max_batch_size=100
@@ -57,3 +122,15 @@ async def mock_embed_docs(
 embed_docs = activity.defn(name="embed_docs")(
     embed_docs if not testing else mock_embed_docs
 )
+
+
+async def mock_embed_docs_batch(
+    payloads: list[EmbedDocsPayload], cozo_client=None
+) -> int:
+    # Does nothing
+    return len(payloads)
+
+
+embed_docs_batch = activity.defn(name="embed_docs_batch")(
+    embed_docs_batch if not testing else mock_embed_docs_batch
+)
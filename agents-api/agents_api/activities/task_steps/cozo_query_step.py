@@ -1,3 +1,4 @@
+import inspect
 from typing import Any
 
 from beartype import beartype
@@ -18,7 +19,13 @@ async def cozo_query_step(
 
     module = getattr(models, module_name)
     query = getattr(module, name)
-    return query(**values)
+    result = query(**values)
+
+    # Some model functions have been migrated to the async Cozo client
+    if inspect.isawaitable(result):
+        result = await result
+
+    return result
 
 
 # Note: This is here just for clarity. We could have just imported cozo_query_step directly
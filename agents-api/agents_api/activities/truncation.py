@@ -4,57 +4,53 @@ from beartype import beartype
 from temporalio import activity
 
 from ..autogen.openapi_model import Entry
-
-# from agents_api.models.entry.entries_summarization import get_toplevel_entries_query
-
-# TODO: Reimplement truncation queries
-# SCRUM-5
+from ..models.entry.delete_entries import delete_entries
+from ..models.entry.get_history import get_history
 
 
 def get_extra_entries(messages: list[Entry], token_count_threshold: int) -> list[UUID]:
-    raise NotImplementedError()
-
+    """
+    Returns the ids of the oldest entries that don't fit in `token_count_threshold`
+    tokens (as counted when they were saved), always keeping a leading system message.
+    """
     if not len(messages):
-        return messages
+        return []
+
+    token_cnt, offset = 0, 0
+    if messages[0].role == "system":
+        token_cnt, offset = messages[0].token_count, 1
 
-    _token_cnt, _offset = 0, 0
-    # if messages[0].role == Role.system:
-    #     token_cnt, offset = messages[0].token_count, 1
+    # The entries kept are the most recent ones, without gaps
+    for index in range(len(messages) - 1, offset - 1, -1):
+        token_cnt += messages[index].token_count
 
-    # for m in reversed(messages[offset:]):
-    #     token_cnt += m.token_count
-    #     if token_cnt < token_count_threshold:
-    #         continue
-    #     else:
-    #         result.append(m.id)
+        if token_cnt > token_count_threshold:
+            return [m.id for m in messages[offset : index + 1]]
 
-    # return result
+    return []
 
 
-# TODO: Reimplement truncation activities
-# SCRUM-6
 @activity.defn
 @beartype
-async def truncation(session_id: str, token_count_threshold: int) -> None:
+async def truncation(
+    developer_id: str, session_id: str, token_count_threshold: int
+) -> None:
+    developer_id = UUID(developer_id)
     session_id = UUID(session_id)
 
-    # delete_entries(
-    #     get_extra_entries(
-    #         [
-    #             Entry(
-    #                 entry_id=row["entry_id"],
-    #                 session_id=session_id,
-    #                 source=row["source"],
-    #                 role=Role(row["role"]),
-    #                 name=row["name"],
-    #                 content=row["content"],
-    #                 created_at=row["created_at"],
-    #                 timestamp=row["timestamp"],
-    #             )
-    #             for _, row in get_toplevel_entries_query(
-    #                 session_id=session_id
-    #             ).iterrows()
-    #         ],
-    #         token_count_threshold,
-    #     ),
-    # )
+    history = get_history(
+        developer_id=developer_id,
+        session_id=session_id,
+        allowed_sources=["api_request", "api_response", "tool_response", "summarizer"],
+    )
+
+    # Keep leaf nodes only, as in the chat context
+    heads = {r.head for r in history.relations}
+    entries = [entry for entry in history.entries if entry.id not in heads]
+
+    if extra_entries := get_extra_entries(entries, token_count_threshold):
+        delete_entries(
+            developer_id=developer_id,
+            session_id=session_id,
+            entry_ids=extra_entries,
+        )
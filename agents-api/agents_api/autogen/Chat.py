@@ -43,6 +43,12 @@ class BaseChatResponse(BaseModel):
     """
     Usage statistics for the completion request
     """
+    truncation: Annotated[
+        ContextTruncation | None, Field(json_schema_extra={"readOnly": True})
+    ] = None
+    """
+    How the session history was truncated, if the session truncates its context
+    """
     jobs: Annotated[list[UUID], Field(json_schema_extra={"readOnly": True})] = []
     """
     Background job IDs that may have been spawned from this interaction.
@@ -90,7 +96,7 @@ class ChatInputData(BaseModel):
     """
 
 
-class ChatOutputChunk(BaseChatOutput):
+class ChatOutputChunk(BaseModel):
     """
     Streaming chat completion output
     """
@@ -98,6 +104,17 @@ class ChatOutputChunk(BaseChatOutput):
     model_config = ConfigDict(
         populate_by_name=True,
     )
+    index: int
+    finish_reason: (
+        Literal["stop", "length", "content_filter", "tool_calls"] | None
+    ) = None
+    """
+    The reason the model stopped generating tokens, null until the last chunk of the choice
+    """
+    logprobs: LogProbResponse | None = None
+    """
+    The log probabilities of tokens
+    """
     delta: Delta
     """
     The message generated by the model
@@ -167,6 +184,30 @@ class ContentModel(BaseModel):
     """
 
 
+class ContextTruncation(BaseModel):
+    """
+    How the session history was truncated to fit the prompt in its token budget
+    """
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
+    token_budget: Annotated[int, Field(json_schema_extra={"readOnly": True})]
+    """
+    Number of tokens the prompt had to fit in
+    """
+    prompt_tokens: Annotated[int, Field(json_schema_extra={"readOnly": True})]
+    """
+    Number of tokens in the prompt sent to the model
+    """
+    truncated_entries: Annotated[
+        list[UUID], Field(json_schema_extra={"readOnly": True})
+    ] = []
+    """
+    IDs of the history entries left out of the prompt, oldest first
+    """
+
+
 class Delta(BaseModel):
     """
     The message generated by the model
@@ -199,6 +240,28 @@ class Delta(BaseModel):
     """
     Whether to continue this message or return a new one
     """
+    tool_calls: list[ToolCallDelta] | None = None
+    """
+    Fragments of the tool calls generated by the model
+    """
+
+
+class FunctionCallDelta(BaseModel):
+    """
+    Fragment of a function call generated by the model
+    """
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
+    name: str | None = None
+    """
+    The name of the function, sent with the first fragment of the call
+    """
+    arguments: str | None = None
+    """
+    The next piece of the JSON encoded arguments of the function
+    """
 
 
 class ImageUrl(BaseModel):
@@ -398,6 +461,32 @@ class TokenLogProb(BaseTokenLogProb):
     """
 
 
+class ToolCallDelta(BaseModel):
+    """
+    Fragment of a tool call generated by the model
+    """
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+    )
+    index: int
+    """
+    The index of the tool call the fragment belongs to
+    """
+    id: str | None = None
+    """
+    The ID of the tool call, sent with the first fragment of the call
+    """
+    type: Literal["function"] | None = None
+    """
+    The type of the tool call, sent with the first fragment of the call
+    """
+    function: FunctionCallDelta | None = None
+    """
+    The fragment of the function call
+    """
+
+
 class ChatInput(ChatInputData):
     model_config = ConfigDict(
         populate_by_name=True,
@@ -4,8 +4,6 @@ from typing import Annotated, Any, Generic, Literal, Self, Type, TypeVar, get_ar
 from uuid import UUID
 
 import jinja2
-from litellm.utils import _select_tokenizer as select_tokenizer
-from litellm.utils import token_counter
 from pydantic import (
     AwareDatetime,
     Field,
@@ -15,6 +13,7 @@ from pydantic import (
 )
 
 from ..common.utils.datetime import utcnow
+from ..common.utils.truncation import count_message_tokens, get_tokenizer
 from .Agents import *
 from .Chat import *
 from .Common import *
@@ -35,6 +34,8 @@ DataT = TypeVar("DataT", bound=BaseModel)
 
 class ListResponse(BaseModel, Generic[DataT]):
     items: list[DataT]
+    next_cursor: str | None = None
+    """Pass as `cursor` to fetch the next page; null on the last page"""
 
 
 # Aliases
@@ -382,9 +383,9 @@ class CreateEntryRequest(BaseEntry):
         source: ChatMLSource,
         **kwargs: dict,
     ) -> Self:
-        tokenizer: dict = select_tokenizer(model=model)
-        token_count = token_counter(
-            model=model, messages=[{"role": role, "content": content, "name": name}]
+        tokenizer: dict = get_tokenizer(model)
+        token_count = count_message_tokens(
+            model, {"role": role, "content": content, "name": name}
         )
 
         return cls(
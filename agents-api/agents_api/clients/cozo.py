@@ -1,8 +1,34 @@
-from typing import Dict
+import asyncio
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict
 
-from pycozo.client import Client
+import httpx
+import pandas as pd
+import requests
+from pycozo.client import Client, QueryException
 
-from ..env import cozo_auth, cozo_host
+from ..common.utils.limiter import AdaptiveLimiter
+from ..env import (
+    cozo_auth,
+    cozo_concurrency_initial,
+    cozo_concurrency_max,
+    cozo_concurrency_min,
+    cozo_host,
+    cozo_keepalive_expiry,
+    cozo_latency_target,
+    cozo_max_connections,
+    cozo_max_keepalive_connections,
+    cozo_query_timeout,
+    cozo_queue_size,
+    cozo_queue_timeout,
+    cozo_read_health_interval,
+    cozo_read_hosts,
+    cozo_read_your_writes_window,
+)
 from ..web import app
 
 options: Dict[str, str] = {"host": cozo_host}
@@ -10,9 +36,329 @@ if cozo_auth:
     options.update({"auth": cozo_auth})
 
 
+def is_resource_busy_error(e: Exception) -> bool:
+    return "busy" in str(getattr(e, "resp", e)).lower()
+
+
+# Shared by the sync and async clients, see `cozo_query` / `cozo_query_async`
+limiter = AdaptiveLimiter(
+    "cozo",
+    initial_limit=cozo_concurrency_initial,
+    min_limit=cozo_concurrency_min,
+    max_limit=cozo_concurrency_max,
+    max_queue=cozo_queue_size,
+    timeout=cozo_queue_timeout,
+    latency_target=cozo_latency_target,
+    is_overload=is_resource_busy_error,
+)
+
+
+class AsyncClient:
+    """
+    Non-blocking Cozo client that talks to the `/text-query` endpoint over a
+    pooled, keep-alive httpx transport. Mirrors `pycozo.client.Client.run`:
+    failed queries raise `QueryException`, and `immutable=True` queries are
+    refused by the server if they write.
+    """
+
+    def __init__(
+        self,
+        host: str = cozo_host,
+        auth: str | None = cozo_auth,
+        *,
+        max_connections: int = cozo_max_connections,
+        max_keepalive_connections: int = cozo_max_keepalive_connections,
+        keepalive_expiry: float = cozo_keepalive_expiry,
+        timeout: float = cozo_query_timeout,
+        dataframe: bool = False,
+    ):
+        self.host = host
+        self.dataframe = dataframe
+        self.http = httpx.AsyncClient(
+            base_url=host,
+            headers={"x-cozo-auth": auth} if auth else {},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=timeout,
+        )
+
+    async def run(
+        self,
+        script: str,
+        params: dict | None = None,
+        immutable: bool = False,
+        *,
+        timeout: float | None = None,
+    ) -> pd.DataFrame | dict[str, Any]:
+        response = await self.http.post(
+            "/text-query",
+            json={"script": script, "params": params or {}, "immutable": immutable},
+            **({"timeout": timeout} if timeout is not None else {}),
+        )
+
+        try:
+            result = response.json()
+        except ValueError:
+            # Not a Cozo response, e.g. the error page of a proxy
+            response.raise_for_status()
+            raise
+
+        if response.is_error or not result.get("ok"):
+            raise QueryException(result)
+
+        if not self.dataframe:
+            return result
+
+        return pd.DataFrame(columns=result["headers"], data=result["rows"])
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+
 def get_cozo_client() -> Client:
-    client = getattr(app.state, "cozo_client", Client("http", options=options))
-    if not hasattr(app.state, "cozo_client"):
-        app.state.cozo_client = client
+    client = getattr(app.state, "cozo_client", None)
+    if client is None:
+        # Skip the DataFrame conversion, `cozo_query` decodes the raw rows itself
+        client = app.state.cozo_client = Client(
+            "http", options=options, dataframe=False
+        )
 
     return client
+
+
+def get_async_cozo_client() -> AsyncClient | Client:
+    client = getattr(app.state, "async_cozo_client", None)
+    if client is None:
+        client = app.state.async_cozo_client = AsyncClient()
+
+    return client
+
+
+@app.on_event("shutdown")
+async def close_async_cozo_client() -> None:
+    client = getattr(app.state, "async_cozo_client", None)
+    if isinstance(client, AsyncClient):
+        await client.close()
+
+
+def is_connection_error(e: Exception) -> bool:
+    return isinstance(e, (httpx.TransportError, requests.RequestException))
+
+
+class CozoEndpoint:
+    """A read replica, with its sync and async clients and its current load."""
+
+    def __init__(self, name: str, client: Any, async_client: Any = None):
+        self.name = name
+        self.client = client
+        self.async_client = async_client or client
+        self.in_flight = 0
+        self.unhealthy_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.unhealthy_until <= time.monotonic()
+
+    def mark_unhealthy(self, backoff: float) -> None:
+        self.unhealthy_until = time.monotonic() + backoff
+
+    def mark_healthy(self) -> None:
+        self.unhealthy_until = 0.0
+
+
+# Set once the current request / task has written, so that its own reads
+# are not served by a replica that may lag behind
+_wrote_in_context: ContextVar[bool] = ContextVar("cozo_wrote", default=False)
+
+
+class CozoRouter:
+    """
+    Routes read-only queries to the least loaded healthy replica and
+    everything else to the primary (`get_cozo_client` / `get_async_cozo_client`).
+
+    Reads stick to the primary for the rest of a request that wrote, and for
+    `read_your_writes_window` seconds after a developer's last write. A
+    replica that fails to connect is skipped until `health_interval` passes
+    or the periodic health check sees it again.
+    """
+
+    def __init__(
+        self,
+        replicas: list[CozoEndpoint],
+        *,
+        read_your_writes_window: float = cozo_read_your_writes_window,
+        health_interval: float = cozo_read_health_interval,
+    ):
+        self.replicas = replicas
+        self.read_your_writes_window = read_your_writes_window
+        self.health_interval = health_interval
+        self._recent_writes: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record_write(self, developer_id: Any = None) -> None:
+        _wrote_in_context.set(True)
+
+        if developer_id is None or self.read_your_writes_window <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[str(developer_id)] = now + self.read_your_writes_window
+            self._recent_writes.move_to_end(str(developer_id))
+
+            # Entries are ordered by expiry, so expired ones are at the front
+            while (
+                self._recent_writes and next(iter(self._recent_writes.values())) < now
+            ):
+                self._recent_writes.popitem(last=False)
+
+    def _wrote_recently(self, developer_id: Any) -> bool:
+        if _wrote_in_context.get():
+            return True
+
+        if developer_id is None:
+            return False
+
+        with self._lock:
+            expires_at = self._recent_writes.get(str(developer_id))
+
+        return expires_at is not None and expires_at >= time.monotonic()
+
+    def select(self, readonly: bool, developer_id: Any = None) -> CozoEndpoint | None:
+        """Pick a replica for the query, or None for the primary."""
+        if not readonly or not self.replicas or self._wrote_recently(developer_id):
+            return None
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+
+        return min(healthy, key=lambda replica: replica.in_flight)
+
+    def _acquire(self, replica: CozoEndpoint) -> None:
+        with self._lock:
+            replica.in_flight += 1
+
+    def _release(self, replica: CozoEndpoint) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+
+    def run(
+        self,
+        query: str,
+        variables: dict,
+        *,
+        readonly: bool = False,
+        developer_id: Any = None,
+    ) -> Any:
+        if (replica := self.select(readonly, developer_id)) is not None:
+            self._acquire(replica)
+            try:
+                return replica.client.run(query, variables, immutable=readonly)
+
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+
+                # Fall back to the primary
+                replica.mark_unhealthy(self.health_interval)
+
+            finally:
+                self._release(replica)
+
+        result = get_cozo_client().run(query, variables, immutable=readonly)
+        if not readonly:
+            self.record_write(developer_id)
+
+        return result
+
+    async def run_async(
+        self,
+        query: str,
+        variables: dict,
+        *,
+        readonly: bool = False,
+        developer_id: Any = None,
+    ) -> Any:
+        if (replica := self.select(readonly, developer_id)) is not None:
+            self._acquire(replica)
+            try:
+                return await _run_async(
+                    replica.async_client, query, variables, immutable=readonly
+                )
+
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+
+                # Fall back to the primary
+                replica.mark_unhealthy(self.health_interval)
+
+            finally:
+                self._release(replica)
+
+        result = await _run_async(
+            get_async_cozo_client(), query, variables, immutable=readonly
+        )
+        if not readonly:
+            self.record_write(developer_id)
+
+        return result
+
+    async def check_health(self) -> None:
+        for replica in self.replicas:
+            try:
+                await _run_async(
+                    replica.async_client, "?[ok] <- [[true]]", {}, immutable=True
+                )
+                replica.mark_healthy()
+            except Exception:
+                replica.mark_unhealthy(self.health_interval)
+
+
+async def _run_async(
+    client: Any, query: str, variables: dict, immutable: bool = False
+) -> Any:
+    # Sync clients (e.g. the embedded client used in tests) run in a thread
+    if inspect.iscoroutinefunction(client.run):
+        return await client.run(query, variables, immutable=immutable)
+
+    return await asyncio.to_thread(client.run, query, variables, immutable=immutable)
+
+
+def get_cozo_router() -> CozoRouter:
+    router = getattr(app.state, "cozo_router", None)
+    if router is None:
+        router = app.state.cozo_router = CozoRouter(
+            [
+                CozoEndpoint(
+                    host,
+                    Client("http", options={**options, "host": host}, dataframe=False),
+                    AsyncClient(host),
+                )
+                for host in cozo_read_hosts
+            ]
+        )
+
+    return router
+
+
+async def _check_replicas_health() -> None:
+    while True:
+        await asyncio.sleep(cozo_read_health_interval)
+        await get_cozo_router().check_health()
+
+
+@app.on_event("startup")
+async def start_replica_health_checks() -> None:
+    if cozo_read_hosts:
+        app.state.cozo_health_check = asyncio.create_task(_check_replicas_health())
+
+
+@app.on_event("shutdown")
+async def stop_replica_health_checks() -> None:
+    if (task := getattr(app.state, "cozo_health_check", None)) is not None:
+        task.cancel()
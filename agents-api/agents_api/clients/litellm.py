@@ -1,3 +1,4 @@
+import asyncio
 from functools import wraps
 from typing import List, Literal
 
@@ -14,7 +15,10 @@ from litellm import (
 )
 from litellm.utils import CustomStreamWrapper, ModelResponse
 
+from ..common.utils.embedding_cache import EmbeddingCache, embedding_cache_key
 from ..env import (
+    embedding_cache_size,
+    embedding_cache_use_blob_store,
     embedding_dimensions,
     embedding_model_id,
     litellm_master_key,
@@ -27,6 +31,25 @@ __all__: List[str] = ["acompletion"]
 litellm.drop_params = True
 
 
+async def get_shared_embedding(key: str) -> bytes | None:
+    from . import s3
+
+    return await asyncio.to_thread(s3.get_object, f"embeddings/{key}")
+
+
+async def put_shared_embedding(key: str, body: bytes) -> None:
+    from . import s3
+
+    await asyncio.to_thread(s3.add_object, f"embeddings/{key}", body)
+
+
+embedding_cache = EmbeddingCache(
+    maxsize=embedding_cache_size,
+    get_shared=get_shared_embedding if embedding_cache_use_blob_store else None,
+    put_shared=put_shared_embedding if embedding_cache_use_blob_store else None,
+)
+
+
 @wraps(_acompletion)
 @beartype
 async def acompletion(
@@ -66,19 +89,25 @@ async def aembedding(
     else:
         input = ["\n\n".join(inputs)] if join_inputs else inputs
 
-    response = await _aembedding(
-        model=model,
-        input=input,
-        # dimensions=dimensions,  # FIXME: litellm doesn't support dimensions correctly
-        api_base=None if custom_api_key else litellm_url,
-        api_key=custom_api_key or litellm_master_key,
-        drop_params=True,
-        **settings,
-    )
+    async def embed(input: list[str]) -> list[list[float]]:
+        response = await _aembedding(
+            model=model,
+            input=input,
+            # dimensions=dimensions,  # FIXME: litellm doesn't support dimensions correctly
+            api_base=None if custom_api_key else litellm_url,
+            api_key=custom_api_key or litellm_master_key,
+            drop_params=True,
+            **settings,
+        )
+
+        embedding_list: list[dict[Literal["embedding"], list[float]]] = response.data
 
-    embedding_list: list[dict[Literal["embedding"], list[float]]] = response.data
+        # FIXME: Truncation should be handled by litellm
+        return [embedding["embedding"][:dimensions] for embedding in embedding_list]
 
-    # FIXME: Truncation should be handled by litellm
-    result = [embedding["embedding"][:dimensions] for embedding in embedding_list]
+    # Extra settings may change the embeddings, so those requests are not cached
+    if settings:
+        return await embed(input)
 
-    return result
+    keys = [embedding_cache_key(model, dimensions, text) for text in input]
+    return await embedding_cache.embed(keys, input, embed)
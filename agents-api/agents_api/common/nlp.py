@@ -1,67 +1,116 @@
+"""
+This module turns text into Cozo full-text search queries with spaCy.
+
+The spaCy pipeline is loaded on first use (or by `warm_up_nlp`) rather than at
+import time. `text_to_custom_queries` parses text off the event loop, in a
+pool of worker processes (each with its own pipeline), and caches the queries
+by normalized text. The time spent in each stage is exported as a histogram.
+"""
+
+import asyncio
+import multiprocessing
 import re
-from collections import Counter, defaultdict
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
+from typing import Any, Callable, TypeVar
 
 import spacy
+from prometheus_client import Histogram
+from spacy.language import Language
 from spacy.matcher import PhraseMatcher
 from spacy.tokens import Doc
 from spacy.util import filter_spans
 
+from ..env import nlp_process_pool_size, nlp_query_cache_size
+
 # Precompile regex patterns
 WHITESPACE_RE = re.compile(r"\s+")
 NON_ALPHANUM_RE = re.compile(r"[^\w\s\-_]+")
 
-# Initialize spaCy with minimal pipeline
-nlp = spacy.load("en_core_web_sm", exclude=["lemmatizer", "textcat", "tok2vec"])
+STAGES = ("parse", "keywords", "matcher", "query_build")
+
+nlp_stage_latency = Histogram(
+    "nlp_stage_latency_seconds",
+    "Time taken by each stage of turning text into full-text search queries",
+    labelnames=("stage",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+_nlp: Language | None = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp() -> Language:
+    """The spaCy pipeline, loaded on first use."""
+    global _nlp
+
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                # Initialize spaCy with minimal pipeline
+                nlp = spacy.load(
+                    "en_core_web_sm", exclude=["lemmatizer", "textcat", "tok2vec"]
+                )
+
+                # Add sentencizer for faster sentence tokenization
+                nlp.add_pipe("sentencizer")
+
+                _nlp = nlp
+
+    return _nlp
+
+
+def __getattr__(name: str) -> Any:
+    # `nlp` and `keyword_matcher` used to be created at import time
+    if name == "nlp":
+        return get_nlp()
+
+    if name == "keyword_matcher":
+        return KeywordMatcher()
 
-# Add sentencizer for faster sentence tokenization
-sentencizer = nlp.add_pipe("sentencizer")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-# Singleton PhraseMatcher for better performance
+# Singleton holding the PhraseMatchers. A matcher is built once per keyword
+# set and never modified afterwards, so it can be shared by concurrent callers.
 class KeywordMatcher:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-            cls._instance.batch_size = 1000  # Adjust based on memory constraints
-            cls._instance.patterns_cache = {}
         return cls._instance
 
     @lru_cache(maxsize=10000)
     def _create_pattern(self, text: str) -> Doc:
-        return nlp.make_doc(text)
+        return get_nlp().make_doc(text)
+
+    @lru_cache(maxsize=1000)
+    def _create_matcher(self, keywords: tuple[str, ...]) -> PhraseMatcher:
+        matcher = PhraseMatcher(get_nlp().vocab, attr="LOWER")
+        matcher.add("KEYWORDS", [self._create_pattern(kw) for kw in keywords])
+
+        return matcher
 
     def find_matches(self, doc: Doc, keywords: list[str]) -> dict[str, list[int]]:
-        """Batch process keywords for better performance."""
+        """Positions of the (lowercased) keywords found in the doc."""
         keyword_positions = defaultdict(list)
 
-        # Process keywords in batches to avoid memory issues
-        for i in range(0, len(keywords), self.batch_size):
-            batch = keywords[i : i + self.batch_size]
-            patterns = [self._create_pattern(kw) for kw in batch]
+        if not keywords:
+            return keyword_positions
 
-            # Clear previous patterns and add new batch
-            if "KEYWORDS" in self.matcher:
-                self.matcher.remove("KEYWORDS")
-            self.matcher.add("KEYWORDS", patterns)
-
-            # Find matches for this batch
-            matches = self.matcher(doc)
-            for match_id, start, end in matches:
-                span_text = doc[start:end].text
-                normalized = WHITESPACE_RE.sub(" ", span_text).lower().strip()
-                keyword_positions[normalized].append(start)
+        for match_id, start, end in self._create_matcher(tuple(keywords))(doc):
+            span_text = doc[start:end].text
+            normalized = WHITESPACE_RE.sub(" ", span_text).lower().strip()
+            keyword_positions[normalized].append(start)
 
         return keyword_positions
 
 
-# Initialize global matcher
-keyword_matcher = KeywordMatcher()
-
-
 @lru_cache(maxsize=10000)
 def clean_keyword(kw: str) -> str:
     """Cache cleaned keywords for reuse."""
@@ -115,14 +164,17 @@ def extract_keywords(doc: Doc, top_n: int = 10, clean: bool = True) -> list[str]
 def find_proximity_groups(
     keywords: list[str], keyword_positions: dict[str, list[int]], n: int = 10
 ) -> list[set[str]]:
-    """Optimized proximity grouping using sorted positions."""
+    """
+    Groups keywords occurring within `n` tokens of each other (transitively),
+    in O(p log p) for p positions.
+    """
     # Early return for single or no keywords
     if len(keywords) <= 1:
         return [{kw} for kw in keywords]
 
     # Create flat list of positions for efficient processing
     positions: list[tuple[int, str]] = [
-        (pos, kw) for kw in keywords for pos in keyword_positions[kw]
+        (pos, kw) for kw in keywords for pos in keyword_positions.get(kw, ())
     ]
 
     # Sort positions once
@@ -146,18 +198,12 @@ def find_proximity_groups(
             if rank[u_root] == rank[v_root]:
                 rank[u_root] += 1
 
-    # Use sliding window for proximity checking
-    window = []
-    for pos, kw in positions:
-        # Remove positions outside window
-        while window and pos - window[0][0] > n:
-            window.pop(0)
-
-        # Union with all keywords in window
-        for _, w_kw in window:
-            union(kw, w_kw)
-
-        window.append((pos, kw))
+    # Two positions within `n` of each other are chained by the consecutive
+    # (sorted) positions between them, each within `n` of the previous one, so
+    # unioning neighbours yields the same groups as unioning whole windows
+    for (prev_pos, prev_kw), (pos, kw) in zip(positions, positions[1:]):
+        if pos - prev_pos <= n:
+            union(kw, prev_kw)
 
     # Group keywords efficiently
     groups = defaultdict(set)
@@ -193,28 +239,21 @@ def build_query(groups: list[set[str]], n: int = 10) -> str:
     return " OR ".join(clauses)
 
 
-@lru_cache(maxsize=100)
-def paragraph_to_custom_queries(
-    paragraph: str, top_n: int = 10, proximity_n: int = 10, min_keywords: int = 1
-) -> list[str]:
-    """
-    Optimized paragraph processing with minimal behavior changes.
-    Added min_keywords parameter to filter out low-value queries.
-
-    Args:
-        paragraph (str): The input paragraph to convert.
-        top_n (int): Number of top keywords to extract per sentence.
-        proximity_n (int): The proximity window for NEAR/n.
-        min_keywords (int): Minimum number of keywords required to form a query.
+def _paragraph_to_custom_queries(
+    paragraph: str, top_n: int, proximity_n: int, min_keywords: int
+) -> tuple[list[str], dict[str, float]]:
+    """`paragraph_to_custom_queries`, also returning the time spent in each stage."""
+    timings = dict.fromkeys(STAGES, 0.0)
 
-    Returns:
-        list[str]: The list of custom query strings.
-    """
     if not paragraph or not paragraph.strip():
-        return []
+        return [], timings
 
     # Process entire paragraph once
-    doc = nlp(paragraph)
+    start = time.perf_counter()
+    doc = get_nlp()(paragraph)
+    timings["parse"] += time.perf_counter() - start
+
+    keyword_matcher = KeywordMatcher()
     queries = []
 
     # Process sentences
@@ -223,24 +262,174 @@ def paragraph_to_custom_queries(
         sent_doc = sent.as_doc()
 
         # Extract and clean keywords
+        start = time.perf_counter()
         keywords = extract_keywords(sent_doc, top_n)
+        timings["keywords"] += time.perf_counter() - start
+
         if len(keywords) < min_keywords:
             continue
 
         # Find keyword positions using matcher
+        start = time.perf_counter()
         keyword_positions = keyword_matcher.find_matches(sent_doc, keywords)
+        timings["matcher"] += time.perf_counter() - start
 
         # Skip if no keywords found in positions
         if not keyword_positions:
             continue
 
         # Find proximity groups and build query
+        start = time.perf_counter()
         groups = find_proximity_groups(keywords, keyword_positions, proximity_n)
         query = build_query(groups, proximity_n)
+        timings["query_build"] += time.perf_counter() - start
 
         if query:
             queries.append(query)
 
+    return queries, timings
+
+
+def _observe_stages(timings: dict[str, float]) -> None:
+    for stage, elapsed in timings.items():
+        nlp_stage_latency.labels(stage).observe(elapsed)
+
+
+def normalize_text(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CustomQueryCache:
+    """Queries of the `maxsize` most recently used (normalized text, options) keys."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> list[str] | None:
+        with self._lock:
+            queries = self._entries.get(key)
+            if queries is None:
+                return None
+
+            self._entries.move_to_end(key)
+
+        return list(queries)
+
+    def put(self, key: tuple, queries: list[str]) -> None:
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = tuple(queries)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+custom_query_cache = CustomQueryCache(maxsize=nlp_query_cache_size)
+
+
+def paragraph_to_custom_queries(
+    paragraph: str, top_n: int = 10, proximity_n: int = 10, min_keywords: int = 1
+) -> list[str]:
+    """
+    Optimized paragraph processing with minimal behavior changes.
+    Added min_keywords parameter to filter out low-value queries.
+
+    Args:
+        paragraph (str): The input paragraph to convert.
+        top_n (int): Number of top keywords to extract per sentence.
+        proximity_n (int): The proximity window for NEAR/n.
+        min_keywords (int): Minimum number of keywords required to form a query.
+
+    Returns:
+        list[str]: The list of custom query strings.
+    """
+    key = (normalize_text(paragraph), top_n, proximity_n, min_keywords)
+
+    if (queries := custom_query_cache.get(key)) is not None:
+        return queries
+
+    queries, timings = _paragraph_to_custom_queries(*key)
+    _observe_stages(timings)
+    custom_query_cache.put(key, queries)
+
+    return queries
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+
+    if _pool is None and nlp_process_pool_size > 0:
+        with _pool_lock:
+            if _pool is None:
+                # Spawned, since forking a process running an event loop (and
+                # threads) isn't safe; each worker loads its own pipeline
+                _pool = ProcessPoolExecutor(
+                    max_workers=nlp_process_pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=get_nlp,
+                )
+
+    return _pool
+
+
+def _ping() -> None:
+    pass
+
+
+def warm_up_nlp() -> None:
+    """Loads the spaCy pipeline, and starts the worker processes, ahead of the first search."""
+    get_nlp()
+
+    if (pool := _get_pool()) is not None:
+        for future in [pool.submit(_ping) for _ in range(nlp_process_pool_size)]:
+            future.result()
+
+
+T = TypeVar("T")
+
+
+async def run_in_nlp_pool(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Runs `fn` in the worker processes (or, with `NLP_PROCESS_POOL_SIZE=0`, in
+    a thread) so that spaCy doesn't block the event loop. `fn` and its
+    arguments have to be picklable.
+    """
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(_get_pool(), fn, *args)
+
+
+async def text_to_custom_queries(
+    paragraph: str, top_n: int = 10, proximity_n: int = 10, min_keywords: int = 1
+) -> list[str]:
+    """
+    `paragraph_to_custom_queries` run in the worker processes (or, with
+    `NLP_PROCESS_POOL_SIZE=0`, in a thread) so that parsing doesn't block
+    the event loop.
+    """
+    key = (normalize_text(paragraph), top_n, proximity_n, min_keywords)
+
+    if (queries := custom_query_cache.get(key)) is not None:
+        return queries
+
+    queries, timings = await run_in_nlp_pool(_paragraph_to_custom_queries, *key)
+
+    _observe_stages(timings)
+    custom_query_cache.put(key, queries)
+
     return queries
 
 
@@ -264,8 +453,10 @@ def batch_paragraphs_to_custom_queries(
     Returns:
         list[list[str]]: A list where each element is a list of queries for a paragraph.
     """
+    keyword_matcher = KeywordMatcher()
+
     results = []
-    for doc in nlp.pipe(
+    for doc in get_nlp().pipe(
         paragraphs, disable=["lemmatizer", "textcat"], n_process=n_process
     ):
         queries = []
@@ -0,0 +1,156 @@
+"""
+This module splits doc content into snippets of at most `max_tokens` tokens,
+cutting at sentence boundaries (found by the spaCy sentencizer) and repeating
+up to `overlap_tokens` tokens of a snippet at the start of the next one.
+
+Content is processed lazily, paragraph by paragraph, and snippets are yielded
+as soon as they are complete, so that long documents are never tokenized (or
+chunked) all at once. `chunk_content_async` does the same in the NLP worker
+processes, off the event loop.
+"""
+
+import re
+from collections import deque
+from typing import Iterable, Iterator, NamedTuple
+
+from ..nlp import get_nlp, run_in_nlp_pool
+
+PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+
+
+class Chunk(NamedTuple):
+    source_index: int  # Index of the content item the chunk was cut from
+    start_char: int
+    end_char: int
+    token_count: int
+    content: str
+
+
+class _Unit(NamedTuple):
+    start_char: int
+    end_char: int
+    token_count: int
+
+
+def iter_segments(text: str, max_chars: int) -> Iterator[tuple[str, int]]:
+    """Paragraphs of `text` (split further if longer than `max_chars`) and their offsets."""
+    start = 0
+
+    for end in [m.start() for m in PARAGRAPH_BREAK_RE.finditer(text)] + [len(text)]:
+        while end - start > max_chars:
+            # Cut at the last whitespace before the limit (if any)
+            cut = text.rfind(" ", start + 1, start + max_chars) + 1 or (
+                start + max_chars
+            )
+            yield text[start:cut], start
+            start = cut
+
+        if end > start:
+            yield text[start:end], start
+
+        start = end
+
+
+def _iter_units(text: str, max_tokens: int) -> Iterator[_Unit]:
+    """Sentences of `text`; sentences longer than `max_tokens` are split into pieces."""
+    nlp = get_nlp()
+    segments = iter_segments(text, max_chars=nlp.max_length)
+
+    # Only the tokenizer and the sentencizer are needed to find sentences
+    disabled = [name for name in nlp.pipe_names if name != "sentencizer"]
+
+    for doc, offset in nlp.pipe(segments, as_tuples=True, disable=disabled):
+        for sent in doc.sents:
+            tokens = [token for token in sent if not token.is_space]
+
+            for i in range(0, len(tokens), max_tokens):
+                piece = tokens[i : i + max_tokens]
+                yield _Unit(
+                    offset + piece[0].idx,
+                    offset + piece[-1].idx + len(piece[-1]),
+                    len(piece),
+                )
+
+
+def chunk_text(
+    text: str, *, max_tokens: int, overlap_tokens: int = 0, source_index: int = 0
+) -> Iterator[Chunk]:
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens must be non-negative and less than max_tokens")
+
+    window: deque[_Unit] = deque()
+    window_tokens = 0
+    has_new_units = False
+
+    def make_chunk() -> Chunk:
+        start_char, end_char = window[0].start_char, window[-1].end_char
+        return Chunk(
+            source_index,
+            start_char,
+            end_char,
+            window_tokens,
+            text[start_char:end_char],
+        )
+
+    for unit in _iter_units(text, max_tokens):
+        if window_tokens + unit.token_count > max_tokens:
+            if has_new_units:
+                yield make_chunk()
+                has_new_units = False
+
+            # Keep the trailing sentences that fit in the overlap (and leave
+            # room for the new one)
+            while window and (
+                window_tokens > overlap_tokens
+                or window_tokens + unit.token_count > max_tokens
+            ):
+                window_tokens -= window.popleft().token_count
+
+        window.append(unit)
+        window_tokens += unit.token_count
+        has_new_units = True
+
+    if has_new_units:
+        yield make_chunk()
+
+
+def chunk_content(
+    content: Iterable[str], *, max_tokens: int, overlap_tokens: int = 0
+) -> Iterator[Chunk]:
+    """
+    Chunks of each of the `content` items, in order. Items without any tokens
+    (e.g. empty strings) are kept as they are.
+    """
+
+    for source_index, text in enumerate(content):
+        empty = True
+
+        for chunk in chunk_text(
+            text,
+            max_tokens=max_tokens,
+            overlap_tokens=overlap_tokens,
+            source_index=source_index,
+        ):
+            empty = False
+            yield chunk
+
+        if empty:
+            yield Chunk(source_index, 0, len(text), 0, text)
+
+
+def _chunk_content_list(
+    content: list[str], max_tokens: int, overlap_tokens: int
+) -> list[Chunk]:
+    return list(
+        chunk_content(content, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+    )
+
+
+async def chunk_content_async(
+    content: list[str], *, max_tokens: int, overlap_tokens: int = 0
+) -> list[Chunk]:
+    """`chunk_content`, run in the NLP worker processes."""
+
+    return await run_in_nlp_pool(
+        _chunk_content_list, content, max_tokens, overlap_tokens
+    )
@@ -0,0 +1,65 @@
+"""
+This module provides a process-local cache of the per-owner doc statistics
+(stored in the `owner_doc_stats` relation) used to plan doc searches.
+
+Entries expire after a TTL, and are dropped as soon as this process changes
+the docs of an owner. Changes made by other processes (e.g. the workers) are
+picked up when entries expire; plans only need approximate counts.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from uuid import UUID
+
+# Key under which the statistics of the whole corpus are cached
+ALL_OWNERS = ("*", "*")
+
+
+class CorpusStats(NamedTuple):
+    doc_count: int
+    snippet_count: int
+
+
+class CorpusStatsCache:
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, str], tuple[float, CorpusStats]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, owner_type: str, owner_id: UUID | str) -> CorpusStats | None:
+        key = (owner_type, str(owner_id))
+
+        with self._lock:
+            expires_at, stats = self._entries.get(key, (0.0, None))
+
+            if expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+
+            return stats
+
+    def put(self, owner_type: str, owner_id: UUID | str, stats: CorpusStats) -> None:
+        if self.ttl <= 0:
+            return
+
+        key = (owner_type, str(owner_id))
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, stats)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, owner_type: str, owner_id: UUID | str) -> None:
+        with self._lock:
+            self._entries.pop((owner_type, str(owner_id)), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -23,4 +23,4 @@ cozo_process_mutate_data = _fake_client._process_mutate_data = lambda data: (
 
 @beartype
 def uuid_int_list_to_uuid4(data: list[int]) -> UUID:
-    return UUID(bytes=b"".join([i.to_bytes(1, "big") for i in data]))
+    return UUID(bytes=bytes(data))
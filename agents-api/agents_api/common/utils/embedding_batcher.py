@@ -0,0 +1,112 @@
+"""
+This module provides a micro-batching scheduler for embedding requests. Texts
+submitted by concurrent callers (e.g. the `embed_docs` activities running in a
+worker) are collected and sent to the embedding service in full batches, and
+every caller gets back the embeddings of its own texts.
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple, Sequence
+
+from prometheus_client import Histogram
+
+batch_fill_ratio = Histogram(
+    "embedding_batch_fill_ratio",
+    "Size of the batches sent to the embedding service, relative to the maximum",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+queue_latency = Histogram(
+    "embedding_batch_queue_latency_seconds",
+    "Time texts wait in the embedding batcher before being sent",
+)
+
+Embed = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class _Pending(NamedTuple):
+    text: str
+    future: asyncio.Future
+    queued_at: float
+
+
+class _SchedulerState:
+    def __init__(self):
+        self.queue: deque[_Pending] = deque()
+        self.handle: asyncio.TimerHandle | None = None
+        self.tasks: set[asyncio.Task] = set()
+
+
+class EmbeddingBatcher:
+    """
+    Texts submitted on the same event loop are sent to `embed` in batches of
+    `max_batch_size`, as soon as a batch is full or at most `max_wait`
+    seconds after the oldest queued text was submitted.
+    """
+
+    def __init__(self, embed: Embed, *, max_batch_size: int, max_wait: float):
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, _SchedulerState
+        ] = weakref.WeakKeyDictionary()
+
+    async def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+
+        if (state := self._states.get(loop)) is None:
+            state = self._states[loop] = _SchedulerState()
+
+        now = time.monotonic()
+        futures = [loop.create_future() for _ in texts]
+        state.queue.extend(
+            _Pending(text, future, now) for text, future in zip(texts, futures)
+        )
+
+        while len(state.queue) >= self.max_batch_size:
+            self._dispatch(state)
+
+        if state.queue and state.handle is None:
+            state.handle = loop.call_later(self.max_wait, self._flush, state)
+
+        # Shielded so that a cancelled caller does not fail the rest of its batch
+        return list(await asyncio.gather(*map(asyncio.shield, futures)))
+
+    def _flush(self, state: _SchedulerState) -> None:
+        state.handle = None
+
+        while state.queue:
+            self._dispatch(state)
+
+    def _dispatch(self, state: _SchedulerState) -> None:
+        size = min(self.max_batch_size, len(state.queue))
+        batch = [state.queue.popleft() for _ in range(size)]
+
+        if not state.queue and state.handle is not None:
+            state.handle.cancel()
+            state.handle = None
+
+        now = time.monotonic()
+        batch_fill_ratio.observe(size / self.max_batch_size)
+        for pending in batch:
+            queue_latency.observe(now - pending.queued_at)
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        state.tasks.add(task)
+        task.add_done_callback(state.tasks.discard)
+
+    async def _run(self, batch: list[_Pending]) -> None:
+        try:
+            embeddings = await self._embed([pending.text for pending in batch])
+
+            for pending, embedding in zip(batch, embeddings, strict=True):
+                if not pending.future.done():
+                    pending.future.set_result(embedding)
+
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
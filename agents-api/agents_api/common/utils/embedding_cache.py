@@ -0,0 +1,222 @@
+"""
+This module provides a cache for embeddings keyed by model, dimensions and
+(normalized) text. It has an in-memory LRU tier, an optional shared tier
+(e.g. the blob store) and deduplicates concurrent requests for the same text,
+so that repeated queries only hit the embedding service once.
+"""
+
+import asyncio
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from prometheus_client import Counter, Histogram
+from xxhash import xxh3_128_hexdigest
+
+lookups = Counter(
+    "embedding_cache_lookups",
+    "Number of embedding cache lookups, by where the embedding was found",
+    labelnames=("result",),
+)
+saved_seconds = Counter(
+    "embedding_cache_saved_seconds",
+    "Estimated embedding service latency saved by requests served from the cache",
+)
+embedding_latency = Histogram(
+    "embedding_request_latency_seconds",
+    "Time taken by embedding service requests for texts missing from the cache",
+)
+
+Embed = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+def normalize_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def embedding_cache_key(model: str, dimensions: int, text: str) -> str:
+    """Cache key of a text; any instruction is expected to be part of the text."""
+    return f"{model}:{dimensions}:{xxh3_128_hexdigest(normalize_text(text).encode())}"
+
+
+class EmbeddingCache:
+    """
+    Embeddings cached in memory (as float32) for the `maxsize` most recently
+    used keys, and optionally in a shared tier through the `get_shared` /
+    `put_shared` callables. Errors of the shared tier are treated as misses.
+
+    Texts that are already being embedded by another request are awaited
+    instead of being sent to the embedding service again.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        get_shared: Callable[[str], Awaitable[bytes | None]] | None = None,
+        put_shared: Callable[[str, bytes], Awaitable[None]] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.get_shared = get_shared
+        self.put_shared = put_shared
+
+        self._entries: OrderedDict[str, array] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+        # Moving average of the embedding service latency, to estimate savings
+        self._latency: float | None = None
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                return None
+
+            self._entries.move_to_end(key)
+
+        return embedding.tolist()
+
+    def put(self, key: str, embedding: list[float] | array) -> None:
+        if self.maxsize <= 0:
+            return
+
+        embedding = embedding if isinstance(embedding, array) else array("f", embedding)
+
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def _get_shared(self, key: str) -> array | None:
+        try:
+            body = await self.get_shared(key)
+        except Exception:
+            return None
+
+        if body is None:
+            return None
+
+        embedding = array("f")
+        embedding.frombytes(body)
+
+        return embedding
+
+    def _put_shared(self, key: str, embedding: list[float]) -> None:
+        # Written in the background; the caller already has its embedding
+        task = asyncio.create_task(
+            self.put_shared(key, array("f", embedding).tobytes())
+        )
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _record_latency(self, elapsed: float) -> None:
+        embedding_latency.observe(elapsed)
+        self._latency = (
+            elapsed if self._latency is None else 0.9 * self._latency + 0.1 * elapsed
+        )
+
+    async def embed(
+        self, keys: list[str], texts: list[str], embed: Embed
+    ) -> list[list[float]]:
+        """Embeddings of `texts` (with cache keys `keys`), calling `embed` for the misses."""
+        loop = asyncio.get_running_loop()
+
+        results: list[list[float] | None] = [None] * len(keys)
+        waiting: dict[int, asyncio.Future] = {}
+        missing: dict[str, list[int]] = {}
+
+        for i, key in enumerate(keys):
+            if (embedding := self.get(key)) is not None:
+                lookups.labels("memory").inc()
+                results[i] = embedding
+
+            elif key in missing:
+                lookups.labels("in_flight").inc()
+                missing[key].append(i)
+
+            elif (future := self._in_flight.get(key)) and future.get_loop() is loop:
+                lookups.labels("in_flight").inc()
+                waiting[i] = future
+
+            else:
+                missing[key] = [i]
+
+        claimed = {key: loop.create_future() for key in missing}
+        self._in_flight.update(claimed)
+
+        def resolve(key: str, embedding: list[float]) -> None:
+            for i in missing.pop(key):
+                results[i] = embedding
+
+            claimed[key].set_result(embedding)
+
+        try:
+            if missing and self.get_shared is not None:
+                shared = await asyncio.gather(*map(self._get_shared, missing))
+
+                for key, embedding in zip(list(missing), shared):
+                    if embedding is not None:
+                        lookups.labels("shared").inc()
+                        self.put(key, embedding)
+                        resolve(key, embedding.tolist())
+
+            if missing:
+                lookups.labels("miss").inc(len(missing))
+
+                start = time.perf_counter()
+                embeddings = await embed([texts[idxs[0]] for idxs in missing.values()])
+                self._record_latency(time.perf_counter() - start)
+
+                for key, embedding in zip(list(missing), embeddings):
+                    self.put(key, embedding)
+                    resolve(key, embedding)
+
+                    if self.put_shared is not None:
+                        self._put_shared(key, embedding)
+
+            elif keys and self._latency is not None:
+                saved_seconds.inc(self._latency)
+
+        except BaseException as e:
+            for future in claimed.values():
+                if future.done():
+                    continue
+
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Only waiters (if any) should see it, not the event loop
+                    future.exception()
+
+            raise
+
+        finally:
+            for key, future in claimed.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+
+        # Shielded so that a cancelled waiter doesn't cancel the shared request
+        for i, future in waiting.items():
+            try:
+                results[i] = await asyncio.shield(future)
+
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+                # The request embedding this text was cancelled; embed it here
+                [results[i]] = await self.embed([keys[i]], [texts[i]], embed)
+
+        return results
@@ -0,0 +1,273 @@
+"""
+This module provides an adaptive (AIMD) concurrency limiter with a bounded,
+deadline-aware wait queue. It is used in front of the Cozo client so that
+"resource busy" errors shrink the number of in-flight queries instead of
+piling up sleeping retries.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+concurrency_limit = Gauge(
+    "concurrency_limit",
+    "Current in-flight limit of the adaptive limiter",
+    labelnames=("limiter",),
+)
+in_flight = Gauge(
+    "concurrency_in_flight",
+    "Number of calls currently holding a limiter slot",
+    labelnames=("limiter",),
+)
+queue_depth = Gauge(
+    "concurrency_queue_depth",
+    "Number of calls waiting for a limiter slot",
+    labelnames=("limiter",),
+)
+queue_wait = Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time spent waiting for a limiter slot",
+    labelnames=("limiter",),
+)
+shed = Counter(
+    "concurrency_shed",
+    "Number of calls rejected by the limiter",
+    labelnames=("limiter", "reason"),
+)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a call is shed because the wait queue is full or its deadline passed."""
+
+    def __init__(self, name: str, reason: str):
+        self.reason = reason
+        super().__init__(f"{name}: request shed ({reason})")
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+
+    return True
+
+
+class _Waiter:
+    def __init__(self, notify: Callable[[], None]):
+        self.notify = notify
+        self.granted = False
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limiter.
+
+    The in-flight limit is multiplied by `backoff` when a call fails with an
+    overload error (as decided by `is_overload`), at most once per
+    `latency_target`, and grows by roughly one slot per `limit` calls that
+    complete within `latency_target`. Calls over the limit wait in a FIFO
+    queue of at most `max_queue` entries, for at most `timeout` seconds.
+
+    Slots can be taken from threads (`limit`) and from event loops
+    (`limit_async`) alike, so sync and async Cozo queries share one budget.
+    Sync calls made on an event loop's thread (e.g. sync queries called from
+    `async def` routes) are shed instead of queued: blocking the loop would
+    keep the coroutines holding the slots from ever releasing them.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        timeout: float,
+        latency_target: float,
+        backoff: float = 0.5,
+        is_overload: Callable[[Exception], bool] = lambda _: False,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.is_overload = is_overload
+
+        self.limit_value: float = float(initial_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+        self._update_gauges()
+
+    # Slot accounting
+    # ---------------
+
+    def _update_gauges(self) -> None:
+        concurrency_limit.labels(self.name).set(int(self.limit_value))
+        in_flight.labels(self.name).set(self.in_flight)
+        queue_depth.labels(self.name).set(len(self._waiters))
+
+    def _try_acquire(self) -> bool:
+        # Must be called with the lock held
+        if self.in_flight < int(self.limit_value) and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        return False
+
+    def _enqueue(self, notify: Callable[[], None]) -> _Waiter:
+        # Must be called with the lock held
+        if len(self._waiters) >= self.max_queue:
+            shed.labels(self.name, "queue_full").inc()
+            raise ConcurrencyLimitExceeded(self.name, "queue_full")
+
+        waiter = _Waiter(notify)
+        self._waiters.append(waiter)
+        self._update_gauges()
+
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Give up waiting; returns True if the slot was granted in the meantime."""
+        with self._lock:
+            if waiter.granted:
+                return True
+
+            self._waiters.remove(waiter)
+            self._update_gauges()
+
+        return False
+
+    def _grant_waiters(self) -> None:
+        # Must be called with the lock held
+        while self._waiters and self.in_flight < int(self.limit_value):
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.notify()
+
+        self._update_gauges()
+
+    def release(self, latency: float | None = None, overloaded: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if overloaded:
+                # Only back off once per latency target, so that a burst of busy
+                # errors from the same overload does not collapse the limit
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit_value = max(
+                        self.min_limit, self.limit_value * self.backoff
+                    )
+                    self._last_decrease = now
+
+            elif latency is not None and latency <= self.latency_target:
+                self.limit_value = min(
+                    self.max_limit, self.limit_value + 1 / self.limit_value
+                )
+
+            self._grant_waiters()
+
+    # Acquiring slots
+    # ---------------
+
+    def acquire(self, timeout: float | None = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._lock:
+            if self._try_acquire():
+                self._update_gauges()
+                return
+
+            if _on_event_loop():
+                shed.labels(self.name, "event_loop").inc()
+                raise ConcurrencyLimitExceeded(self.name, "event_loop")
+
+            event = threading.Event()
+            waiter = self._enqueue(event.set)
+
+        start = time.monotonic()
+        event.wait(timeout)
+        queue_wait.labels(self.name).observe(time.monotonic() - start)
+
+        if not self._abandon(waiter):
+            shed.labels(self.name, "deadline").inc()
+            raise ConcurrencyLimitExceeded(self.name, "deadline")
+
+    async def acquire_async(self, timeout: float | None = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if self._try_acquire():
+                self._update_gauges()
+                return
+
+            future = loop.create_future()
+
+            def notify() -> None:
+                # May be called from another thread releasing its slot
+                loop.call_soon_threadsafe(
+                    lambda: future.done() or future.set_result(None)
+                )
+
+            waiter = self._enqueue(notify)
+
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                shed.labels(self.name, "deadline").inc()
+                raise ConcurrencyLimitExceeded(self.name, "deadline")
+
+        except asyncio.CancelledError:
+            # Hand the slot back if it was granted while being cancelled
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+        finally:
+            queue_wait.labels(self.name).observe(time.monotonic() - start)
+
+    @contextmanager
+    def limit(self, timeout: float | None = None) -> Iterator[None]:
+        self.acquire(timeout)
+        start = time.monotonic()
+        overloaded = False
+
+        try:
+            yield
+        except Exception as e:
+            overloaded = self.is_overload(e)
+            raise
+        finally:
+            self.release(time.monotonic() - start, overloaded)
+
+    @asynccontextmanager
+    async def limit_async(self, timeout: float | None = None) -> AsyncIterator[None]:
+        await self.acquire_async(timeout)
+        start = time.monotonic()
+        overloaded = False
+
+        try:
+            yield
+        except Exception as e:
+            overloaded = self.is_overload(e)
+            raise
+        finally:
+            self.release(time.monotonic() - start, overloaded)
@@ -0,0 +1,86 @@
+"""
+This module provides helpers for keyset (cursor) pagination of list endpoints.
+
+A cursor is an opaque, url-safe token encoding the sort order it was issued
+for and the `(sort_key, id)` of the last item of a page. Sort keys are whole
+microseconds since the epoch, computed by the list queries themselves (see
+`keyset_query`) so that they compare exactly with the keys of the next page;
+the datetimes of the models can be a microsecond off.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence
+from uuid import UUID
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Page(list):
+    """A page of a list query, with the `(sort_key, id)` keyset of its last row."""
+
+    def __init__(self, items=(), keyset: tuple[float | int, str] | None = None):
+        super().__init__(items)
+        self.keyset = keyset
+
+
+def to_microseconds(value: datetime | float | int) -> int:
+    if isinstance(value, datetime):
+        value = value.timestamp()
+
+    return round(value * 1_000_000)
+
+
+def encode_cursor(
+    sort_by: str, direction: str, sort_key: float | int, id: UUID | str
+) -> str:
+    payload = json.dumps(
+        [sort_by, direction, int(sort_key), str(id)],
+        separators=(",", ":"),
+    )
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, direction: str) -> tuple[int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_direction, sort_value, id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        id = str(UUID(id))
+
+    except Exception as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+    if (cursor_sort_by, cursor_direction) != (sort_by, direction):
+        raise InvalidCursor("Cursor was issued for a different sort order")
+
+    return int(sort_value), id
+
+
+def next_cursor(
+    items: Sequence[Any],
+    limit: int,
+    sort_by: str,
+    direction: str,
+    id_field: str = "id",
+) -> str | None:
+    """Cursor for the page after `items`, or None if this was the last page."""
+    if limit <= 0 or len(items) < limit:
+        return None
+
+    if (keyset := getattr(items, "keyset", None)) is not None:
+        return encode_cursor(sort_by, direction, *keyset)
+
+    # Not a `Page`, so fall back to the (possibly less precise) model fields
+    last = items[-1]
+    return encode_cursor(
+        sort_by,
+        direction,
+        to_microseconds(getattr(last, sort_by)),
+        getattr(last, id_field),
+    )
@@ -0,0 +1,67 @@
+"""
+This module provides scalar (int8) and binary quantization of embeddings.
+
+Embeddings are normalized before being quantized, so that (approximate)
+cosine similarities are plain dot products of the codes. Quantized codes are
+only precise enough to shortlist candidates; final scores should be computed
+with the full precision embeddings.
+"""
+
+import base64
+from typing import Literal, Sequence
+
+import numpy as np
+
+Quantization = Literal["int8", "binary"]
+
+
+def _as_unit_rows(embeddings: Sequence | np.ndarray) -> np.ndarray:
+    x = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+
+    return x / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(embeddings: Sequence | np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Int8 codes (n, d) and scales (n,) of the normalized embeddings."""
+    x = _as_unit_rows(embeddings)
+
+    scales = np.abs(x).max(axis=1) / 127
+    codes = np.rint(x / np.where(scales == 0, 1, scales)[:, None]).astype(np.int8)
+
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(embeddings: Sequence | np.ndarray) -> np.ndarray:
+    """Sign bits of the embeddings, packed into (n, ceil(d / 8)) bytes."""
+    return np.packbits(np.atleast_2d(np.asarray(embeddings)) > 0, axis=1)
+
+
+def int8_similarity(
+    query_embedding: Sequence | np.ndarray, codes: np.ndarray, scales: np.ndarray
+) -> np.ndarray:
+    """Approximate cosine similarity of the query to each of the quantized embeddings."""
+    [query] = _as_unit_rows(query_embedding)
+
+    return (codes @ query) * scales
+
+
+def binary_similarity(
+    query_embedding: Sequence | np.ndarray, bits: np.ndarray, dimensions: int
+) -> np.ndarray:
+    """Fraction of agreeing signs (rescaled to [-1, 1]) of the query and each embedding."""
+    [query_bits] = quantize_binary(query_embedding)
+    differences = np.bitwise_count(bits ^ query_bits).sum(axis=1)
+
+    return 1 - 2 * differences / dimensions
+
+
+def encode_code(code: np.ndarray) -> str:
+    return base64.b64encode(code.tobytes()).decode()
+
+
+def decode_codes(encoded: Sequence[str], dtype: type) -> np.ndarray:
+    """Stack base64 encoded codes (as returned by `encode_code`) into a matrix."""
+    return np.stack(
+        [np.frombuffer(base64.b64decode(code), dtype=dtype) for code in encoded]
+    )
@@ -0,0 +1,81 @@
+"""
+This module provides a process-local cache of doc search results. Keys include
+the doc generations of the owners searched (bumped in the same transaction as
+any change to their docs), so results from before a change are never served
+after it; entries also expire after a TTL to bound memory.
+"""
+
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+from prometheus_client import Counter
+from xxhash import xxh3_128_hexdigest
+
+lookups = Counter(
+    "search_cache_lookups",
+    "Number of doc search result cache lookups, by search kind and result",
+    labelnames=("kind", "result"),
+)
+
+
+def search_cache_key(
+    kind: str,
+    developer_id: Any,
+    owners: list[tuple[str, Any, int]],
+    params: dict[str, Any],
+) -> str:
+    """
+    Cache key of a search of `kind` over the `(owner_type, owner_id, generation)`
+    owners, with the other search parameters (query, k, filters, ...) in `params`.
+    """
+    params = dict(params)
+
+    # Hashed as float32, which is what the search compares anyway
+    if (embedding := params.pop("query_embedding", None)) is not None:
+        params["query_embedding"] = xxh3_128_hexdigest(array("f", embedding).tobytes())
+
+    body = json.dumps(
+        [kind, str(developer_id), sorted(map(list, owners), key=str), params],
+        sort_keys=True,
+        default=str,
+    )
+
+    return f"{kind}:{xxh3_128_hexdigest(body.encode())}"
+
+
+class SearchResultCache:
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list | None:
+        with self._lock:
+            expires_at, results = self._entries.get(key, (0.0, None))
+
+            if expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+
+            self._entries.move_to_end(key)
+            return results
+
+    def put(self, key: str, results: list) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, results)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
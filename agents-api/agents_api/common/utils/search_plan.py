@@ -0,0 +1,83 @@
+"""
+This module picks the strategy of embedding searches from the (cached) doc
+statistics of the owners being searched, instead of counting their snippets
+in every search query.
+"""
+
+import json
+import logging
+import math
+from typing import Literal, NamedTuple
+
+from .corpus_stats import CorpusStats
+
+search_planner_logger = logging.getLogger("agents_api.search_planner")
+
+# The HNSW index covers the snippets of all owners and is filtered by owner
+# afterwards, so small owners need more neighbours to be fetched. Both the
+# neighbours and the candidates explored are capped to bound the query cost.
+MAX_ANN_CANDIDATES = 1000
+
+
+class SearchPlan(NamedTuple):
+    # "empty": nothing to search, "knn": exact scan, "ann": HNSW index search
+    strategy: Literal["empty", "knn", "ann"]
+    k: int
+    ef: int
+    radius: float
+
+
+def plan_embedding_search(
+    owner_stats: CorpusStats,
+    total_stats: CorpusStats,
+    *,
+    k: int,
+    confidence: float,
+    ef: int,
+    ann_threshold: int,
+) -> SearchPlan:
+    """
+    Plans an embedding search over the snippets of some owners (`owner_stats`),
+    out of the snippets of all the owners (`total_stats`).
+
+    Owners with at most `ann_threshold` snippets are scanned exactly. Larger
+    ones are searched with the HNSW index, fetching more neighbours the smaller
+    their share of the index is (so that about `k` of them are theirs), and
+    exploring more candidates as the index grows.
+    """
+
+    radius = 1.0 - confidence
+    owner_snippets = owner_stats.snippet_count
+
+    if owner_snippets == 0:
+        return SearchPlan("empty", k, ef, radius)
+
+    if owner_snippets <= ann_threshold:
+        return SearchPlan("knn", k, ef, radius)
+
+    total_snippets = max(total_stats.snippet_count, owner_snippets)
+
+    ann_k = min(math.ceil(k * total_snippets / owner_snippets), MAX_ANN_CANDIDATES)
+    ann_ef = min(
+        max(ef, 2 * ann_k, math.ceil(16 * math.log2(total_snippets))),
+        MAX_ANN_CANDIDATES,
+    )
+
+    return SearchPlan("ann", max(ann_k, k), max(ann_ef, ann_k), radius)
+
+
+def log_search_plan(
+    plan: SearchPlan, owner_stats: CorpusStats, total_stats: CorpusStats
+) -> None:
+    search_planner_logger.info(
+        json.dumps(
+            {
+                "strategy": plan.strategy,
+                "k": plan.k,
+                "ef": plan.ef,
+                "radius": round(plan.radius, 6),
+                "owner_snippets": owner_stats.snippet_count,
+                "total_snippets": total_stats.snippet_count,
+            }
+        )
+    )
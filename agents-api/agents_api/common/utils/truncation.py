@@ -0,0 +1,120 @@
+"""
+This module packs chat prompts into a token budget, keeping the system
+messages, the new messages and as many of the most recent history entries
+as fit. Entries are counted once, when they are saved (see the `token_count`
+and `tokenizer` columns of `entries`), so only the messages of the request
+itself are tokenized here.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+from uuid import UUID
+
+from litellm.utils import _select_tokenizer as select_tokenizer
+from litellm.utils import token_counter
+
+from ...exceptions import PromptTooBigError
+from ...model_registry import get_context_window
+
+
+@lru_cache(maxsize=64)
+def get_tokenizer(model: str) -> dict:
+    """
+    Returns the litellm tokenizer of `model`, `{"type": ..., "tokenizer": ...}`,
+    loading it only once per model.
+    """
+    return select_tokenizer(model=model)
+
+
+def count_message_tokens(model: str, message: dict) -> int:
+    """
+    Number of tokens of a chat message for `model`, reusing its `token_count`
+    if it was counted with the same tokenizer.
+    """
+    tokenizer = get_tokenizer(model)
+
+    if (
+        message.get("token_count") is not None
+        and message.get("tokenizer") == tokenizer["type"]
+    ):
+        return message["token_count"]
+
+    return token_counter(
+        model=model,
+        custom_tokenizer=tokenizer,
+        messages=[
+            {
+                "role": message["role"],
+                "content": message["content"],
+                "name": message.get("name"),
+            }
+        ],
+    )
+
+
+def get_token_budget(
+    model: str, *, token_budget: int | None = None, max_tokens: int | None = None
+) -> int | None:
+    """
+    Number of prompt tokens available for a chat with `model`: the session's
+    `token_budget` if set, otherwise the context window of the model minus the
+    `max_tokens` reserved for the completion. None if the model is unknown.
+    """
+    if token_budget:
+        return token_budget
+
+    if (context_window := get_context_window(model)) is None:
+        return None
+
+    return context_window - (max_tokens or 0)
+
+
+class PackedMessages(NamedTuple):
+    # The history entries that fit in the budget, in their original order
+    past_messages: list[dict]
+    # The ids of the entries left out, oldest first
+    truncated_entries: list[UUID]
+    prompt_tokens: int
+
+
+def pack_messages(
+    model: str,
+    *,
+    system_messages: list[dict],
+    past_messages: list[dict],
+    new_messages: list[dict],
+    token_budget: int,
+) -> PackedMessages:
+    """
+    Fits the messages of a chat in `token_budget` tokens by leaving out the
+    oldest history entries. The history kept is always contiguous, so an older
+    entry is never sent without the entries that followed it.
+
+    Raises:
+        PromptTooBigError: If the system and new messages alone exceed the budget.
+    """
+    prompt_tokens = sum(
+        count_message_tokens(model, message)
+        for message in system_messages + new_messages
+    )
+
+    if prompt_tokens > token_budget:
+        raise PromptTooBigError(prompt_tokens, token_budget)
+
+    kept = 0
+    for message in reversed(past_messages):
+        token_count = count_message_tokens(model, message)
+
+        if prompt_tokens + token_count > token_budget:
+            break
+
+        prompt_tokens += token_count
+        kept += 1
+
+    split = len(past_messages) - kept
+
+    return PackedMessages(
+        past_messages=past_messages[split:],
+        truncated_entries=[message["id"] for message in past_messages[:split]],
+        prompt_tokens=prompt_tokens,
+    )
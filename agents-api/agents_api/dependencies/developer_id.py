@@ -36,7 +36,9 @@ async def get_developer_data(
         assert (
             not x_developer_id
         ), "X-Developer-Id header not allowed in multi-tenant mode"
-        return get_developer(developer_id=UUID("00000000-0000-0000-0000-000000000000"))
+        return await get_developer.load(
+            developer_id=UUID("00000000-0000-0000-0000-000000000000")
+        )
 
     if not x_developer_id:
         raise InvalidHeaderFormat("X-Developer-Id header required")
@@ -47,6 +49,6 @@ async def get_developer_data(
         except ValueError as e:
             raise InvalidHeaderFormat("X-Developer-Id must be a valid UUID") from e
 
-    developer = get_developer(developer_id=x_developer_id)
+    developer = await get_developer.load(developer_id=x_developer_id)
 
     return developer
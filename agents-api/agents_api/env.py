@@ -57,6 +57,47 @@ do_verify_developer_owns_resource: bool = env.bool(
     "DO_VERIFY_DEVELOPER_OWNS_RESOURCE", default=True
 )
 
+# Developer / ownership checks that passed are cached for this many seconds (0 disables)
+verification_cache_ttl: float = env.float("VERIFICATION_CACHE_TTL", default=30.0)
+verification_cache_size: int = env.int("VERIFICATION_CACHE_SIZE", default=10_000)
+
+# Pooled transport for the async Cozo client
+cozo_max_connections: int = env.int("COZO_MAX_CONNECTIONS", default=100)
+cozo_max_keepalive_connections: int = env.int(
+    "COZO_MAX_KEEPALIVE_CONNECTIONS", default=20
+)
+cozo_keepalive_expiry: float = env.float("COZO_KEEPALIVE_EXPIRY", default=30.0)
+cozo_query_timeout: float = env.float("COZO_QUERY_TIMEOUT", default=30.0)
+
+# Read replicas; read-only queries go to the least loaded healthy one, while
+# writes (and reads by a developer who wrote recently) stay on the primary
+cozo_read_hosts: list[str] = env.list("COZO_READ_HOSTS", default=[])
+cozo_read_health_interval: float = env.float("COZO_READ_HEALTH_INTERVAL", default=5.0)
+cozo_read_your_writes_window: float = env.float(
+    "COZO_READ_YOUR_WRITES_WINDOW", default=5.0
+)
+
+# Adaptive limit on in-flight Cozo queries, lowered on "busy" errors and raised
+# while queries complete within the latency target
+cozo_concurrency_initial: int = env.int("COZO_CONCURRENCY_INITIAL", default=32)
+cozo_concurrency_min: int = env.int("COZO_CONCURRENCY_MIN", default=4)
+cozo_concurrency_max: int = env.int(
+    "COZO_CONCURRENCY_MAX", default=cozo_max_connections
+)
+cozo_queue_size: int = env.int("COZO_QUEUE_SIZE", default=1_000)
+cozo_queue_timeout: float = env.float("COZO_QUEUE_TIMEOUT", default=5.0)
+cozo_latency_target: float = env.float("COZO_LATENCY_TARGET", default=0.5)
+
+# Point lookups (get_agent, get_user, ...) issued within this window are coalesced
+query_batch_window: float = env.float("QUERY_BATCH_WINDOW", default=0.002)
+query_batch_max_size: int = env.int("QUERY_BATCH_MAX_SIZE", default=100)
+
+# Queries slower than this many seconds (not milliseconds, e.g. 0.25) are written to
+# the slow-query log, along with Cozo's `::explain` plan if enabled (costs an extra
+# round-trip per slow query). 0 disables the log
+slow_query_threshold: float = env.float("SLOW_QUERY_THRESHOLD", default=1.0)
+slow_query_explain: bool = env.bool("SLOW_QUERY_EXPLAIN", default=False)
+
 
 # Auth
 # ----
@@ -83,6 +124,60 @@ embedding_model_id: str = env.str(
 
 embedding_dimensions: int = env.int("EMBEDDING_DIMENSIONS", default=1024)
 
+# Embeddings are cached in memory by (model, dimensions, text), and optionally
+# shared between instances through the blob store
+embedding_cache_size: int = env.int("EMBEDDING_CACHE_SIZE", default=10_000)
+embedding_cache_use_blob_store: bool = env.bool(
+    "EMBEDDING_CACHE_USE_BLOB_STORE", default=False
+)
+
+# Snippets embedded by concurrent `embed_docs` activities are sent in shared
+# batches, flushed when full or after the max wait (in seconds)
+embedding_batch_size: int = env.int("EMBEDDING_BATCH_SIZE", default=100)
+embedding_batch_max_wait: float = env.float("EMBEDDING_BATCH_MAX_WAIT", default=0.05)
+
+# Embedding searches scan the snippets of owners with at most this many
+# snippets exactly, and use the HNSW (ANN) index for larger owners
+embedding_search_ann_threshold: int = env.int(
+    "EMBEDDING_SEARCH_ANN_THRESHOLD", default=100_000
+)
+
+# The exact scans can shortlist candidates using quantized ("int8" or
+# "binary") embeddings, then rank `k * rerank factor` of them exactly
+embedding_quantization: str = env.str("EMBEDDING_QUANTIZATION", default="none")
+quantized_search_rerank_factor: int = env.int(
+    "QUANTIZED_SEARCH_RERANK_FACTOR", default=4
+)
+
+# Snippet counts of the doc owners, used to plan the embedding searches, are
+# cached in memory for up to this many seconds
+corpus_stats_ttl: float = env.float("CORPUS_STATS_TTL", default=60.0)
+corpus_stats_cache_size: int = env.int("CORPUS_STATS_CACHE_SIZE", default=10_000)
+
+# Doc search results are cached in memory, keyed by the search parameters and
+# the doc generations of the owners (so changes to their docs invalidate them),
+# for up to this many seconds (0 disables)
+search_cache_ttl: float = env.float("SEARCH_CACHE_TTL", default=300.0)
+search_cache_size: int = env.int("SEARCH_CACHE_SIZE", default=1000)
+
+# Text search queries are built with spaCy in this many worker processes (0
+# runs it in a thread instead), and cached by normalized text. With warm-up,
+# the pipeline and the workers are loaded at startup instead of on first use.
+nlp_process_pool_size: int = env.int("NLP_PROCESS_POOL_SIZE", default=2)
+nlp_query_cache_size: int = env.int("NLP_QUERY_CACHE_SIZE", default=10_000)
+nlp_warm_up: bool = env.bool("NLP_WARM_UP", default=False)
+
+# Docs uploaded in bulk are written (and queued for embedding) in chunks of this size
+bulk_ingest_chunk_size: int = env.int("BULK_INGEST_CHUNK_SIZE", default=500)
+
+# Doc content is split into snippets of at most this many tokens, at sentence
+# boundaries, with up to `doc_chunk_overlap_tokens` tokens shared by neighbours
+doc_chunk_max_tokens: int = env.int("DOC_CHUNK_MAX_TOKENS", default=500)
+doc_chunk_overlap_tokens: int = env.int("DOC_CHUNK_OVERLAP_TOKENS", default=50)
+
+# Chats load at most this many of the latest entries of the session history
+chat_history_window: int = env.int("CHAT_HISTORY_WINDOW", default=1000)
+
 
 # Integration service
 # -------------------
@@ -107,6 +202,11 @@ environment: Dict[str, Any] = dict(
     multi_tenant_mode=multi_tenant_mode,
     cozo_host=cozo_host,
     cozo_auth=cozo_auth,
+    cozo_max_connections=cozo_max_connections,
+    cozo_query_timeout=cozo_query_timeout,
+    cozo_concurrency_max=cozo_concurrency_max,
+    cozo_read_hosts=cozo_read_hosts,
+    slow_query_threshold=slow_query_threshold,
     sentry_dsn=sentry_dsn,
     temporal_endpoint=temporal_endpoint,
     temporal_task_queue=temporal_task_queue,
@@ -110,3 +110,23 @@ OLLAMA_MODELS: Dict[str, int] = {
 }
 
 CHAT_MODELS: Dict[str, int] = {**GPT4_MODELS, **TURBO_MODELS, **CLAUDE_MODELS}
+
+CONTEXT_WINDOWS: Dict[str, int] = {
+    **OPENAI_MODELS,
+    **DISCONTINUED_MODELS,
+    **CLAUDE_MODELS,
+    **OLLAMA_MODELS,
+    **LOCAL_MODELS,
+}
+
+
+def get_context_window(model: str) -> int | None:
+    """
+    Returns the number of tokens in the context window of `model` (optionally
+    prefixed with its provider, e.g. `openai/gpt-4`), or None if it is unknown.
+    """
+    if model in CONTEXT_WINDOWS:
+        return CONTEXT_WINDOWS[model]
+
+    _, _, name = model.partition("/")
+    return CONTEXT_WINDOWS.get(name)
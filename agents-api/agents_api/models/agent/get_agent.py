@@ -8,7 +8,9 @@ from pydantic import ValidationError
 
 from ...autogen.openapi_model import Agent
 from ..utils import (
+    coalesce_lookups,
     cozo_query,
+    cozo_query_async,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -20,6 +22,81 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_agents_by_keys(*, keys: list[list[str]]) -> tuple[str, dict]:
+    """
+    Fetches several agents at once. Used to coalesce concurrent `get_agent`
+    lookups; `keys` is a list of `[developer_id, agent_id]` pairs and agents
+    not owned by the given developer are simply missing from the result.
+    """
+    get_query = """
+        input[developer_id_str, agent_id_str] <- $keys
+
+        ?[
+            developer_id,
+            id,
+            model,
+            name,
+            about,
+            created_at,
+            updated_at,
+            metadata,
+            default_settings,
+            instructions,
+        ] := input[developer_id_str, agent_id_str],
+            developer_id = to_uuid(developer_id_str),
+            id = to_uuid(agent_id_str),
+            *agents {
+                developer_id,
+                agent_id: id,
+                model,
+                name,
+                about,
+                created_at,
+                updated_at,
+                metadata,
+                instructions,
+            },
+            *agent_default_settings {
+                agent_id: id,
+                frequency_penalty,
+                presence_penalty,
+                length_penalty,
+                repetition_penalty,
+                top_p,
+                temperature,
+                min_p,
+                preset,
+            },
+            default_settings = {
+                "frequency_penalty": frequency_penalty,
+                "presence_penalty": presence_penalty,
+                "length_penalty": length_penalty,
+                "repetition_penalty": repetition_penalty,
+                "top_p": top_p,
+                "temperature": temperature,
+                "min_p": min_p,
+                "preset": preset,
+            }
+    """
+
+    return (get_query, {"keys": keys})
+
+
+@coalesce_lookups(
+    get_agents_by_keys,
+    keys={"developer_id": "developer_id", "agent_id": "id"},
+    cls=Agent,
+    not_found=partialclass(
+        HTTPException, status_code=404, detail="Developer does not own resource"
+    ),
+)
 @rewrap_exceptions(
     {
         lambda e: isinstance(e, QueryException)
@@ -37,7 +114,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(Agent, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_agent(*, developer_id: UUID, agent_id: UUID) -> tuple[list[str], dict]:
     """
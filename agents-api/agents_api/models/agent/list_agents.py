@@ -7,10 +7,16 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.openapi_model import Agent
-from ...common.utils import json
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     wrap_in_class,
@@ -20,49 +26,15 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
-@rewrap_exceptions(
-    {
-        QueryException: partialclass(HTTPException, status_code=400),
-        ValidationError: partialclass(HTTPException, status_code=400),
-        TypeError: partialclass(HTTPException, status_code=400),
-    }
-)
-@wrap_in_class(Agent)
-@cozo_query
-@beartype
-def list_agents(
-    *,
-    developer_id: UUID,
-    limit: int = 100,
-    offset: int = 0,
-    sort_by: Literal["created_at", "updated_at"] = "created_at",
-    direction: Literal["asc", "desc"] = "desc",
-    metadata_filter: dict[str, Any] = {},
-) -> tuple[list[str], dict]:
-    """
-    Constructs and executes a datalog query to list agents from the 'cozodb' database.
-
-    Parameters:
-        developer_id: UUID of the developer.
-        limit: Maximum number of agents to return.
-        offset: Number of agents to skip before starting to collect the result set.
-        metadata_filter: Dictionary to filter agents based on metadata.
-        client: Instance of CozoClient to execute the query.
-    """
-    # Transforms the metadata_filter dictionary into a string representation for the datalog query.
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
-    )
-
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
+@query_template
+def list_agents_query(
+    metadata_filter_keys: tuple[str, ...],
+    sort_by: str,
+    direction: str,
+    keyset: bool = False,
+) -> str:
     # Datalog query to retrieve agent information based on filters, sorted by creation date in descending order.
-    queries = [
-        verify_developer_id_query(developer_id),
-        f"""
+    return f"""
         input[developer_id] <- [[to_uuid($developer_id)]]
 
         ?[
@@ -75,6 +47,8 @@ def list_agents(
             metadata,
             default_settings,
             instructions,
+            keyset_sort,
+            keyset_id,
         ] := input[developer_id],
             *agents {{
                 developer_id,
@@ -108,15 +82,65 @@ def list_agents(
                 "min_p": min_p,
                 "preset": preset,
             }},
-            {metadata_filter_str}
+            {keyset_query(sort_by)}
+            {keyset_filter_query(sort_by, direction) if keyset else ""}
+            {metadata_filter_query(metadata_filter_keys)}
         
         :limit $limit
         :offset $offset
-        :sort {sort}
-        """,
+        :sort {keyset_sort(sort_by, direction)}
+        """
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(Agent)
+@cozo_query(readonly=True)
+@beartype
+def list_agents(
+    *,
+    developer_id: UUID,
+    limit: int = 100,
+    offset: int = 0,
+    sort_by: Literal["created_at", "updated_at"] = "created_at",
+    direction: Literal["asc", "desc"] = "desc",
+    metadata_filter: dict[str, Any] = {},
+    cursor: str | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Constructs and executes a datalog query to list agents from the 'cozodb' database.
+
+    Parameters:
+        developer_id: UUID of the developer.
+        limit: Maximum number of agents to return.
+        offset: Number of agents to skip before starting to collect the result set.
+        metadata_filter: Dictionary to filter agents based on metadata.
+        cursor: Opaque cursor returned with the previous page, to continue after it.
+        client: Instance of CozoClient to execute the query.
+    """
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
+    )
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        list_agents_query(
+            metadata_filter_keys, sort_by, direction, keyset=cursor is not None
+        ),
     ]
 
     return (
         queries,
-        {"developer_id": str(developer_id), "limit": limit, "offset": offset},
+        {
+            "developer_id": str(developer_id),
+            "limit": limit,
+            "offset": offset,
+            **metadata_filter_vars,
+            **keyset_variables(cursor, sort_by, direction),
+        },
     )
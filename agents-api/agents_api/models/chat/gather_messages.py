@@ -7,12 +7,13 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.Chat import ChatInput
-from ...autogen.openapi_model import DocReference, History
+from ...autogen.openapi_model import DocReference, Entry
 from ...clients import litellm
 from ...common.protocol.developers import Developer
 from ...common.protocol.sessions import ChatContext
+from ...env import chat_history_window
 from ..docs.search_docs_hybrid import search_docs_hybrid
-from ..entry.get_history import get_history
+from ..entry.get_recent_entries import get_recent_entries
 from ..utils import (
     partialclass,
     rewrap_exceptions,
@@ -41,20 +42,15 @@ async def gather_messages(
 
     assert len(new_raw_messages) > 0
 
-    # Get the session history
-    history: History = get_history(
+    # Get the latest leaf entries of the session history
+    entries: list[Entry] = get_recent_entries(
         developer_id=developer.id,
         session_id=session_id,
         allowed_sources=["api_request", "api_response", "tool_response", "summarizer"],
+        limit=chat_history_window,
     )
 
-    # Keep leaf nodes only
-    relations = history.relations
-    past_messages = [
-        entry.model_dump()
-        for entry in history.entries
-        if entry.id not in {r.head for r in relations}
-    ]
+    past_messages = [entry.model_dump() for entry in entries]
 
     if not recall:
         return past_messages, []
@@ -75,7 +71,7 @@ async def gather_messages(
     user_ids = [user.id for user in chat_context.users]
     owners = [("user", user_id) for user_id in user_ids] + [("agent", active_agent_id)]
 
-    doc_references: list[DocReference] = search_docs_hybrid(
+    doc_references: list[DocReference] = await search_docs_hybrid(
         developer_id=developer.id,
         owners=owners,
         query=query_text,
@@ -3,7 +3,7 @@ from beartype import beartype
 from ..utils import cozo_query
 
 
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_cached_response(key: str) -> tuple[str, dict]:
     query = """
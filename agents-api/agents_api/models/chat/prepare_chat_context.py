@@ -10,7 +10,6 @@ from ...common.protocol.sessions import ChatContext, make_session
 from ..session.prepare_session_data import prepare_session_data
 from ..utils import (
     cozo_query,
-    fix_uuid_if_present,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -47,14 +46,14 @@ T = TypeVar("T")
                         tool["type"]: tool.pop("spec"),
                         **tool,
                     }
-                    for tool in map(fix_uuid_if_present, ts["tools"])
+                    for tool in ts["tools"]
                 ],
             }
             for ts in d["toolsets"]
         ],
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def prepare_chat_context(
     *,
@@ -10,7 +10,9 @@ from pydantic import ValidationError
 
 from ...common.protocol.developers import Developer
 from ..utils import (
+    coalesce_lookups,
     cozo_query,
+    cozo_query_async,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -22,7 +24,7 @@ T = TypeVar("T")
 
 
 @rewrap_exceptions({QueryException: partialclass(HTTPException, status_code=401)})
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def verify_developer(
     *,
@@ -31,6 +33,52 @@ def verify_developer(
     return (verify_developer_id_query(developer_id), {})
 
 
+@rewrap_exceptions({QueryException: partialclass(HTTPException, status_code=403)})
+@cozo_query_async(readonly=True)
+@beartype
+def get_developers_by_keys(*, keys: list[list[str]]) -> tuple[str, dict]:
+    """
+    Fetches several developers at once. Used to coalesce concurrent
+    `get_developer` lookups (one per request); `keys` is a list of
+    `[developer_id]` singletons.
+    """
+    query = """
+        input[developer_id] := keys[developer_id_str], developer_id = to_uuid(developer_id_str)
+        keys[developer_id_str] <- $keys
+
+        ?[
+            developer_id,
+            email,
+            active,
+            tags,
+            settings,
+            created_at,
+            updated_at,
+        ] :=
+            input[developer_id],
+            *developers {
+                developer_id,
+                email,
+                active,
+                tags,
+                settings,
+                created_at,
+                updated_at,
+            }
+    """
+
+    return (query, {"keys": keys})
+
+
+@coalesce_lookups(
+    get_developers_by_keys,
+    keys={"developer_id": "developer_id"},
+    cls=Developer,
+    transform=lambda d: {**d, "id": d["developer_id"]},
+    not_found=partialclass(
+        HTTPException, status_code=403, detail="Developer does not exist"
+    ),
+)
 @rewrap_exceptions(
     {
         QueryException: partialclass(HTTPException, status_code=403),
@@ -38,7 +86,7 @@ def verify_developer(
     }
 )
 @wrap_in_class(Developer, one=True, transform=lambda d: {**d, "id": d["developer_id"]})
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_developer(
     *,
@@ -17,9 +17,15 @@ This documentation aims to provide clear, concise, and sufficient context for ne
 # ruff: noqa: F401, F403, F405
 
 from .create_doc import create_doc
+from .create_docs import create_docs
 from .delete_doc import delete_doc
 from .embed_snippets import embed_snippets
 from .get_doc import get_doc
+from .get_owner_doc_stats import get_owner_doc_stats
+from .get_snippet_codes import get_snippet_codes
+from .get_snippet_embeddings import get_snippet_embeddings
+from .get_snippets import get_snippets
 from .list_docs import list_docs
 from .search_docs_by_embedding import search_docs_by_embedding
+from .search_docs_by_quantized_embedding import search_docs_by_quantized_embedding
 from .search_docs_by_text import search_docs_by_text
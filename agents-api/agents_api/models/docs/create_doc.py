@@ -7,12 +7,16 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.openapi_model import CreateDocRequest, Doc
+from ...common.utils.chunking import Chunk, chunk_content
 from ...common.utils.cozo import cozo_process_mutate_data
+from ...env import doc_chunk_max_tokens, doc_chunk_overlap_tokens
 from ...metrics.counters import increase_counter
 from ..utils import (
+    bump_owner_doc_generation_query,
     cozo_query,
     partialclass,
     rewrap_exceptions,
+    update_owner_doc_stats_query,
     verify_developer_id_query,
     verify_developer_owns_resource_query,
     wrap_in_class,
@@ -47,6 +51,7 @@ def create_doc(
     owner_id: UUID,
     doc_id: UUID | None = None,
     data: CreateDocRequest,
+    chunks: list[Chunk] | None = None,
 ) -> tuple[list[str], dict]:
     """
     Constructs and executes a datalog query to create a new document and its associated snippets in the 'cozodb' database.
@@ -55,7 +60,8 @@ def create_doc(
         owner_type (Literal["user", "agent"]): The type of the owner of the document.
         owner_id (UUID): The UUID of the document owner.
         doc_id (UUID): The UUID of the document to be created.
-        data (CreateDocRequest): The content of the document.
+        data (CreateDocRequest): The content of the document, split into snippets of at most `DOC_CHUNK_MAX_TOKENS` tokens.
+        chunks (list[Chunk]): The snippets of the content, if already split (e.g. with `chunk_content_async`, off the event loop).
     """
 
     doc_id = str(doc_id or uuid4())
@@ -77,18 +83,39 @@ def create_doc(
     doc_cols, doc_rows = cozo_process_mutate_data(doc_data)
 
     snippet_cols, snippet_rows = "", []
+    chunk_cols, chunk_rows = "", []
+
+    # Split the content into snippets (unless already done) and prepare data
+    # for the datalog query.
+    if chunks is None:
+        chunks = chunk_content(
+            content,
+            max_tokens=doc_chunk_max_tokens,
+            overlap_tokens=doc_chunk_overlap_tokens,
+        )
 
-    # Process each content snippet and prepare data for the datalog query.
-    for snippet_idx, snippet in enumerate(content):
+    for snippet_idx, chunk in enumerate(chunks):
         snippet_cols, new_snippet_rows = cozo_process_mutate_data(
             dict(
                 doc_id=doc_id,
                 index=snippet_idx,
-                content=snippet,
+                content=chunk.content,
+            )
+        )
+
+        chunk_cols, new_chunk_rows = cozo_process_mutate_data(
+            dict(
+                doc_id=doc_id,
+                index=snippet_idx,
+                source_index=chunk.source_index,
+                start_char=chunk.start_char,
+                end_char=chunk.end_char,
+                token_count=chunk.token_count,
             )
         )
 
         snippet_rows += new_snippet_rows
+        chunk_rows += new_chunk_rows
 
     create_snippets_query = f"""
         ?[{snippet_cols}] <- $snippet_rows
@@ -100,6 +127,11 @@ def create_doc(
         :returning
     """
 
+    create_chunks_query = f"""
+        ?[{chunk_cols}] <- $chunk_rows
+        :insert snippet_chunks {{ {chunk_cols} }}
+    """
+
     # Construct the datalog query for creating the document and its snippets.
     create_doc_query = f"""
         ?[{doc_cols}] <- $doc_rows
@@ -127,6 +159,11 @@ def create_doc(
             developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
         ),
         create_snippets_query,
+        create_chunks_query,
+        update_owner_doc_stats_query(
+            owner_type, owner_id, docs_added=1, snippets_added=len(snippet_rows)
+        ),
+        bump_owner_doc_generation_query(owner_type, owner_id),
         create_doc_query,
     ]
 
@@ -136,5 +173,6 @@ def create_doc(
         {
             "doc_rows": doc_rows,
             "snippet_rows": snippet_rows,
+            "chunk_rows": chunk_rows,
         },
     )
@@ -0,0 +1,188 @@
+from typing import Any, Literal, TypeVar
+from uuid import UUID, uuid4
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ...autogen.openapi_model import CreateDocRequest, Doc
+from ...common.utils.chunking import Chunk, chunk_content
+from ...common.utils.cozo import cozo_process_mutate_data
+from ...env import doc_chunk_max_tokens, doc_chunk_overlap_tokens
+from ...metrics.counters import increase_counter
+from ..utils import (
+    bump_owner_doc_generation_query,
+    cozo_query_async,
+    partialclass,
+    rewrap_exceptions,
+    update_owner_doc_stats_query,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+    wrap_in_class,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(
+    Doc,
+    transform=lambda d: {
+        "id": d["doc_id"],
+        "content": [s[1] for s in sorted(d["snippet_data"], key=lambda x: x[0])],
+        **d,
+    },
+)
+@cozo_query_async
+@increase_counter("create_docs")
+@beartype
+def create_docs(
+    *,
+    developer_id: UUID,
+    owner_type: Literal["user", "agent"],
+    owner_id: UUID,
+    doc_ids: list[UUID] | None = None,
+    data: list[CreateDocRequest],
+    chunks: list[list[Chunk]] | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Constructs and executes a datalog query to create several documents and their snippets in a single transaction.
+
+    Parameters:
+        owner_type (Literal["user", "agent"]): The type of the owner of the documents.
+        owner_id (UUID): The UUID of the documents owner.
+        doc_ids (list[UUID]): The UUIDs of the documents to be created, in the same order as `data`.
+        data (list[CreateDocRequest]): The contents of the documents, split into snippets of at most `DOC_CHUNK_MAX_TOKENS` tokens.
+        chunks (list[list[Chunk]]): The snippets of each of the documents, if already split (e.g. with `chunk_content_async`, off the event loop).
+    """
+
+    doc_ids = [str(doc_id) for doc_id in doc_ids or [uuid4() for _ in data]]
+    owner_id = str(owner_id)
+
+    if len(doc_ids) != len(data):
+        raise TypeError("Expected one doc id per document")
+
+    if chunks is not None and len(chunks) != len(data):
+        raise TypeError("Expected the chunks of every document")
+
+    docs, snippets, chunk_data = [], [], []
+
+    for i, (doc_id, doc) in enumerate(zip(doc_ids, data)):
+        content = [doc.content] if isinstance(doc.content, str) else doc.content
+
+        docs.append(
+            dict(
+                owner_type=owner_type,
+                owner_id=owner_id,
+                doc_id=doc_id,
+                title=doc.title,
+                metadata=doc.metadata or {},
+            )
+        )
+
+        doc_chunks = (
+            chunks[i]
+            if chunks is not None
+            else chunk_content(
+                content,
+                max_tokens=doc_chunk_max_tokens,
+                overlap_tokens=doc_chunk_overlap_tokens,
+            )
+        )
+
+        for snippet_idx, chunk in enumerate(doc_chunks):
+            snippets.append(
+                dict(doc_id=doc_id, index=snippet_idx, content=chunk.content)
+            )
+            chunk_data.append(
+                dict(
+                    doc_id=doc_id,
+                    index=snippet_idx,
+                    source_index=chunk.source_index,
+                    start_char=chunk.start_char,
+                    end_char=chunk.end_char,
+                    token_count=chunk.token_count,
+                )
+            )
+
+    doc_cols, doc_rows = cozo_process_mutate_data(docs)
+    snippet_cols, snippet_rows = cozo_process_mutate_data(snippets)
+    chunk_cols, chunk_rows = cozo_process_mutate_data(chunk_data)
+
+    create_snippets_query = f"""
+        ?[{snippet_cols}] <- $snippet_rows
+        :insert snippets {{ {snippet_cols} }}
+    """
+
+    create_chunks_query = f"""
+        ?[{chunk_cols}] <- $chunk_rows
+        :insert snippet_chunks {{ {chunk_cols} }}
+    """
+
+    create_docs_query = f"""
+        ?[{doc_cols}] <- $doc_rows
+        :insert docs {{ {doc_cols} }}
+    """
+
+    # Read back the new documents, with their snippets and creation times
+    created_docs_query = """
+        input[raw_doc_id] <- $doc_ids
+
+        snippets[doc_id, collect(snippet_data)] :=
+            input[raw_doc_id],
+            doc_id = to_uuid(raw_doc_id),
+            *snippets {
+                doc_id,
+                index,
+                content,
+            },
+            snippet_data = [index, content]
+
+        ?[doc_id, title, snippet_data, created_at, metadata] :=
+            input[raw_doc_id],
+            doc_id = to_uuid(raw_doc_id),
+            *docs {
+                owner_type: $owner_type,
+                owner_id: to_uuid($owner_id),
+                doc_id,
+                title,
+                created_at,
+                metadata,
+            },
+            snippets[doc_id, snippet_data]
+    """
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        verify_developer_owns_resource_query(
+            developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
+        ),
+        create_snippets_query,
+        create_chunks_query,
+        create_docs_query,
+        update_owner_doc_stats_query(
+            owner_type, owner_id, docs_added=len(docs), snippets_added=len(snippets)
+        ),
+        bump_owner_doc_generation_query(owner_type, owner_id),
+        created_docs_query,
+    ]
+
+    return (
+        queries,
+        {
+            "doc_rows": doc_rows,
+            "snippet_rows": snippet_rows,
+            "chunk_rows": chunk_rows,
+            "doc_ids": [[doc_id] for doc_id in doc_ids],
+            "owner_type": owner_type,
+            "owner_id": owner_id,
+        },
+    )
@@ -9,9 +9,11 @@ from pydantic import ValidationError
 from ...autogen.openapi_model import ResourceDeletedResponse
 from ...common.utils.datetime import utcnow
 from ..utils import (
+    bump_owner_doc_generation_query,
     cozo_query,
     partialclass,
     rewrap_exceptions,
+    update_owner_doc_stats_query,
     verify_developer_id_query,
     verify_developer_owns_resource_query,
     wrap_in_class,
@@ -82,6 +84,52 @@ def delete_doc(
         }
     """
 
+    delete_chunks_query = """
+        # Delete the chunk metadata of the snippets
+        input[doc_id] <- [[to_uuid($doc_id)]]
+        ?[doc_id, index] :=
+            input[doc_id],
+            *snippet_chunks {
+                doc_id,
+                index,
+            }
+
+        :delete snippet_chunks {
+            doc_id,
+            index
+        }
+    """
+
+    delete_codes_query = """
+        # Delete the quantized embeddings of the snippets
+        input[doc_id] <- [[to_uuid($doc_id)]]
+        ?[doc_id, index] :=
+            input[doc_id],
+            *snippet_codes {
+                doc_id,
+                index,
+            }
+
+        :delete snippet_codes {
+            doc_id,
+            index
+        }
+    """
+
+    delete_fingerprints_query = """
+        # Delete the fingerprints of the snippets, so they are not reused
+        ?[developer_id, fingerprint] :=
+            developer_id = to_uuid($developer_id),
+            *snippet_fingerprints {
+                developer_id,
+                fingerprint,
+                doc_id,
+            },
+            doc_id = to_uuid($doc_id)
+
+        :rm snippet_fingerprints { developer_id, fingerprint }
+    """
+
     delete_doc_query = """
         # Delete the docs
         ?[doc_id, owner_type, owner_id] <- [[ to_uuid($doc_id), $owner_type, to_uuid($owner_id) ]]
@@ -95,8 +143,22 @@ def delete_doc(
         verify_developer_owns_resource_query(
             developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
         ),
+        # Must run before the snippets are deleted, to count them
+        update_owner_doc_stats_query(owner_type, owner_id, deleted_doc_id=doc_id),
+        bump_owner_doc_generation_query(owner_type, owner_id),
         delete_snippets_query,
+        delete_chunks_query,
+        delete_codes_query,
+        delete_fingerprints_query,
         delete_doc_query,
     ]
 
-    return (queries, {"doc_id": doc_id, "owner_type": owner_type, "owner_id": owner_id})
+    return (
+        queries,
+        {
+            "developer_id": str(developer_id),
+            "doc_id": doc_id,
+            "owner_type": owner_type,
+            "owner_id": owner_id,
+        },
+    )
@@ -11,8 +11,10 @@ from pydantic import ValidationError
 from ...autogen.openapi_model import ResourceUpdatedResponse
 from ...common.utils.cozo import cozo_process_mutate_data
 from ...common.utils.datetime import utcnow
+from ...common.utils.quantization import encode_code, quantize_binary, quantize_int8
 from ..utils import (
-    cozo_query,
+    bump_owner_doc_generation_query,
+    cozo_query_async,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -36,7 +38,7 @@ T = TypeVar("T")
     transform=lambda d: {"id": d["doc_id"], "updated_at": utcnow(), "jobs": []},
     _kind="inserted",
 )
-@cozo_query
+@cozo_query_async
 @beartype
 def embed_snippets(
     *,
@@ -45,6 +47,7 @@ def embed_snippets(
     snippet_indices: list[int] | tuple[int, ...],
     embeddings: list[list[float]],
     embedding_size: int = 1024,
+    fingerprints: list[str] | None = None,
 ) -> tuple[list[str], dict]:
     """Embeds document snippets in the cozodb database.
 
@@ -52,6 +55,7 @@ def embed_snippets(
         doc_id (UUID): The unique identifier for the document.
         snippet_indices (list[int]): Indices of the snippets in the document.
         embeddings (list[list[float]]): Embedding vectors for the snippets.
+        fingerprints (list[str] | None): Content fingerprints of the snippets, recorded so that later snippets with the same content can reuse these embeddings.
     """
 
     doc_id = str(doc_id)
@@ -60,6 +64,7 @@ def embed_snippets(
     assert len(snippet_indices) == len(embeddings)
     assert all(len(embedding) == embedding_size for embedding in embeddings)
     assert min(snippet_indices) >= 0
+    assert fingerprints is None or len(fingerprints) == len(snippet_indices)
 
     # Ensure all embeddings are non-zero.
     assert all(sum(embedding) for embedding in embeddings)
@@ -73,13 +78,13 @@ def embed_snippets(
     cols, vals = cozo_process_mutate_data(records)
 
     # Ensure that index is present in the records.
-    check_indices_query = f"""
+    check_indices_query = """
         ?[index] :=
-            *snippets {{
+            *snippets {
                 doc_id: $doc_id,
                 index,
-            }},
-            index > {max(snippet_indices)}
+            },
+            index > $max_index
 
         :limit 1
         :assert none
@@ -93,10 +98,55 @@ def embed_snippets(
         :returning
     """
 
+    # Point the fingerprints at these snippets, replacing older ones
+    put_fingerprints_query = """
+        ?[developer_id, fingerprint, doc_id, index] <- $fingerprint_rows
+
+        :put snippet_fingerprints { developer_id, fingerprint => doc_id, index }
+    """
+
+    # Keep quantized copies of the embeddings for shortlisting search candidates
+    put_codes_query = """
+        input[doc_id_str, index, code_b64, bits_b64, scale] <- $code_rows
+
+        ?[doc_id, index, code, bits, scale] :=
+            input[doc_id_str, index, code_b64, bits_b64, scale],
+            doc_id = to_uuid(doc_id_str),
+            code = decode_base64(code_b64),
+            bits = decode_base64(bits_b64)
+
+        :put snippet_codes { doc_id, index => code, bits, scale }
+    """
+
     queries = [
         verify_developer_id_query(developer_id),
         check_indices_query,
+        put_fingerprints_query if fingerprints else None,
+        put_codes_query,
+        bump_owner_doc_generation_query(doc_id=doc_id),
         embed_query,
     ]
 
-    return (queries, {"vals": vals, "doc_id": doc_id})
+    fingerprint_rows = [
+        [str(developer_id), fingerprint, doc_id, snippet_idx]
+        for fingerprint, snippet_idx in zip(fingerprints or [], snippet_indices)
+    ]
+
+    codes, scales = quantize_int8(embeddings)
+    code_rows = [
+        [doc_id, snippet_idx, encode_code(code), encode_code(bits), float(scale)]
+        for snippet_idx, code, bits, scale in zip(
+            snippet_indices, codes, quantize_binary(embeddings), scales
+        )
+    ]
+
+    return (
+        queries,
+        {
+            "vals": vals,
+            "code_rows": code_rows,
+            "doc_id": doc_id,
+            "max_index": max(snippet_indices),
+            "fingerprint_rows": fingerprint_rows,
+        },
+    )
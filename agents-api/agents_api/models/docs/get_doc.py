@@ -45,7 +45,7 @@ T = TypeVar("T")
         **d,
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_doc(
     *,
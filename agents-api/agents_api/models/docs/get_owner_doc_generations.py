@@ -0,0 +1,75 @@
+"""This module contains functions for loading the doc generations of some owners, used to key cached search results."""
+
+from typing import Any, Literal, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ..utils import (
+    cozo_query_async,
+    partialclass,
+    rewrap_exceptions,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_owner_doc_generations(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+) -> tuple[list[str], dict]:
+    """
+    Loads the doc generations of the owners, bumped whenever their documents or snippet embeddings change.
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The owners of the documents.
+
+    Returns:
+        list[dict]: An `{owner_type, owner_id, generation}` record for each owner whose documents ever changed.
+    """
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
+    get_query = """
+        owners[owner_type, owner_id] <- $owners
+
+        ?[owner_type, owner_id, generation] :=
+            owners[owner_type, owner_id_str],
+            owner_id = to_uuid(owner_id_str),
+            *owner_doc_generations {
+                owner_type,
+                owner_id,
+                generation,
+            }
+    """
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        *[
+            verify_developer_owns_resource_query(
+                developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
+            )
+            for owner_type, owner_id in owners
+        ],
+        get_query,
+    ]
+
+    return (queries, {"owners": owners})
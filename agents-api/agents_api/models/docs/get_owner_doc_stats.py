@@ -0,0 +1,87 @@
+"""This module contains functions for loading the number of documents and snippets of some owners."""
+
+from typing import Any, Literal, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ..utils import (
+    cozo_query_async,
+    partialclass,
+    rewrap_exceptions,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_owner_doc_stats(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+) -> tuple[list[str], dict]:
+    """
+    Loads the number of documents and snippets of the owners, kept up to date when documents are created and deleted.
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The owners of the documents.
+
+    Returns:
+        list[dict]: An `{owner_type, owner_id, doc_count, snippet_count, total_doc_count, total_snippet_count}` record for each owner with documents, where the totals are those of all the owners.
+    """
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
+    get_query = """
+        owners[owner_type, owner_id] <- $owners
+
+        total[sum(doc_count), sum(snippet_count)] :=
+            *owner_doc_stats { doc_count, snippet_count }
+
+        ?[
+            owner_type,
+            owner_id,
+            doc_count,
+            snippet_count,
+            total_doc_count,
+            total_snippet_count,
+        ] :=
+            owners[owner_type, owner_id_str],
+            owner_id = to_uuid(owner_id_str),
+            *owner_doc_stats {
+                owner_type,
+                owner_id,
+                doc_count,
+                snippet_count,
+            },
+            total[total_doc_count, total_snippet_count]
+    """
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        *[
+            verify_developer_owns_resource_query(
+                developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
+            )
+            for owner_type, owner_id in owners
+        ],
+        get_query,
+    ]
+
+    return (queries, {"owners": owners})
@@ -0,0 +1,125 @@
+"""This module contains functions for loading the quantized embeddings of the snippets of some owners' documents."""
+
+from typing import Any, Literal, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ..utils import (
+    cozo_query_async,
+    metadata_filter_query,
+    metadata_filter_variables,
+    partialclass,
+    query_template,
+    rewrap_exceptions,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@query_template
+def get_snippet_codes_query(
+    metadata_filter_keys: tuple[str, ...], column: Literal["code", "bits"]
+) -> str:
+    return f"""
+        owners[owner_type, owner_id] <- $owners
+
+        candidates[doc_id, index, code, scale] :=
+            owners[owner_type, owner_id_str],
+            owner_id = to_uuid(owner_id_str),
+            *docs {{
+                owner_type,
+                owner_id,
+                doc_id,
+                metadata,
+            }},
+            {metadata_filter_query(metadata_filter_keys) + "," if metadata_filter_keys else ""}
+            *snippet_codes {{
+                doc_id,
+                index,
+                {column}: code,
+                scale,
+            }}
+
+        snippet_counter[count(key)] :=
+            candidates[doc_id, index, _, _],
+            key = [doc_id, index]
+
+        # Nothing is returned for owners with more snippets than the limit
+        ?[doc_id, index, code, scale] :=
+            snippet_counter[count],
+            count <= $max_snippets,
+            candidates[doc_id, index, raw_code, scale],
+            code = encode_base64(raw_code)
+    """
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_snippet_codes(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    quantization: Literal["int8", "binary"] = "int8",
+    max_snippets: int = 100_000,
+    metadata_filter: dict[str, Any] = {},
+) -> tuple[str, dict]:
+    """
+    Loads the quantized embeddings of the snippets of the owners' documents.
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The owners of the documents.
+        quantization (Literal["int8", "binary"]): Whether to load the int8 codes or the sign bits of the embeddings.
+        max_snippets (int): Nothing is returned if the owners have more (embedded) snippets than this.
+        metadata_filter (dict[str, Any]): Dictionary to filter documents based on metadata.
+
+    Returns:
+        list[dict]: A `{doc_id, index, code, scale}` record (with a base64 encoded code) for each snippet.
+    """
+
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
+    )
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
+    verify_query = "}\n\n{".join(
+        [
+            verify_developer_id_query(developer_id),
+            *[
+                verify_developer_owns_resource_query(
+                    developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
+                )
+                for owner_type, owner_id in owners
+            ],
+        ]
+    )
+
+    query = f"""
+        {{ {verify_query} }}
+        {{ {get_snippet_codes_query(metadata_filter_keys, "code" if quantization == "int8" else "bits")} }}
+    """
+
+    return (
+        query,
+        {
+            "owners": owners,
+            "max_snippets": max_snippets,
+            **metadata_filter_vars,
+        },
+    )
@@ -0,0 +1,77 @@
+"""This module contains functions for looking up embeddings of previously embedded snippets by their content fingerprint."""
+
+from typing import Any, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ..utils import (
+    cozo_query_async,
+    partialclass,
+    rewrap_exceptions,
+    verify_developer_id_query,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_snippet_embeddings(
+    *,
+    developer_id: UUID,
+    fingerprints: list[str],
+) -> tuple[list[str], dict]:
+    """
+    Looks up the embeddings of the developer's snippets last embedded with the given content fingerprints.
+
+    Parameters:
+        developer_id (UUID): The unique identifier of the developer owning the snippets.
+        fingerprints (list[str]): Content fingerprints of the snippets to look up.
+
+    Returns:
+        list[dict]: A `{fingerprint, embedding}` record for each fingerprint found.
+    """
+
+    get_query = """
+        input[fingerprint] <- $fingerprints
+
+        ?[fingerprint, embedding] :=
+            input[fingerprint],
+            *snippet_fingerprints {
+                developer_id: to_uuid($developer_id),
+                fingerprint,
+                doc_id,
+                index,
+            },
+            *snippets {
+                doc_id,
+                index,
+                embedding,
+            },
+            !is_null(embedding)
+    """
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        get_query,
+    ]
+
+    return (
+        queries,
+        {
+            "developer_id": str(developer_id),
+            "fingerprints": [[fingerprint] for fingerprint in fingerprints],
+        },
+    )
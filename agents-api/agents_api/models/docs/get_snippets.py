@@ -0,0 +1,94 @@
+"""This module contains functions for loading given snippets of some owners' documents, with their full precision embeddings."""
+
+from typing import Any, Literal, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ..utils import (
+    cozo_query_async,
+    partialclass,
+    rewrap_exceptions,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_snippets(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    snippets: list[tuple[UUID, int]],
+) -> tuple[list[str], dict]:
+    """
+    Loads snippets by their `(doc_id, index)`, skipping those not belonging to one of the owners.
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The owners of the documents.
+        snippets (list[tuple[UUID, int]]): The document id and index of each snippet.
+
+    Returns:
+        list[dict]: An `{owner_type, owner_id, doc_id, title, index, content, embedding}` record for each snippet found.
+    """
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
+    get_query = """
+        owners[owner_type, owner_id] <- $owners
+        input[doc_id_str, index] <- $snippets
+
+        ?[owner_type, owner_id, doc_id, title, index, content, embedding] :=
+            input[doc_id_str, index],
+            doc_id = to_uuid(doc_id_str),
+            owners[owner_type, owner_id_str],
+            owner_id = to_uuid(owner_id_str),
+            *docs {
+                owner_type,
+                owner_id,
+                doc_id,
+                title,
+            },
+            *snippets {
+                doc_id,
+                index,
+                content,
+                embedding,
+            },
+            !is_null(embedding)
+    """
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        *[
+            verify_developer_owns_resource_query(
+                developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
+            )
+            for owner_type, owner_id in owners
+        ],
+        get_query,
+    ]
+
+    return (
+        queries,
+        {
+            "owners": owners,
+            "snippets": [[str(doc_id), index] for doc_id, index in snippets],
+        },
+    )
@@ -1,6 +1,5 @@
 """This module contains functions for querying document-related data from the 'cozodb' database using datalog queries."""
 
-import json
 from typing import Any, Literal, TypeVar
 from uuid import UUID
 
@@ -12,7 +11,14 @@ from pydantic import ValidationError
 from ...autogen.openapi_model import Doc
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     verify_developer_owns_resource_query,
@@ -23,6 +29,56 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
+@query_template
+def list_docs_query(
+    metadata_filter_keys: tuple[str, ...],
+    sort_by: str,
+    direction: str,
+    include_without_embeddings: bool,
+    keyset: bool = False,
+) -> str:
+    return f"""
+        snippets[id, collect(snippet_data)] :=
+            *snippets {{
+                doc_id: id,
+                index,
+                content,
+                embedding,
+            }},
+            {"" if include_without_embeddings else "not is_null(embedding),"}
+            snippet_data = [index, content, embedding]
+
+        ?[
+            owner_type,
+            id,
+            title,
+            snippet_data,
+            created_at,
+            metadata,
+            keyset_sort,
+            keyset_id,
+        ] :=
+            owner_type = $owner_type,
+            owner_id = to_uuid($owner_id),
+            *docs {{
+                owner_type,
+                owner_id,
+                doc_id: id,
+                title,
+                created_at,
+                metadata,
+            }},
+            snippets[id, snippet_data],
+            {keyset_query(sort_by)}
+            {keyset_filter_query(sort_by, direction) if keyset else ""}
+            {metadata_filter_query(metadata_filter_keys)}
+        
+        :limit $limit
+        :offset $offset
+        :sort {keyset_sort(sort_by, direction)}
+    """
+
+
 @rewrap_exceptions(
     {
         QueryException: partialclass(HTTPException, status_code=400),
@@ -42,7 +98,7 @@ T = TypeVar("T")
         **d,
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_docs(
     *,
@@ -55,6 +111,7 @@ def list_docs(
     direction: Literal["asc", "desc"] = "desc",
     metadata_filter: dict[str, Any] = {},
     include_without_embeddings: bool = False,
+    cursor: str | None = None,
 ) -> tuple[list[str], dict]:
     """
     Constructs and returns a datalog query for listing documents and their associated information snippets.
@@ -69,65 +126,30 @@ def list_docs(
         direction (Literal["asc", "desc"]): The direction to sort the documents in.
         metadata_filter (dict): A dictionary of metadata filters to apply to the documents.
         include_without_embeddings (bool): Whether to include documents without embeddings in the results.
+        cursor (str | None): Opaque cursor returned with the previous page, to continue after it.
 
     Returns:
         Doc[]
     """
 
-    # Transforms the metadata_filter dictionary into a string representation for the datalog query.
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
     )
 
     owner_id = str(owner_id)
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
-    get_query = f"""
-        snippets[id, collect(snippet_data)] :=
-            *snippets {{
-                doc_id: id,
-                index,
-                content,
-                embedding,
-            }},
-            {"" if include_without_embeddings else "not is_null(embedding),"}
-            snippet_data = [index, content, embedding]
-
-        ?[
-            owner_type,
-            id,
-            title,
-            snippet_data,
-            created_at,
-            metadata,
-        ] :=
-            owner_type = $owner_type,
-            owner_id = to_uuid($owner_id),
-            *docs {{
-                owner_type,
-                owner_id,
-                doc_id: id,
-                title,
-                created_at,
-                metadata,
-            }},
-            snippets[id, snippet_data],
-            {metadata_filter_str}
-        
-        :limit $limit
-        :offset $offset
-        :sort {sort}
-    """
 
     queries = [
         verify_developer_id_query(developer_id),
         verify_developer_owns_resource_query(
             developer_id, f"{owner_type}s", **{f"{owner_type}_id": owner_id}
         ),
-        get_query,
+        list_docs_query(
+            metadata_filter_keys,
+            sort_by,
+            direction,
+            include_without_embeddings,
+            keyset=cursor is not None,
+        ),
     ]
 
     return (
@@ -137,5 +159,7 @@ def list_docs(
             "owner_type": owner_type,
             "limit": limit,
             "offset": offset,
+            **metadata_filter_vars,
+            **keyset_variables(cursor, sort_by, direction),
         },
     )
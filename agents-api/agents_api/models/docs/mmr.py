@@ -1,64 +1,127 @@
 from __future__ import annotations
 
-import logging
-from typing import Union
+from typing import Sequence, Union
 
 import numpy as np
 
 Matrix = Union[list[list[float]], list[np.ndarray], np.ndarray]
 
-logger = logging.getLogger(__name__)
 
+def _normalize(x: np.ndarray) -> np.ndarray:
+    """Scale the rows of `x` to unit length; all-zero rows stay zero."""
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
 
-def _cosine_similarity(x: Matrix, y: Matrix) -> np.ndarray:
-    """Row-wise cosine similarity between two equal-width matrices.
+    # Ignore divide by zero errors run time warnings as those are handled below.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = x / norms
+
+    return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _candidate_matrix(embedding_list: Sequence, width: int) -> np.ndarray:
+    """Stack embeddings into a matrix; missing (None) embeddings become zero rows."""
+    matrix = np.zeros((len(embedding_list), width), dtype=np.float32)
+
+    for i, embedding in enumerate(embedding_list):
+        if embedding is not None:
+            matrix[i] = embedding
+
+    return matrix
+
+
+def cosine_similarity(
+    query_embedding: Sequence, embedding_list: Sequence
+) -> np.ndarray:
+    """Cosine similarity of the query to each embedding (0 for missing ones)."""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = _candidate_matrix(embedding_list, query.shape[-1])
+
+    return _normalize(candidates) @ _normalize(query)
+
+
+def maximal_marginal_relevance_batch(
+    query_embeddings: Matrix,
+    embedding_lists: Sequence[Sequence],
+    lambda_mult: float = 0.5,
+    k: int = 4,
+) -> list[list[int]]:
+    """Calculate maximal marginal relevance for several queries at once.
+
+    Embeddings are normalized once, so cosine similarities are plain dot
+    products. After every pick, the highest similarity of each candidate to
+    the already selected ones is updated with a single matrix-vector product
+    (per query), making the whole selection O(k·n·d) instead of O(k·n²·d).
 
     Args:
-        x: A matrix of shape (n, m).
-        y: A matrix of shape (k, m).
+        query_embeddings: A matrix of shape (b, d), one row per query.
+        embedding_lists: For each query, a list of candidate embeddings of width d.
+            Lists may have different lengths.
+        lambda_mult: The lambda parameter for MMR. Default is 0.5.
+        k: The number of embeddings to return per query. Default is 4.
 
     Returns:
-        A matrix of shape (n, k) where each element (i, j) is the cosine similarity
-        between the ith row of X and the jth row of Y.
+        For each query, a list of indices (into its candidates) of the embeddings to return.
 
     Raises:
-        ValueError: If the number of columns in X and Y are not the same.
-        ImportError: If numpy is not installed.
+        ValueError: If the number of queries and lists of candidates differ.
     """
 
-    if len(x) == 0 or len(y) == 0:
-        return np.array([])
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    if queries.ndim == 1:
+        queries = np.expand_dims(queries, axis=0)
 
-    x = [xx for xx in x if xx is not None]
-    y = [yy for yy in y if yy is not None]
-
-    x = np.array(x)
-    y = np.array(y)
-    if x.shape[1] != y.shape[1]:
+    if len(queries) != len(embedding_lists):
         msg = (
-            f"Number of columns in X and Y must be the same. X has shape {x.shape} "
-            f"and Y has shape {y.shape}."
+            f"Expected one list of candidates per query, got {len(queries)} queries "
+            f"and {len(embedding_lists)} lists of candidates."
         )
         raise ValueError(msg)
-    try:
-        import simsimd as simd  # type: ignore
-
-        x = np.array(x, dtype=np.float32)
-        y = np.array(y, dtype=np.float32)
-        z = 1 - np.array(simd.cdist(x, y, metric="cosine"))
-        return z
-    except ImportError:
-        logger.debug(
-            "Unable to import simsimd, defaulting to NumPy implementation. If you want "
-            "to use simsimd please install with `pip install simsimd`."
+
+    batch_size, width = queries.shape
+    sizes = np.array([len(embeddings) for embeddings in embedding_lists], dtype=int)
+    limits = np.minimum(k, sizes)
+
+    if batch_size == 0 or limits.max(initial=0) <= 0:
+        return [[] for _ in range(batch_size)]
+
+    # Pad the candidates of all queries to a (b, n, d) tensor
+    candidates = np.zeros((batch_size, sizes.max(), width), dtype=np.float32)
+    for b, embeddings in enumerate(embedding_lists):
+        candidates[b, : sizes[b]] = _candidate_matrix(embeddings, width)
+
+    candidates = _normalize(candidates)
+    queries = _normalize(queries)
+
+    rows = np.arange(batch_size)
+    available = np.arange(candidates.shape[1])[None, :] < sizes[:, None]
+
+    similarity_to_query = np.einsum("bnd,bd->bn", candidates, queries)
+    max_similarity_to_selected = np.full_like(similarity_to_query, -np.inf)
+
+    # The first pick is simply the most similar candidate
+    scores = np.where(available, similarity_to_query, -np.inf)
+    picks = []
+
+    for _ in range(limits.max()):
+        idx = np.argmax(scores, axis=1)
+        picks.append(idx)
+
+        available[rows, idx] = False
+        np.maximum(
+            max_similarity_to_selected,
+            np.einsum("bnd,bd->bn", candidates, candidates[rows, idx]),
+            out=max_similarity_to_selected,
         )
-        x_norm = np.linalg.norm(x, axis=1)
-        y_norm = np.linalg.norm(y, axis=1)
-        # Ignore divide by zero errors run time warnings as those are handled below.
-        with np.errstate(divide="ignore", invalid="ignore"):
-            similarity = np.dot(x, y.T) / np.outer(x_norm, y_norm)
-        similarity[np.isnan(similarity) | np.isinf(similarity)] = 0.0
-        return similarity
+
+        scores = np.where(
+            available,
+            lambda_mult * similarity_to_query
+            - (1 - lambda_mult) * max_similarity_to_selected,
+            -np.inf,
+        )
+
+    picks = np.stack(picks, axis=1)
+    return [picks[b, : limits[b]].tolist() for b in range(batch_size)]
 
 
 def maximal_marginal_relevance(
@@ -77,33 +140,17 @@ def maximal_marginal_relevance(
 
     Returns:
         A list of indices of the embeddings to return.
-
-    Raises:
-        ImportError: If numpy is not installed.
     """
 
     if min(k, len(embedding_list)) <= 0:
         return []
+
+    query_embedding = np.asarray(query_embedding)
     if query_embedding.ndim == 1:
         query_embedding = np.expand_dims(query_embedding, axis=0)
-    similarity_to_query = _cosine_similarity(query_embedding, embedding_list)[0]
-    most_similar = int(np.argmax(similarity_to_query))
-    idxs = [most_similar]
-    selected = np.array([embedding_list[most_similar]])
-    while len(idxs) < min(k, len(embedding_list)):
-        best_score = -np.inf
-        idx_to_add = -1
-        similarity_to_selected = _cosine_similarity(embedding_list, selected)
-        for i, query_score in enumerate(similarity_to_query):
-            if i in idxs:
-                continue
-            redundant_score = max(similarity_to_selected[i])
-            equation_score = (
-                lambda_mult * query_score - (1 - lambda_mult) * redundant_score
-            )
-            if equation_score > best_score:
-                best_score = equation_score
-                idx_to_add = i
-        idxs.append(idx_to_add)
-        selected = np.append(selected, [embedding_list[idx_to_add]], axis=0)
+
+    [idxs] = maximal_marginal_relevance_batch(
+        query_embedding, [embedding_list], lambda_mult=lambda_mult, k=k
+    )
+
     return idxs
@@ -0,0 +1,82 @@
+"""This module contains the decorator caching the results of doc searches until the docs of the owners searched change."""
+
+from functools import wraps
+from typing import Any, Awaitable, Callable, ParamSpec
+
+from ...autogen.openapi_model import DocReference
+from ...common.utils.search_cache import (
+    SearchResultCache,
+    lookups,
+    search_cache_key,
+)
+from ...env import search_cache_size, search_cache_ttl
+from .get_owner_doc_generations import get_owner_doc_generations
+
+P = ParamSpec("P")
+
+search_result_cache = SearchResultCache(ttl=search_cache_ttl, maxsize=search_cache_size)
+
+
+def cached_search(kind: str):
+    """
+    Caches the results of a doc search function (called with keyword arguments
+    only) by its arguments and the current doc generations of the owners.
+
+    The generations are loaded with the developer / ownership checks, so cached
+    results are only served to callers that could run the search.
+    """
+
+    def decorator(
+        func: Callable[P, Awaitable[list[DocReference]]],
+    ) -> Callable[P, Awaitable[list[DocReference]]]:
+        @wraps(func)
+        async def wrapper(**kwargs: Any) -> list[DocReference]:
+            if search_result_cache.ttl <= 0:
+                return await func(**kwargs)
+
+            developer_id = kwargs["developer_id"]
+            owners = kwargs["owners"]
+            client = kwargs.get("client")
+
+            rows = await get_owner_doc_generations(
+                developer_id=developer_id, owners=owners, client=client
+            )
+
+            generations = {
+                (row["owner_type"], str(row["owner_id"])): row["generation"]
+                for row in rows
+            }
+
+            key = search_cache_key(
+                kind,
+                developer_id,
+                [
+                    (
+                        owner_type,
+                        str(owner_id),
+                        generations.get((owner_type, str(owner_id)), 0),
+                    )
+                    for owner_type, owner_id in owners
+                ],
+                {
+                    name: value
+                    for name, value in kwargs.items()
+                    if name not in ("developer_id", "owners", "client")
+                },
+            )
+
+            if (results := search_result_cache.get(key)) is not None:
+                lookups.labels(kind, "hit").inc()
+
+            else:
+                lookups.labels(kind, "miss").inc()
+
+                results = await func(**kwargs)
+                search_result_cache.put(key, results)
+
+            # Callers may modify the results (e.g. their distances)
+            return [doc.model_copy(deep=True) for doc in results]
+
+        return wrapper
+
+    return decorator
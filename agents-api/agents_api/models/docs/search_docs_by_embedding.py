@@ -1,6 +1,5 @@
 """This module contains functions for searching documents in the CozoDB based on embedding queries."""
 
-import json
 from typing import Any, Literal, TypeVar
 from uuid import UUID
 
@@ -11,8 +10,11 @@ from pydantic import ValidationError
 
 from ...autogen.openapi_model import DocReference
 from ..utils import (
-    cozo_query,
+    cozo_query_async,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     verify_developer_owns_resource_query,
@@ -23,155 +25,42 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
-@rewrap_exceptions(
-    {
-        QueryException: partialclass(HTTPException, status_code=400),
-        ValidationError: partialclass(HTTPException, status_code=400),
-        TypeError: partialclass(HTTPException, status_code=400),
-    }
-)
-@wrap_in_class(
-    DocReference,
-    transform=lambda d: {
-        "owner": {
-            "id": d["owner_id"],
-            "role": d["owner_type"],
-        },
-        **d,
-    },
-)
-@cozo_query
-@beartype
-def search_docs_by_embedding(
-    *,
-    developer_id: UUID,
-    owners: list[tuple[Literal["user", "agent"], UUID]],
-    query_embedding: list[float],
-    k: int = 3,
-    confidence: float = 0.5,
-    ef: int = 50,
-    embedding_size: int = 1024,
-    ann_threshold: int = 1_000_000,
-    metadata_filter: dict[str, Any] = {},
-) -> tuple[str, dict]:
-    """
-    Searches for document snippets in CozoDB by embedding query.
-
-    Parameters:
-        owner_type (Literal["user", "agent"]): The type of the owner of the documents.
-        owner_id (UUID): The unique identifier of the owner.
-        query_embedding (list[float]): The embedding vector of the query.
-        k (int, optional): The number of nearest neighbors to retrieve. Defaults to 3.
-        confidence (float, optional): The confidence threshold for filtering results. Defaults to 0.8.
-        mmr_lambda (float, optional): The lambda parameter for MMR. Defaults to 0.25.
-        embedding_size (int): Embedding vector length
-        metadata_filter (dict[str, Any]): Dictionary to filter agents based on metadata.
-    """
-
-    assert len(query_embedding) == embedding_size
-    assert sum(query_embedding)
-
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
-    )
-
-    owners: list[list[str]] = [
-        [owner_type, str(owner_id)] for owner_type, owner_id in owners
-    ]
-
-    # Calculate the search radius based on confidence level
-    radius: float = 1.0 - confidence
-
-    determine_knn_ann_query = f"""
-        owners[owner_type, owner_id] <- $owners
-        snippet_counter[count(item)] :=
-            owners[owner_type, owner_id_str],
-            owner_id = to_uuid(owner_id_str),
-            *docs {{
-                owner_type,
-                owner_id,
-                doc_id: item,
-                metadata,
-            }}
-            {', ' + metadata_filter_str if metadata_filter_str.strip() else ''}
-
-        ?[use_ann] := 
-            snippet_counter[count],
-            count > {ann_threshold},
-            use_ann = true
-
-        :limit 1
-        :create _determine_knn_ann {{
-            use_ann
-        }}
-    """
-
-    # Construct the datalog query for searching document snippets
-    search_query = f"""
-        # %debug _determine_knn_ann
-        %if {{ 
-            ?[use_ann] := *_determine_knn_ann{{ use_ann }}
-        }}
-
-        %then {{
-            owners[owner_type, owner_id] <- $owners
-            input[
-                owner_type,
-                owner_id,
-                query_embedding,
-            ] :=
-                owners[owner_type, owner_id_str],
-                owner_id = to_uuid(owner_id_str),
-                query_embedding = vec($query_embedding)
-
-            # Search for documents by owner
-            ?[
-                doc_id,
-                index,
-                title,
-                content,
-                distance,
-                embedding,
-            ] :=
-                # Get input values
-                input[owner_type, owner_id, query],
-
-                # Restrict the search to all documents that match the owner
-                *docs {{
-                    owner_type,
-                    owner_id,
-                    doc_id,
-                    title,
-                }},
-
-                # Search for snippets in the embedding space
-                ~snippets:embedding_space {{
+@query_template
+def search_docs_by_embedding_query(
+    metadata_filter_keys: tuple[str, ...], use_ann: bool
+) -> str:
+    if use_ann:
+        # Search for snippets in the embedding space
+        snippets_query = """
+                ~snippets:embedding_space {
                     doc_id,
                     index,
                     content
                     |
                     query: query,
-                    k: {k},
-                    ef: {ef},
-                    radius: {radius},
+                    k: $k,
+                    ef: $ef,
+                    radius: $radius,
                     bind_distance: distance,
                     bind_vector: embedding,
-                }}
-
-            :create _search_result {{
-                doc_id,
-                index,
-                title,
-                content,
-                distance,
-                embedding,
-            }}
-        }}
+                }
+        """
+    else:
+        # Compare the query to the embeddings of all the owner's snippets
+        snippets_query = """
+                *snippets {
+                    doc_id,
+                    index,
+                    content,
+                    embedding,
+                },
+                !is_null(embedding),
+                distance = cos_dist(query, embedding),
+                distance <= $radius
+        """
 
-        %else {{
+    # Construct the datalog query for searching document snippets
+    search_query = f"""
             owners[owner_type, owner_id] <- $owners
             input[
                 owner_type,
@@ -200,20 +89,13 @@ def search_docs_by_embedding(
                     owner_id,
                     doc_id,
                     title,
+                    metadata,
                 }},
+                {metadata_filter_query(metadata_filter_keys) + "," if metadata_filter_keys else ""}
+                {snippets_query}
 
-                # Search for snippets in the embedding space
-                *snippets {{
-                    doc_id,
-                    index,
-                    content,
-                    embedding,
-                }},
-                !is_null(embedding),
-                distance = cos_dist(query, embedding),
-                distance <= {radius}
-
-            :limit {k}   # Get more candidates for diversity
+            {"" if use_ann else ":order distance"}
+            {"" if use_ann else ":limit $k"}
 
             :create _search_result {{
                 doc_id,
@@ -223,11 +105,9 @@ def search_docs_by_embedding(
                 distance,
                 embedding,
             }}
-        }}
-        %end
     """
 
-    normal_interim_query = f"""
+    normal_interim_query = """
         owners[owner_type, owner_id] <- $owners
 
         ?[
@@ -241,12 +121,12 @@ def search_docs_by_embedding(
         ] := 
             owners[owner_type, owner_id_str],
             owner_id = to_uuid(owner_id_str),
-            *_search_result{{ doc_id, index, title, content, distance, embedding, }},
+            *_search_result{ doc_id, index, title, content, distance, embedding, },
             snippet_data = [index, content]
 
-        :limit {k}   # Get more candidates for diversity
+        :limit $k   # Get more candidates for diversity
 
-        :create _interim {{
+        :create _interim {
             owner_type,
             owner_id,
             doc_id,
@@ -254,7 +134,7 @@ def search_docs_by_embedding(
             distance,
             title,
             embedding,
-        }}
+        }
     """
 
     collect_query = """
@@ -318,6 +198,73 @@ def search_docs_by_embedding(
         ]
     """
 
+    return f"""
+        {{ {search_query} }}
+        {{ {normal_interim_query} }}
+        {{ {collect_query} }}
+    """
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(
+    DocReference,
+    transform=lambda d: {
+        "owner": {
+            "id": d["owner_id"],
+            "role": d["owner_type"],
+        },
+        **d,
+    },
+)
+@cozo_query_async(readonly=True)
+@beartype
+def search_docs_by_embedding(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    query_embedding: list[float],
+    k: int = 3,
+    confidence: float = 0.5,
+    ef: int = 50,
+    embedding_size: int = 1024,
+    use_ann: bool = False,
+    metadata_filter: dict[str, Any] = {},
+) -> tuple[str, dict]:
+    """
+    Searches for document snippets in CozoDB by embedding query.
+
+    Parameters:
+        owner_type (Literal["user", "agent"]): The type of the owner of the documents.
+        owner_id (UUID): The unique identifier of the owner.
+        query_embedding (list[float]): The embedding vector of the query.
+        k (int, optional): The number of nearest neighbors to retrieve. Defaults to 3.
+        confidence (float, optional): The confidence threshold for filtering results. Defaults to 0.8.
+        mmr_lambda (float, optional): The lambda parameter for MMR. Defaults to 0.25.
+        embedding_size (int): Embedding vector length
+        use_ann (bool): Whether to search the HNSW index (with `k` neighbours and `ef` candidates) rather than scan all the owner's snippets.
+        metadata_filter (dict[str, Any]): Dictionary to filter agents based on metadata.
+    """
+
+    assert len(query_embedding) == embedding_size
+    assert sum(query_embedding)
+
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
+    )
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
+    # Calculate the search radius based on confidence level
+    radius: float = 1.0 - confidence
+
     verify_query = "}\n\n{".join(
         [
             verify_developer_id_query(developer_id),
@@ -332,10 +279,7 @@ def search_docs_by_embedding(
 
     query = f"""
         {{ {verify_query} }}
-        {{ {determine_knn_ann_query} }}
-        {search_query}
-        {{ {normal_interim_query} }}
-        {{ {collect_query} }}
+        {search_docs_by_embedding_query(metadata_filter_keys, use_ann)}
     """
 
     return (
@@ -343,5 +287,9 @@ def search_docs_by_embedding(
         {
             "owners": owners,
             "query_embedding": query_embedding,
+            "k": k,
+            "ef": ef,
+            "radius": radius,
+            **metadata_filter_vars,
         },
     )
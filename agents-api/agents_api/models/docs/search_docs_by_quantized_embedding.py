@@ -0,0 +1,212 @@
+"""This module contains functions for searching documents by embedding, shortlisting candidates with quantized embeddings."""
+
+from typing import Any, Literal
+from uuid import UUID
+
+import numpy as np
+from beartype import beartype
+
+from ...autogen.openapi_model import DocReference
+from ...common.utils.corpus_stats import ALL_OWNERS, CorpusStats
+from ...common.utils.quantization import (
+    binary_similarity,
+    decode_codes,
+    int8_similarity,
+)
+from ...common.utils.search_plan import log_search_plan, plan_embedding_search
+from ...env import (
+    embedding_quantization,
+    embedding_search_ann_threshold,
+    quantized_search_rerank_factor,
+)
+from ..utils import corpus_stats_cache
+from .get_owner_doc_stats import get_owner_doc_stats
+from .get_snippet_codes import get_snippet_codes
+from .get_snippets import get_snippets
+from .mmr import cosine_similarity
+from .search_cache import cached_search
+from .search_docs_by_embedding import search_docs_by_embedding
+
+
+@beartype
+async def get_corpus_stats(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    client=None,
+) -> tuple[CorpusStats, CorpusStats]:
+    """
+    Returns the (cached) doc statistics of the owners, summed, and of all the owners.
+    """
+
+    cached = [corpus_stats_cache.get(*owner) for owner in owners]
+    total = corpus_stats_cache.get(*ALL_OWNERS)
+
+    if total is None or None in cached:
+        rows = await get_owner_doc_stats(
+            developer_id=developer_id, owners=owners, client=client
+        )
+
+        found = {(row["owner_type"], str(row["owner_id"])): row for row in rows}
+        total = CorpusStats(0, 0)
+        cached = []
+
+        for owner_type, owner_id in owners:
+            row = found.get((owner_type, str(owner_id)))
+            stats = (
+                CorpusStats(row["doc_count"], row["snippet_count"])
+                if row
+                else CorpusStats(0, 0)
+            )
+
+            if row:
+                total = CorpusStats(
+                    int(row["total_doc_count"]), int(row["total_snippet_count"])
+                )
+
+            corpus_stats_cache.put(owner_type, owner_id, stats)
+            cached.append(stats)
+
+        if rows:
+            corpus_stats_cache.put(*ALL_OWNERS, total)
+
+    owner_stats = CorpusStats(
+        sum(stats.doc_count for stats in cached),
+        sum(stats.snippet_count for stats in cached),
+    )
+
+    return owner_stats, total
+
+
+@cached_search("embedding")
+@beartype
+async def search_docs_by_quantized_embedding(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    query_embedding: list[float],
+    k: int = 3,
+    confidence: float = 0.5,
+    ef: int = 50,
+    metadata_filter: dict[str, Any] = {},
+    quantization: Literal["none", "int8", "binary"] = embedding_quantization,
+    rerank_factor: int = quantized_search_rerank_factor,
+    ann_threshold: int = embedding_search_ann_threshold,
+    client=None,
+    **embedding_search_options,
+) -> list[DocReference]:
+    """
+    Searches for document snippets by embedding, planned from the (cached)
+    snippet counts of the owners: owners with more than `ann_threshold`
+    snippets are searched with the HNSW index, fetching enough neighbours for
+    their share of it, and the others are scanned exactly.
+
+    Exact scans go in two passes: the quantized embeddings of all the owners'
+    snippets are scored in memory to shortlist `k * rerank_factor` candidates,
+    which are then ranked exactly with their full precision embeddings. With
+    `quantization="none"`, the full embeddings are scanned instead.
+    """
+
+    search_options = dict(
+        developer_id=developer_id,
+        owners=owners,
+        client=client,
+    )
+
+    owner_stats, total_stats = await get_corpus_stats(**search_options)
+
+    plan = plan_embedding_search(
+        owner_stats,
+        total_stats,
+        k=k,
+        confidence=confidence,
+        ef=ef,
+        ann_threshold=ann_threshold,
+    )
+
+    log_search_plan(plan, owner_stats, total_stats)
+
+    if plan.strategy == "empty":
+        return []
+
+    codes = (
+        await get_snippet_codes(
+            quantization=quantization,
+            # Stats can be stale, so very large owners are still left to the ANN search
+            max_snippets=ann_threshold,
+            metadata_filter=metadata_filter,
+            **search_options,
+        )
+        if plan.strategy == "knn" and quantization != "none"
+        else []
+    )
+
+    if not codes:
+        results = await search_docs_by_embedding(
+            query_embedding=query_embedding,
+            k=plan.k,
+            confidence=confidence,
+            ef=plan.ef,
+            use_ann=plan.strategy == "ann",
+            metadata_filter=metadata_filter,
+            **search_options,
+            **embedding_search_options,
+        )
+
+        return sorted(results, key=lambda doc: doc.distance)[:k]
+
+    # First pass: shortlist candidates with the quantized embeddings
+    if quantization == "int8":
+        scores = int8_similarity(
+            query_embedding,
+            decode_codes([row["code"] for row in codes], np.int8),
+            np.array([row["scale"] for row in codes], dtype=np.float32),
+        )
+    else:
+        scores = binary_similarity(
+            query_embedding,
+            decode_codes([row["code"] for row in codes], np.uint8),
+            len(query_embedding),
+        )
+
+    shortlist = min(k * rerank_factor, len(codes))
+    candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+
+    # Cozo returns the ids of the codes as strings
+    snippets = await get_snippets(
+        snippets=[(UUID(codes[i]["doc_id"]), codes[i]["index"]) for i in candidates],
+        **search_options,
+    )
+
+    if not snippets:
+        return []
+
+    # Second pass: rank the candidates exactly
+    distances = 1.0 - cosine_similarity(
+        query_embedding, [snippet["embedding"] for snippet in snippets]
+    )
+    radius = 1.0 - confidence
+
+    ranked = sorted(
+        (
+            (distance, snippet)
+            for distance, snippet in zip(distances.tolist(), snippets)
+            if distance <= radius
+        ),
+        key=lambda pair: pair[0],
+    )
+
+    return [
+        DocReference(
+            owner={"id": snippet["owner_id"], "role": snippet["owner_type"]},
+            id=snippet["doc_id"],
+            title=snippet["title"],
+            snippet={
+                "index": snippet["index"],
+                "content": snippet["content"],
+                "embedding": snippet["embedding"],
+            },
+            distance=distance,
+        )
+        for distance, snippet in ranked[:k]
+    ]
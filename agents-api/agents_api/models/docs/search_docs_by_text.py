@@ -1,6 +1,5 @@
 """This module contains functions for searching documents in the CozoDB based on embedding queries."""
 
-import json
 import re
 from typing import Any, Literal, TypeVar
 from uuid import UUID
@@ -11,74 +10,28 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.openapi_model import DocReference
-from ...common.nlp import paragraph_to_custom_queries
+from ...common.nlp import text_to_custom_queries
 from ..utils import (
-    cozo_query,
+    cozo_query_async,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     verify_developer_owns_resource_query,
     wrap_in_class,
 )
+from .search_cache import cached_search
 
 ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
-@rewrap_exceptions(
-    {
-        QueryException: partialclass(HTTPException, status_code=400),
-        ValidationError: partialclass(HTTPException, status_code=400),
-        TypeError: partialclass(HTTPException, status_code=400),
-    }
-)
-@wrap_in_class(
-    DocReference,
-    transform=lambda d: {
-        "owner": {
-            "id": d["owner_id"],
-            "role": d["owner_type"],
-        },
-        **d,
-    },
-)
-@cozo_query
-@beartype
-def search_docs_by_text(
-    *,
-    developer_id: UUID,
-    owners: list[tuple[Literal["user", "agent"], UUID]],
-    query: str,
-    k: int = 3,
-    metadata_filter: dict[str, Any] = {},
-) -> tuple[list[str], dict]:
-    """
-    Searches for document snippets in CozoDB by embedding query.
-
-    Parameters:
-        owners (list[tuple[Literal["user", "agent"], UUID]]): The type of the owner of the documents.
-        query (str): The query string.
-        k (int, optional): The number of nearest neighbors to retrieve. Defaults to 3.
-        metadata_filter (dict[str, Any]): Dictionary to filter agents based on metadata.
-    """
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
-    )
-
-    owners: list[list[str]] = [
-        [owner_type, str(owner_id)] for owner_type, owner_id in owners
-    ]
-
-    # See: https://docs.cozodb.org/en/latest/vector.html#full-text-search-fts
-    fts_queries = paragraph_to_custom_queries(query) or [
-        re.sub(r"[^\w\s\-_]+", "", query)
-    ]
-
+@query_template
+def search_docs_by_text_query(metadata_filter_keys: tuple[str, ...]) -> str:
     # Construct the datalog query for searching document snippets
-    search_query = f"""
+    return f"""
         owners[owner_type, owner_id] <- $owners
         input[
             owner_type,
@@ -95,7 +48,7 @@ def search_docs_by_text(
                 doc_id,
                 metadata,
             }}
-            {', ' + metadata_filter_str if metadata_filter_str.strip() else ''}
+            {', ' + metadata_filter_query(metadata_filter_keys) if metadata_filter_keys else ''}
 
         search_result[
             doc_id,
@@ -109,7 +62,7 @@ def search_docs_by_text(
                 content
                 |
                 query: $query,
-                k: {k},
+                k: $k,
             }},
             distance = 10000000,  # Very large distance to depict no valid distance
             snippet_data = [index, content]
@@ -126,7 +79,7 @@ def search_docs_by_text(
                 content
                 |
                 query: query,
-                k: {k},
+                k: $k,
                 score_kind: 'tf_idf',
                 bind_score: score,
             }},
@@ -181,9 +134,56 @@ def search_docs_by_text(
 
         # Sort the results by distance to find the closest matches
         :sort distance
-        :limit {k}
+        :limit $k
     """
 
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(
+    DocReference,
+    transform=lambda d: {
+        "owner": {
+            "id": d["owner_id"],
+            "role": d["owner_type"],
+        },
+        **d,
+    },
+)
+@cozo_query_async(readonly=True)
+@beartype
+def search_docs_by_fts_queries(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    query: str,
+    fts_queries: list[str],
+    k: int = 3,
+    metadata_filter: dict[str, Any] = {},
+) -> tuple[list[str], dict]:
+    """
+    Searches for document snippets in CozoDB with full-text search queries.
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The type of the owner of the documents.
+        query (str): The query string.
+        fts_queries (list[str]): The full-text search queries built from the query string.
+        k (int, optional): The number of nearest neighbors to retrieve. Defaults to 3.
+        metadata_filter (dict[str, Any]): Dictionary to filter agents based on metadata.
+    """
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
+    )
+
+    owners: list[list[str]] = [
+        [owner_type, str(owner_id)] for owner_type, owner_id in owners
+    ]
+
     queries = [
         verify_developer_id_query(developer_id),
         *[
@@ -192,10 +192,54 @@ def search_docs_by_text(
             )
             for owner_type, owner_id in owners
         ],
-        search_query,
+        search_docs_by_text_query(metadata_filter_keys),
     ]
 
     return (
         queries,
-        {"owners": owners, "query": query, "fts_queries": fts_queries},
+        {
+            "owners": owners,
+            "query": query,
+            "fts_queries": fts_queries,
+            "k": k,
+            **metadata_filter_vars,
+        },
+    )
+
+
+@cached_search("text")
+@beartype
+async def search_docs_by_text(
+    *,
+    developer_id: UUID,
+    owners: list[tuple[Literal["user", "agent"], UUID]],
+    query: str,
+    k: int = 3,
+    metadata_filter: dict[str, Any] = {},
+    client=None,
+) -> list[DocReference]:
+    """
+    Searches for document snippets in CozoDB by text, with full-text search
+    queries built from its keywords (off the event loop).
+
+    Parameters:
+        owners (list[tuple[Literal["user", "agent"], UUID]]): The type of the owner of the documents.
+        query (str): The query string.
+        k (int, optional): The number of nearest neighbors to retrieve. Defaults to 3.
+        metadata_filter (dict[str, Any]): Dictionary to filter agents based on metadata.
+    """
+
+    # See: https://docs.cozodb.org/en/latest/vector.html#full-text-search-fts
+    fts_queries = await text_to_custom_queries(query) or [
+        re.sub(r"[^\w\s\-_]+", "", query)
+    ]
+
+    return await search_docs_by_fts_queries(
+        developer_id=developer_id,
+        owners=owners,
+        query=query,
+        fts_queries=fts_queries,
+        k=k,
+        metadata_filter=metadata_filter,
+        client=client,
     )
@@ -1,15 +1,36 @@
 """This module contains functions for searching documents in the CozoDB based on embedding queries."""
 
+import asyncio
+import time
 from statistics import mean, stdev
-from typing import Any, Literal
+from typing import Any, Awaitable, Literal, TypeVar
 from uuid import UUID
 
 from beartype import beartype
+from prometheus_client import Histogram
 
 from ...autogen.openapi_model import DocReference
-from .search_docs_by_embedding import search_docs_by_embedding
+from .search_cache import cached_search
+from .search_docs_by_quantized_embedding import search_docs_by_quantized_embedding
 from .search_docs_by_text import search_docs_by_text
 
+T = TypeVar("T")
+
+hybrid_search_leg_latency = Histogram(
+    "hybrid_search_leg_latency_seconds",
+    "Time taken by each leg (text / embedding) of a hybrid doc search",
+    labelnames=("leg",),
+)
+
+
+async def timed_leg(leg: str, search: Awaitable[T]) -> T:
+    start = time.perf_counter()
+    try:
+        return await search
+
+    finally:
+        hybrid_search_leg_latency.labels(leg).observe(time.perf_counter() - start)
+
 
 # Distribution based score normalization
 # https://medium.com/plain-simple-software/distribution-based-score-fusion-dbsf-a-new-approach-to-vector-search-ranking-f87c37488b18
@@ -89,8 +110,9 @@ def dbsf_fuse(
     return ranked_results
 
 
+@cached_search("hybrid")
 @beartype
-def search_docs_hybrid(
+async def search_docs_hybrid(
     *,
     developer_id: UUID,
     owners: list[tuple[Literal["user", "agent"], UUID]],
@@ -102,23 +124,30 @@ def search_docs_hybrid(
     text_search_options: dict = {},
     metadata_filter: dict[str, Any] = {},
 ) -> list[DocReference]:
-    # TODO: We should probably parallelize these queries
-    text_results = search_docs_by_text(
-        developer_id=developer_id,
-        owners=owners,
-        query=query,
-        k=k,
-        metadata_filter=metadata_filter,
-        **text_search_options,
-    )
-
-    embedding_results = search_docs_by_embedding(
-        developer_id=developer_id,
-        owners=owners,
-        query_embedding=query_embedding,
-        k=k,
-        metadata_filter=metadata_filter,
-        **embed_search_options,
+    # Both legs are independent, so they run concurrently
+    text_results, embedding_results = await asyncio.gather(
+        timed_leg(
+            "text",
+            search_docs_by_text(
+                developer_id=developer_id,
+                owners=owners,
+                query=query,
+                k=k,
+                metadata_filter=metadata_filter,
+                **text_search_options,
+            ),
+        ),
+        timed_leg(
+            "embedding",
+            search_docs_by_quantized_embedding(
+                developer_id=developer_id,
+                owners=owners,
+                query_embedding=query_embedding,
+                k=k,
+                metadata_filter=metadata_filter,
+                **embed_search_options,
+            ),
+        ),
     )
 
     return dbsf_fuse(text_results, embedding_results, alpha)[:k]
@@ -16,4 +16,5 @@ The module utilizes pandas DataFrames for handling query results and integrates
 from .create_entries import create_entries
 from .delete_entries import delete_entries
 from .get_history import get_history
+from .get_recent_entries import get_recent_entries
 from .list_entries import list_entries
@@ -48,7 +48,7 @@ T = TypeVar("T")
         **d,
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_history(
     *,
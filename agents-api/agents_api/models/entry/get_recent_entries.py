@@ -0,0 +1,146 @@
+"""This module contains functions for loading the latest entries of a session history."""
+
+from typing import Any, TypeVar
+from uuid import UUID
+
+from beartype import beartype
+from fastapi import HTTPException
+from pycozo.client import QueryException
+from pydantic import ValidationError
+
+from ...autogen.openapi_model import Entry
+from ..utils import (
+    cozo_query,
+    partialclass,
+    query_template,
+    rewrap_exceptions,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+    wrap_in_class,
+)
+
+ModelT = TypeVar("ModelT", bound=Any)
+T = TypeVar("T")
+
+
+@query_template
+def recent_entries_query(since_entry: bool) -> str:
+    since_query = """
+        since_id = to_uuid($since_entry_id),
+        *entries {
+            session_id,
+            entry_id: since_id,
+            created_at: since_created_at,
+        },
+    """
+
+    # The latest leaf entries are found with the `(session_id, created_at)`
+    # index, and only those are read from `entries`
+    return f"""
+        ?[entry_id, created_at, source] :=
+            session_id = to_uuid($session_id),
+            {since_query if since_entry else ""}
+            *entries:by_session_created_at {{
+                session_id,
+                created_at,
+                source,
+                entry_id,
+            }},
+            {"created_at > since_created_at," if since_entry else ""}
+            source in $allowed_sources,
+            not *relations {{ head: entry_id }}
+
+        :order -created_at
+        :limit $limit
+
+        :create _recent_entries {{ entry_id, created_at, source }}
+    """
+
+
+recent_entries_output_query = """
+    ?[
+        session_id,
+        id,
+        role,
+        name,
+        content,
+        source,
+        token_count,
+        tokenizer,
+        created_at,
+        timestamp,
+    ] :=
+        *_recent_entries { entry_id: id, created_at, source },
+        session_id = to_uuid($session_id),
+        *entries {
+            session_id,
+            entry_id: id,
+            source,
+            role,
+            name,
+            content,
+            token_count,
+            tokenizer,
+            created_at,
+            timestamp,
+        }
+
+    :order created_at
+"""
+
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(Entry)
+@cozo_query(readonly=True)
+@beartype
+def get_recent_entries(
+    *,
+    developer_id: UUID,
+    session_id: UUID,
+    allowed_sources: list[str] = ["api_request", "api_response"],
+    limit: int = 100,
+    since_entry_id: UUID | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Loads the latest leaf entries (that no other entry relates to, e.g. the
+    summaries of the entries they replace) of a session, in `created_at` order.
+
+    Parameters:
+        limit (int): The maximum number of entries to load.
+        since_entry_id (UUID | None): If set, only the entries created after this one are loaded, for clients that already have the earlier ones.
+
+    Returns:
+        list[Entry]: Up to `limit` entries, oldest first.
+    """
+
+    developer_id = str(developer_id)
+    session_id = str(session_id)
+
+    queries = [
+        verify_developer_id_query(developer_id),
+        verify_developer_owns_resource_query(
+            developer_id, "sessions", session_id=session_id
+        ),
+        recent_entries_query(since_entry_id is not None),
+        recent_entries_output_query,
+    ]
+
+    return (
+        queries,
+        {
+            "session_id": session_id,
+            "allowed_sources": allowed_sources,
+            "limit": limit,
+            **(
+                {"since_entry_id": str(since_entry_id)}
+                if since_entry_id is not None
+                else {}
+            ),
+        },
+    )
@@ -28,7 +28,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(Entry)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_entries(
     *,
@@ -91,8 +91,8 @@ def list_entries(
     """
 
     if limit > 0:
-        list_query += f"\n:limit {limit}"
-        list_query += f"\n:offset {offset}"
+        list_query += "\n:limit $limit"
+        list_query += "\n:offset $offset"
 
     queries = [
         verify_developer_id_query(developer_id),
@@ -108,5 +108,7 @@ def list_entries(
             "session_id": session_id,
             "allowed_sources": allowed_sources,
             "exclude_relations": exclude_relations,
+            "limit": limit,
+            "offset": offset,
         },
     )
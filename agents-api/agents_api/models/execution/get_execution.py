@@ -37,7 +37,7 @@ T = TypeVar("T")
         else d["output"],
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_execution(
     *,
@@ -28,7 +28,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(Transition, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_execution_transition(
     *,
@@ -27,7 +27,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(dict, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_paused_execution_token(
     *,
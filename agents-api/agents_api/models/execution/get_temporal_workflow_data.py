@@ -25,7 +25,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(dict, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_temporal_workflow_data(
     *,
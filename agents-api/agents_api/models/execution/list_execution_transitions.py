@@ -7,7 +7,16 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.openapi_model import Transition
-from ..utils import cozo_query, partialclass, rewrap_exceptions, wrap_in_class
+from ..utils import (
+    cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
+    partialclass,
+    rewrap_exceptions,
+    wrap_in_class,
+)
 
 ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
@@ -21,7 +30,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(Transition)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_execution_transitions(
     *,
@@ -30,11 +39,10 @@ def list_execution_transitions(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> tuple[str, dict]:
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
     query = f"""
-        ?[id, execution_id, type, current, next, output, metadata, updated_at, created_at] :=
+        ?[id, execution_id, type, current, next, output, metadata, updated_at, created_at, keyset_sort, keyset_id] :=
             *transitions {{
                 execution_id,
                 transition_id: id,
@@ -52,11 +60,13 @@ def list_execution_transitions(
                 null,
                 {{"workflow": next_tuple->0, "step": next_tuple->1}},
             ),
+            {keyset_query(sort_by)}
+            {keyset_filter_query(sort_by, direction) if cursor is not None else ""}
             execution_id = to_uuid($execution_id)
 
         :limit $limit
         :offset $offset
-        :sort {sort}
+        :sort {keyset_sort(sort_by, direction)}
     """
 
     return (
@@ -65,5 +75,6 @@ def list_execution_transitions(
             "execution_id": str(execution_id),
             "limit": limit,
             "offset": offset,
+            **keyset_variables(cursor, sort_by, direction),
         },
     )
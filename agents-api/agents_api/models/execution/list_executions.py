@@ -9,6 +9,10 @@ from pydantic import ValidationError
 from ...autogen.openapi_model import Execution
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -37,7 +41,7 @@ T = TypeVar("T")
         else d.get("output"),
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_executions(
     *,
@@ -47,9 +51,8 @@ def list_executions(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> tuple[list[str], dict]:
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
     list_query = f"""
     input[task_id] <- [[to_uuid($task_id)]]
 
@@ -63,6 +66,8 @@ def list_executions(
         metadata,
         created_at,
         updated_at,
+        keyset_sort,
+        keyset_id,
     ] := input[task_id],
         *executions {{
             task_id,
@@ -74,11 +79,13 @@ def list_executions(
             metadata,
             created_at,
             updated_at,
-        }}
+        }},
+        {keyset_query(sort_by)}
+        {keyset_filter_query(sort_by, direction) if cursor is not None else ""}
 
-    :limit {limit}
-    :offset {offset}
-    :sort {sort}
+    :limit $limit
+    :offset $offset
+    :sort {keyset_sort(sort_by, direction)}
     """
 
     queries = [
@@ -92,4 +99,12 @@ def list_executions(
         list_query,
     ]
 
-    return (queries, {"task_id": str(task_id), "limit": limit, "offset": offset})
+    return (
+        queries,
+        {
+            "task_id": str(task_id),
+            "limit": limit,
+            "offset": offset,
+            **keyset_variables(cursor, sort_by, direction),
+        },
+    )
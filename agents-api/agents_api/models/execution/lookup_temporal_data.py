@@ -27,7 +27,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(dict, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def lookup_temporal_data(
     *,
@@ -12,7 +12,6 @@ from ..task.get_task import get_task
 from ..tools.list_tools import list_tools
 from ..utils import (
     cozo_query,
-    fix_uuid_if_present,
     make_cozo_json_query,
     partialclass,
     rewrap_exceptions,
@@ -39,16 +38,15 @@ T = TypeVar("T")
     transform=lambda d: {
         **d,
         "task": {
-            "tools": [*map(fix_uuid_if_present, d["task"].pop("tools"))],
+            "tools": d["task"].pop("tools"),
             **d["task"],
         },
         "agent_tools": [
-            {tool["type"]: tool.pop("spec"), **tool}
-            for tool in map(fix_uuid_if_present, d["tools"])
+            {tool["type"]: tool.pop("spec"), **tool} for tool in d["tools"]
         ],
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def prepare_execution_input(
     *,
@@ -12,6 +12,7 @@ from ...autogen.openapi_model import ResourceDeletedResponse
 from ...common.utils.datetime import utcnow
 from ..utils import (
     cozo_query,
+    invalidate_verification_cache,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -57,9 +58,12 @@ def delete_session(
     Returns:
         ResourceDeletedResponse: The response indicating the deletion of the session.
     """
+
     session_id = str(session_id)
     developer_id = str(developer_id)
 
+    invalidate_verification_cache(developer_id, session_id)
+
     # Constructs and executes a datalog query to delete the specified session and its associated data based on the session_id and developer_id.
     delete_lookup_query = """
         # Convert session_id to UUID format
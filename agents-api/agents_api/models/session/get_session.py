@@ -8,7 +8,9 @@ from pydantic import ValidationError
 
 from ...common.protocol.sessions import make_session
 from ..utils import (
+    coalesce_lookups,
     cozo_query,
+    cozo_query_async,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -20,6 +22,85 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_sessions_by_keys(*, keys: list[list[str]]) -> tuple[str, dict]:
+    """
+    Fetches several sessions at once. Used to coalesce concurrent
+    `get_session` lookups; `keys` is a list of `[developer_id, session_id]`
+    pairs and sessions not owned by the given developer are simply missing
+    from the result.
+    """
+    get_query = """
+    input[developer_id, session_id] :=
+        keys[developer_id_str, session_id_str],
+        developer_id = to_uuid(developer_id_str),
+        session_id = to_uuid(session_id_str)
+
+    keys[developer_id_str, session_id_str] <- $keys
+
+    participants[collect(participant_id), participant_type, session_id] :=
+        input[_, session_id],
+        *session_lookup{
+            session_id,
+            participant_id,
+            participant_type,
+        }
+
+    # We have to do this dance because users can be zero or more
+    users_p[users, session_id] :=
+        participants[users, "user", session_id]
+
+    users_p[users, session_id] :=
+        input[_, session_id],
+        not participants[_, "user", session_id],
+        users = []
+
+    ?[
+        developer_id,
+        agents,
+        users,
+        id,
+        situation,
+        summary,
+        updated_at,
+        created_at,
+        metadata,
+        render_templates,
+        token_budget,
+        context_overflow,
+    ] := input[developer_id, id],
+        users_p[users, id],
+        participants[agents, "agent", id],
+        *sessions{
+            developer_id,
+            session_id: id,
+            situation,
+            summary,
+            created_at,
+            updated_at: validity,
+            metadata,
+            render_templates,
+            token_budget,
+            context_overflow,
+            @ "END"
+        },
+        updated_at = to_int(validity)
+    """
+
+    return (get_query, {"keys": keys})
+
+
+@coalesce_lookups(
+    get_sessions_by_keys,
+    keys={"developer_id": "developer_id", "session_id": "id"},
+    cls=make_session,
+)
 @rewrap_exceptions(
     {
         QueryException: partialclass(HTTPException, status_code=400),
@@ -28,7 +109,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(make_session, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_session(
     *,
@@ -9,10 +9,16 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...common.protocol.sessions import make_session
-from ...common.utils import json
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     wrap_in_class,
@@ -22,44 +28,14 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
-@rewrap_exceptions(
-    {
-        QueryException: partialclass(HTTPException, status_code=400),
-        ValidationError: partialclass(HTTPException, status_code=400),
-        TypeError: partialclass(HTTPException, status_code=400),
-    }
-)
-@wrap_in_class(make_session)
-@cozo_query
-@beartype
-def list_sessions(
-    *,
-    developer_id: UUID,
-    limit: int = 100,
-    offset: int = 0,
-    sort_by: Literal["created_at", "updated_at"] = "created_at",
-    direction: Literal["asc", "desc"] = "desc",
-    metadata_filter: dict[str, Any] = {},
-) -> tuple[list[str], dict]:
-    """
-    Lists sessions from the 'cozodb' database based on the provided filters.
-
-    Parameters:
-        developer_id (UUID): The developer's ID to filter sessions by.
-        limit (int): The maximum number of sessions to return.
-        offset (int): The offset from which to start listing sessions.
-        metadata_filter (dict[str, Any]): A dictionary of metadata fields to filter sessions by.
-    """
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
-    )
-
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
-    list_query = f"""
+@query_template
+def list_sessions_query(
+    metadata_filter_keys: tuple[str, ...],
+    sort_by: str,
+    direction: str,
+    keyset: bool = False,
+) -> str:
+    return f"""
         input[developer_id] <- [[
             to_uuid($developer_id),
         ]]
@@ -90,6 +66,8 @@ def list_sessions(
             metadata,
             token_budget,
             context_overflow,
+            keyset_sort,
+            keyset_id,
         ] :=
             input[developer_id],
             *sessions{{
@@ -107,21 +85,66 @@ def list_sessions(
             users_p[users, id],
             participants[agents, "agent", id],
             updated_at = to_int(validity),
-            {metadata_filter_str}
+            {keyset_query(sort_by)}
+            {keyset_filter_query(sort_by, direction) if keyset else ""}
+            {metadata_filter_query(metadata_filter_keys)}
 
         :limit $limit
         :offset $offset
-        :sort {sort}
+        :sort {keyset_sort(sort_by, direction)}
     """
 
+
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(HTTPException, status_code=400),
+        ValidationError: partialclass(HTTPException, status_code=400),
+        TypeError: partialclass(HTTPException, status_code=400),
+    }
+)
+@wrap_in_class(make_session)
+@cozo_query(readonly=True)
+@beartype
+def list_sessions(
+    *,
+    developer_id: UUID,
+    limit: int = 100,
+    offset: int = 0,
+    sort_by: Literal["created_at", "updated_at"] = "created_at",
+    direction: Literal["asc", "desc"] = "desc",
+    metadata_filter: dict[str, Any] = {},
+    cursor: str | None = None,
+) -> tuple[list[str], dict]:
+    """
+    Lists sessions from the 'cozodb' database based on the provided filters.
+
+    Parameters:
+        developer_id (UUID): The developer's ID to filter sessions by.
+        limit (int): The maximum number of sessions to return.
+        offset (int): The offset from which to start listing sessions.
+        metadata_filter (dict[str, Any]): A dictionary of metadata fields to filter sessions by.
+        cursor (str | None): Opaque cursor returned with the previous page, to continue after it.
+    """
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
+    )
+
     # Datalog query to retrieve agent information based on filters, sorted by creation date in descending order.
     queries = [
         verify_developer_id_query(developer_id),
-        list_query,
+        list_sessions_query(
+            metadata_filter_keys, sort_by, direction, keyset=cursor is not None
+        ),
     ]
 
     # Execute the datalog query and return the results as a pandas DataFrame.
     return (
         queries,
-        {"developer_id": str(developer_id), "limit": limit, "offset": offset},
+        {
+            "developer_id": str(developer_id),
+            "limit": limit,
+            "offset": offset,
+            **metadata_filter_vars,
+            **keyset_variables(cursor, sort_by, direction),
+        },
     )
@@ -38,7 +38,7 @@ T = TypeVar("T")
         ),
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def prepare_session_data(
     *,
@@ -10,6 +10,7 @@ from ...autogen.openapi_model import ResourceDeletedResponse
 from ...common.utils.datetime import utcnow
 from ..utils import (
     cozo_query,
+    invalidate_verification_cache,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -59,6 +60,8 @@ def delete_task(
         ResourceDeletedResponse: The deleted task.
     """
 
+    invalidate_verification_cache(developer_id, task_id)
+
     delete_query = """
     input[agent_id, task_id] <- [[
         to_uuid($agent_id),
@@ -28,7 +28,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(spec_to_task, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_task(
     *,
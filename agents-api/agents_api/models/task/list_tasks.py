@@ -9,6 +9,10 @@ from pydantic import ValidationError
 from ...common.protocol.tasks import spec_to_task
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -28,7 +32,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(spec_to_task)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_tasks(
     *,
@@ -38,6 +42,7 @@ def list_tasks(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> tuple[list[str], dict]:
     """
     Lists tasks for a given agent.
@@ -49,13 +54,12 @@ def list_tasks(
         offset (int): The number of tasks to skip before returning the results.
         sort_by (Literal["created_at", "updated_at"]): The field to sort the tasks by.
         direction (Literal["asc", "desc"]): The direction to sort the tasks in.
+        cursor (str | None): Opaque cursor returned with the previous page, to continue after it.
 
     Returns:
         Task[] | CreateTaskRequest[]: The list of tasks.
     """
 
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
     list_query = f"""
     input[agent_id] <- [[to_uuid($agent_id)]]
 
@@ -101,6 +105,8 @@ def list_tasks(
         created_at,
         updated_at,
         metadata,
+        keyset_sort,
+        keyset_id,
     ] := 
         task_data[
             task_id,
@@ -114,11 +120,13 @@ def list_tasks(
             created_at,
             updated_at,
             metadata,
-        ]
+        ],
+        {keyset_query(sort_by, "task_id")}
+        {keyset_filter_query(sort_by, direction) if cursor is not None else ""}
 
     :limit $limit
     :offset $offset
-    :sort {sort}
+    :sort {keyset_sort(sort_by, direction)}
     """
 
     queries = [
@@ -127,4 +135,12 @@ def list_tasks(
         list_query,
     ]
 
-    return (queries, {"agent_id": str(agent_id), "limit": limit, "offset": offset})
+    return (
+        queries,
+        {
+            "agent_id": str(agent_id),
+            "limit": limit,
+            "offset": offset,
+            **keyset_variables(cursor, sort_by, direction),
+        },
+    )
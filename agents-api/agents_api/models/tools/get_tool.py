@@ -36,7 +36,7 @@ T = TypeVar("T")
     },
     one=True,
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_tool(
     *,
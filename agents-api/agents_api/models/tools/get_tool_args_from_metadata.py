@@ -113,7 +113,7 @@ def tool_args_for_session(
     }
 )
 @wrap_in_class(dict, transform=lambda x: x["values"], one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_tool_args_from_metadata(
     *,
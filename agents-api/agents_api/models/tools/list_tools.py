@@ -38,7 +38,7 @@ T = TypeVar("T")
         **d,
     },
 )
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_tools(
     *,
@@ -14,6 +14,7 @@ from ...autogen.openapi_model import ResourceDeletedResponse
 from ...common.utils.datetime import utcnow
 from ..utils import (
     cozo_query,
+    invalidate_verification_cache,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -80,6 +81,8 @@ def delete_user(*, developer_id: UUID, user_id: UUID) -> tuple[list[str], dict]:
         ResourceDeletedResponse: The response indicating the deletion of the user.
     """
 
+    invalidate_verification_cache(developer_id, user_id)
+
     queries = [
         verify_developer_id_query(developer_id),
         verify_developer_owns_resource_query(developer_id, "users", user_id=user_id),
@@ -8,7 +8,9 @@ from pydantic import ValidationError
 
 from ...autogen.openapi_model import User
 from ..utils import (
+    coalesce_lookups,
     cozo_query,
+    cozo_query_async,
     partialclass,
     rewrap_exceptions,
     verify_developer_id_query,
@@ -20,6 +22,61 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
+@rewrap_exceptions(
+    {
+        QueryException: partialclass(
+            HTTPException,
+            status_code=400,
+            detail="A database query failed to return the expected results. This might occur if the requested resource doesn't exist or your query parameters are incorrect.",
+        ),
+    }
+)
+@cozo_query_async(readonly=True)
+@beartype
+def get_users_by_keys(*, keys: list[list[str]]) -> tuple[str, dict]:
+    """
+    Fetches several users at once. Used to coalesce concurrent `get_user`
+    lookups; `keys` is a list of `[developer_id, user_id]` pairs and users
+    not owned by the given developer are simply missing from the result.
+    """
+    get_query = """
+    input[developer_id_str, user_id_str] <- $keys
+
+    ?[
+        developer_id,
+        id,
+        name,
+        about,
+        created_at,
+        updated_at,
+        metadata,
+    ] := input[developer_id_str, user_id_str],
+        developer_id = to_uuid(developer_id_str),
+        id = to_uuid(user_id_str),
+        *users {
+            user_id: id,
+            developer_id,
+            name,
+            about,
+            created_at,
+            updated_at,
+            metadata,
+        }
+    """
+
+    return (get_query, {"keys": keys})
+
+
+@coalesce_lookups(
+    get_users_by_keys,
+    keys={"developer_id": "developer_id", "user_id": "id"},
+    cls=User,
+    not_found=partialclass(
+        HTTPException,
+        status_code=404,
+        detail="The specified developer does not own the requested resource. Please verify the ownership or check if the developer ID is correct.",
+    ),
+)
 @rewrap_exceptions(
     {
         lambda e: isinstance(e, QueryException)
@@ -51,7 +108,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(User, one=True)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def get_user(
     *,
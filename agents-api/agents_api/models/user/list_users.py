@@ -7,10 +7,16 @@ from pycozo.client import QueryException
 from pydantic import ValidationError
 
 from ...autogen.openapi_model import User
-from ...common.utils import json
 from ..utils import (
     cozo_query,
+    keyset_filter_query,
+    keyset_query,
+    keyset_sort,
+    keyset_variables,
+    metadata_filter_query,
+    metadata_filter_variables,
     partialclass,
+    query_template,
     rewrap_exceptions,
     verify_developer_id_query,
     wrap_in_class,
@@ -20,6 +26,47 @@ ModelT = TypeVar("ModelT", bound=Any)
 T = TypeVar("T")
 
 
+@query_template
+def list_users_query(
+    metadata_filter_keys: tuple[str, ...],
+    sort_by: str,
+    direction: str,
+    keyset: bool = False,
+) -> str:
+    # Define the datalog query for retrieving user information based on the specified filters and sorting them by creation date in descending order.
+    return f"""
+    input[developer_id] <- [[to_uuid($developer_id)]]
+
+    ?[
+        id,
+        name,
+        about,
+        created_at,
+        updated_at,
+        metadata,
+        keyset_sort,
+        keyset_id,
+    ] :=
+        input[developer_id],
+        *users {{
+            user_id: id,
+            developer_id,
+            name,
+            about,
+            created_at,
+            updated_at,
+            metadata,
+        }},
+        {keyset_query(sort_by)}
+        {keyset_filter_query(sort_by, direction) if keyset else ""}
+        {metadata_filter_query(metadata_filter_keys)}
+
+    :limit $limit
+    :offset $offset
+    :sort {keyset_sort(sort_by, direction)}
+    """
+
+
 @rewrap_exceptions(
     {
         QueryException: partialclass(
@@ -40,7 +87,7 @@ T = TypeVar("T")
     }
 )
 @wrap_in_class(User)
-@cozo_query
+@cozo_query(readonly=True)
 @beartype
 def list_users(
     *,
@@ -50,6 +97,7 @@ def list_users(
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
     metadata_filter: dict[str, Any] = {},
+    cursor: str | None = None,
 ) -> tuple[list[str], dict]:
     """
     Queries the 'cozodb' database to list users associated with a specific developer.
@@ -61,56 +109,30 @@ def list_users(
         sort_by (Literal["created_at", "updated_at"]): The field to sort the users by. Defaults to "created_at".
         direction (Literal["asc", "desc"]): The direction to sort the users in. Defaults to "desc".
         metadata_filter (dict[str, Any]): A dictionary representing filters to apply on user metadata.
+        cursor (str | None): Opaque cursor returned with the previous page, to continue after it.
 
     Returns:
         pd.DataFrame: A DataFrame containing the queried user data.
     """
-    # Construct a filter string for the metadata based on the provided dictionary.
-    metadata_filter_str = ", ".join(
-        [
-            f"metadata->{json.dumps(k)} == {json.dumps(v)}"
-            for k, v in metadata_filter.items()
-        ]
+    metadata_filter_keys, metadata_filter_vars = metadata_filter_variables(
+        metadata_filter
     )
 
-    sort = f"{'-' if direction == 'desc' else ''}{sort_by}"
-
-    # Define the datalog query for retrieving user information based on the specified filters and sorting them by creation date in descending order.
-    list_query = f"""
-    input[developer_id] <- [[to_uuid($developer_id)]]
-
-    ?[
-        id,
-        name,
-        about,
-        created_at,
-        updated_at,
-        metadata,
-    ] :=
-        input[developer_id],
-        *users {{
-            user_id: id,
-            developer_id,
-            name,
-            about,
-            created_at,
-            updated_at,
-            metadata,
-        }},
-        {metadata_filter_str}
-
-    :limit $limit
-    :offset $offset
-    :sort {sort}
-    """
-
     queries = [
         verify_developer_id_query(developer_id),
-        list_query,
+        list_users_query(
+            metadata_filter_keys, sort_by, direction, keyset=cursor is not None
+        ),
     ]
 
     # Execute the datalog query with the specified parameters and return the results as a DataFrame.
     return (
         queries,
-        {"developer_id": str(developer_id), "limit": limit, "offset": offset},
+        {
+            "developer_id": str(developer_id),
+            "limit": limit,
+            "offset": offset,
+            **metadata_filter_vars,
+            **keyset_variables(cursor, sort_by, direction),
+        },
     )
@@ -1,53 +1,83 @@
+import asyncio
 import inspect
+import json
+import logging
 import re
+import threading
 import time
-from functools import partialmethod, wraps
-from typing import Any, Callable, ParamSpec, Type, TypeVar
+import weakref
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache, partialmethod, wraps
+from pprint import pprint
+from typing import Any, Awaitable, Callable, NoReturn, ParamSpec, Type, TypeVar
 from uuid import UUID
 
 import pandas as pd
 from fastapi import HTTPException
+from prometheus_client import Counter, Histogram
 from pydantic import BaseModel
 
+from ..common.utils.corpus_stats import CorpusStatsCache
 from ..common.utils.cozo import uuid_int_list_to_uuid4
-from ..env import do_verify_developer, do_verify_developer_owns_resource
+from ..common.utils.limiter import ConcurrencyLimitExceeded
+from ..common.utils.pagination import InvalidCursor, Page, decode_cursor
+from ..env import (
+    corpus_stats_cache_size,
+    corpus_stats_ttl,
+    do_verify_developer,
+    do_verify_developer_owns_resource,
+    query_batch_max_size,
+    query_batch_window,
+    slow_query_explain,
+    slow_query_threshold,
+    verification_cache_size,
+    verification_cache_ttl,
+)
 
 P = ParamSpec("P")
 T = TypeVar("T")
 ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
-def fix_uuid(
-    item: dict[str, Any], attr_regex: str = r"^(?:id|.*_id)$"
-) -> dict[str, Any]:
-    # find the attributes that are ids
-    id_attrs = [
-        attr for attr in item.keys() if re.match(attr_regex, attr) and item[attr]
-    ]
+UUID_ATTR_REGEX = r"^(?:id|.*_id)$"
 
-    if not id_attrs:
-        return item
 
-    fixed = {
-        **item,
-        **{
-            attr: uuid_int_list_to_uuid4(item[attr])
-            for attr in id_attrs
-            if isinstance(item[attr], list)
-        },
-    }
+@lru_cache(maxsize=4096)
+def _uuid_keys(keys: tuple[str, ...], attr_regex: str = UUID_ATTR_REGEX) -> frozenset:
+    # Computed once per object / result schema instead of once per row
+    pattern = re.compile(attr_regex)
+    return frozenset(key for key in keys if pattern.match(key))
 
-    return fixed
+
+def _as_uuid(value: Any) -> Any:
+    if isinstance(value, list) and len(value) == 16:
+        return uuid_int_list_to_uuid4(value)
+
+    return value
+
+
+def fix_uuid(item: dict[str, Any], attr_regex: str = UUID_ATTR_REGEX) -> dict[str, Any]:
+    uuid_keys = _uuid_keys(tuple(item), attr_regex)
+
+    return {
+        key: (
+            _as_uuid(value)
+            if key in uuid_keys
+            else fix_uuid_if_present(value, attr_regex)
+        )
+        for key, value in item.items()
+    }
 
 
 def fix_uuid_list(
-    items: list[dict[str, Any]], attr_regex: str = r"^(?:id|.*_id)$"
+    items: list[dict[str, Any]], attr_regex: str = UUID_ATTR_REGEX
 ) -> list[dict[str, Any]]:
-    fixed = list(map(lambda item: fix_uuid(item, attr_regex), items))
+    fixed = [fix_uuid(item, attr_regex) for item in items]
     return fixed
 
 
-def fix_uuid_if_present(item: Any, attr_regex: str = r"^(?:id|.*_id)$") -> Any:
+def fix_uuid_if_present(item: Any, attr_regex: str = UUID_ATTR_REGEX) -> Any:
     match item:
         case [dict(), *_]:
             return fix_uuid_list(item, attr_regex)
@@ -59,6 +89,62 @@ def fix_uuid_if_present(item: Any, attr_regex: str = r"^(?:id|.*_id)$") -> Any:
             return item
 
 
+def _is_nested_value(value: Any) -> bool:
+    match value:
+        case dict() | [dict(), *_]:
+            return True
+
+        case _:
+            return False
+
+
+def cozo_result_to_records(
+    result: pd.DataFrame | dict[str, Any], attr_regex: str = UUID_ATTR_REGEX
+) -> list[dict[str, Any]]:
+    """
+    Decode a raw Cozo response (`headers`/`rows`) into a list of row dicts.
+
+    Cozo returns UUIDs nested inside JSON values as integer lists (see
+    https://github.com/cozodb/cozo/issues/269). The id columns and the nested
+    (JSON object) columns are worked out once per result, and the nested
+    values are fixed recursively using key sets cached per object schema.
+    """
+
+    if isinstance(result, pd.DataFrame):
+        # Missing values of numeric columns are NaN in DataFrames
+        result = result.astype(object).where(result.notna(), None)
+
+        headers = list(result.columns)
+        rows = list(result.itertuples(index=False, name=None))
+    else:
+        headers, rows = result["headers"], result["rows"]
+
+    uuid_keys = _uuid_keys(tuple(headers), attr_regex)
+    uuid_columns = [i for i, header in enumerate(headers) if header in uuid_keys]
+    nested_columns = [
+        i
+        for i in range(len(headers))
+        if i not in uuid_columns
+        and _is_nested_value(next((row[i] for row in rows if row[i]), None))
+    ]
+
+    if not uuid_columns and not nested_columns:
+        return [dict(zip(headers, row)) for row in rows]
+
+    records = []
+    for row in rows:
+        row = list(row)
+        for i in uuid_columns:
+            row[i] = _as_uuid(row[i])
+
+        for i in nested_columns:
+            row[i] = fix_uuid_if_present(row[i], attr_regex)
+
+        records.append(dict(zip(headers, row)))
+
+    return records
+
+
 def partialclass(cls, *args, **kwargs):
     cls_signature = inspect.signature(cls)
     bound = cls_signature.bind_partial(*args, **kwargs)
@@ -71,11 +157,102 @@ def partialclass(cls, *args, **kwargs):
     return NewCls
 
 
-def mark_session_updated_query(developer_id: UUID | str, session_id: UUID | str) -> str:
-    return f"""
+# Datalog templates declared by the model functions, keyed by qualified name
+query_templates: dict[str, Callable[..., str]] = {}
+
+
+def query_template(func: Callable[P, str]) -> Callable[P, str]:
+    """
+    Declare the Datalog text of a query. The decorated function must only take
+    arguments describing the *shape* of the query (e.g. the metadata filter
+    keys or the sort order) and reference every value as a `$param`, so that
+    the text is generated once per shape and cached.
+    """
+
+    template = lru_cache(maxsize=256)(func)
+    query_templates[f"{func.__module__}.{func.__qualname__}"] = template
+
+    return template
+
+
+@query_template
+def metadata_filter_query(keys: tuple[str, ...], column: str = "metadata") -> str:
+    return ", ".join(
+        f"{column}->{json.dumps(key)} == $metadata_filter_{i}"
+        for i, key in enumerate(keys)
+    )
+
+
+def metadata_filter_variables(
+    metadata_filter: dict[str, Any],
+) -> tuple[tuple[str, ...], dict[str, Any]]:
+    """
+    Split a metadata filter into its shape (the keys to pass to
+    `metadata_filter_query`) and the variables holding its values.
+    """
+    keys = tuple(sorted(metadata_filter))
+    variables = {
+        f"metadata_filter_{i}": metadata_filter[key] for i, key in enumerate(keys)
+    }
+
+    return keys, variables
+
+
+KEYSET_COLUMNS = ("keyset_sort", "keyset_id")
+
+
+def keyset_query(sort_by: str, id_column: str = "id") -> str:
+    """
+    Rule body clause (with a trailing comma) binding the keyset of the row for
+    keyset pagination: `keyset_sort`, the sort column in whole microseconds,
+    and `keyset_id`, the id of the row as a string, which breaks ties (Cozo
+    can't compare Uuids with `<` / `>`). The output must include both, so that
+    the rows can be sorted by them (see `keyset_sort`) and `wrap_in_class` can
+    keep the keyset of the last row for the cursor of the next page.
+    """
+    return (
+        f"keyset_sort = round({sort_by} * 1000000), keyset_id = to_string({id_column}),"
+    )
+
+
+@query_template
+def keyset_filter_query(sort_by: str, direction: str) -> str:
+    """
+    Rule body clause (with a trailing comma) that keeps the rows after the
+    `$cursor_sort` / `$cursor_id` position, for keyset pagination. The rule
+    must bind the keyset (see `keyset_query`) before this clause.
+    """
+    op = "<" if direction == "desc" else ">"
+
+    return f"""(keyset_sort {op} $cursor_sort || (keyset_sort == $cursor_sort && keyset_id {op} $cursor_id)),"""
+
+
+def keyset_sort(sort_by: str, direction: str) -> str:
+    prefix = "-" if direction == "desc" else ""
+    return f"{prefix}keyset_sort, {prefix}keyset_id"
+
+
+def keyset_variables(
+    cursor: str | None, sort_by: str, direction: str
+) -> dict[str, Any]:
+    if cursor is None:
+        return {}
+
+    try:
+        sort_value, id = decode_cursor(cursor, sort_by, direction)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    # Passed as a float so that it compares with the rounded float `keyset_sort`
+    return {"cursor_sort": float(sort_value), "cursor_id": id}
+
+
+@query_template
+def _mark_session_updated_query() -> str:
+    return """
     input[developer_id, session_id] <- [[
-        to_uuid("{str(developer_id)}"),
-        to_uuid("{str(session_id)}"),
+        to_uuid($mark_session_updated_developer_id),
+        to_uuid($mark_session_updated_session_id),
     ]]
 
     ?[
@@ -91,7 +268,7 @@ def mark_session_updated_query(developer_id: UUID | str, session_id: UUID | str)
         updated_at,
     ] :=
         input[developer_id, session_id],
-        *sessions {{
+        *sessions {
             session_id,
             situation,
             summary,
@@ -101,10 +278,10 @@ def mark_session_updated_query(developer_id: UUID | str, session_id: UUID | str)
             token_budget,
             context_overflow,
             @ 'END'
-        }},
+        },
         updated_at = [floor(now()), true]
 
-    :put sessions {{
+    :put sessions {
         developer_id,
         session_id,
         situation,
@@ -115,19 +292,323 @@ def mark_session_updated_query(developer_id: UUID | str, session_id: UUID | str)
         token_budget,
         context_overflow,
         updated_at,
-    }}
+    }
     """
 
 
-def verify_developer_id_query(developer_id: UUID | str) -> str:
-    if not do_verify_developer:
-        return "?[exists] := exists = true"
+def mark_session_updated_query(developer_id: UUID | str, session_id: UUID | str) -> str:
+    bind_query_variables(
+        mark_session_updated_developer_id=str(developer_id),
+        mark_session_updated_session_id=str(session_id),
+    )
+
+    return _mark_session_updated_query()
+
+
+corpus_stats_cache = CorpusStatsCache(
+    ttl=corpus_stats_ttl, maxsize=corpus_stats_cache_size
+)
+
+
+@query_template
+def _update_owner_doc_stats_query(deleted_doc: bool) -> str:
+    if deleted_doc:
+        # Computed from the doc before it is deleted (if it exists)
+        deltas = """
+        removed_docs[count(doc_id)] :=
+            doc_id = to_uuid($stats_doc_id),
+            *docs {
+                owner_type: $stats_owner_type,
+                owner_id: to_uuid($stats_owner_id),
+                doc_id,
+            }
+
+        found_snippets[count(index)] :=
+            *snippets {
+                doc_id: to_uuid($stats_doc_id),
+                index,
+            }
+
+        removed_snippets[count] := found_snippets[count]
+        removed_snippets[count] :=
+            doc_id = to_uuid($stats_doc_id),
+            not *snippets { doc_id },
+            count = 0
+
+        deltas[docs, snippets] :=
+            removed_docs[removed],
+            removed > 0,
+            removed_snippets[snippets_removed],
+            docs = -removed,
+            snippets = -snippets_removed
+        """
+    else:
+        deltas = """
+        deltas[docs, snippets] <- [[$stats_docs_added, $stats_snippets_added]]
+        """
+
+    return f"""
+        {deltas}
+
+        current[doc_count, snippet_count] :=
+            *owner_doc_stats {{
+                owner_type: $stats_owner_type,
+                owner_id: to_uuid($stats_owner_id),
+                doc_count,
+                snippet_count,
+            }}
+
+        current[doc_count, snippet_count] :=
+            owner_id = to_uuid($stats_owner_id),
+            not *owner_doc_stats {{
+                owner_type: $stats_owner_type,
+                owner_id,
+            }},
+            doc_count = 0,
+            snippet_count = 0
+
+        ?[owner_type, owner_id, doc_count, snippet_count] :=
+            deltas[docs, snippets],
+            current[current_docs, current_snippets],
+            owner_type = $stats_owner_type,
+            owner_id = to_uuid($stats_owner_id),
+            doc_count = max(current_docs + docs, 0),
+            snippet_count = max(current_snippets + snippets, 0)
+
+        :put owner_doc_stats {{ owner_type, owner_id => doc_count, snippet_count }}
+    """
+
+
+def update_owner_doc_stats_query(
+    owner_type: str,
+    owner_id: UUID | str,
+    *,
+    docs_added: int = 0,
+    snippets_added: int = 0,
+    deleted_doc_id: UUID | str | None = None,
+) -> str:
+    """
+    Query updating the doc statistics of an owner, either with the number of
+    docs and snippets added, or (before deleting it) with those of a doc.
+    """
+    owner_id = str(owner_id)
+
+    # Forgotten now, and again once the query succeeded, so that searches
+    # running in between don't cache the stats from before the change
+    corpus_stats_cache.invalidate(owner_type, owner_id)
+
+    if (context := _query_context.get()) is not None:
+        context["stats_invalidated"].append((owner_type, owner_id))
+
+    bind_query_variables(
+        stats_owner_type=owner_type,
+        stats_owner_id=owner_id,
+        stats_docs_added=docs_added,
+        stats_snippets_added=snippets_added,
+        stats_doc_id=str(deleted_doc_id),
+    )
+
+    return _update_owner_doc_stats_query(deleted_doc_id is not None)
+
+
+@query_template
+def _bump_owner_doc_generation_query(by_doc: bool) -> str:
+    if by_doc:
+        owner_query = """
+        owner[owner_type, owner_id] :=
+            *docs {
+                doc_id: to_uuid($generation_doc_id),
+                owner_type,
+                owner_id,
+            }
+        """
+    else:
+        owner_query = """
+        owner[owner_type, owner_id] :=
+            owner_type = $generation_owner_type,
+            owner_id = to_uuid($generation_owner_id)
+        """
 
     return f"""
+        {owner_query}
+
+        current[owner_type, owner_id, generation] :=
+            owner[owner_type, owner_id],
+            *owner_doc_generations {{ owner_type, owner_id, generation }}
+
+        current[owner_type, owner_id, generation] :=
+            owner[owner_type, owner_id],
+            not *owner_doc_generations {{ owner_type, owner_id }},
+            generation = 0
+
+        ?[owner_type, owner_id, generation] :=
+            current[owner_type, owner_id, current_generation],
+            generation = current_generation + 1
+
+        :put owner_doc_generations {{ owner_type, owner_id => generation }}
+    """
+
+
+def bump_owner_doc_generation_query(
+    owner_type: str | None = None,
+    owner_id: UUID | str | None = None,
+    *,
+    doc_id: UUID | str | None = None,
+) -> str:
+    """
+    Query bumping the doc generation of an owner (given directly, or as the
+    owner of a doc), which invalidates the cached results of its searches.
+    """
+    assert doc_id is not None or (owner_type and owner_id)
+
+    bind_query_variables(
+        generation_owner_type=owner_type,
+        generation_owner_id=str(owner_id),
+        generation_doc_id=str(doc_id),
+    )
+
+    return _bump_owner_doc_generation_query(doc_id is not None)
+
+
+class VerificationCache:
+    """
+    Process-local TTL cache of developer / resource-ownership checks that
+    already passed, so that hot read paths can skip re-running them.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, ...], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: tuple[str, ...]) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+
+            return True
+
+    def add(self, key: tuple[str, ...]) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, developer_id: UUID | str, resource_id: UUID | str) -> None:
+        """
+        Drop every check involving `resource_id`, as well as checks of the
+        developer's nested resources (those verified through parents), since
+        they may belong to the deleted resource.
+        """
+        developer_id, resource_id = str(developer_id), str(resource_id)
+
+        with self._lock:
+            for key in list(self._entries):
+                nested = key[0] == "resource" and key[1] == developer_id and key[-1]
+                if resource_id in key or nested:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+verification_cache = VerificationCache(
+    ttl=verification_cache_ttl, maxsize=verification_cache_size
+)
+
+verification_cache_hits = Counter(
+    "verification_cache_hits",
+    "Number of developer / ownership checks skipped thanks to the cache",
+    labelnames=("kind",),
+)
+
+verification_cache_misses = Counter(
+    "verification_cache_misses",
+    "Number of developer / ownership checks that had to run in Cozo",
+    labelnames=("kind",),
+)
+
+# Verification checks included in (and invalidations requested by) the query
+# currently being built, and the variables bound by the shared sub-queries.
+# `cozo_query` merges / applies them once the query has been built.
+_query_context: ContextVar[dict[str, Any] | None] = ContextVar(
+    "query_context", default=None
+)
+
+
+def _new_query_context() -> dict[str, Any]:
+    return dict(verified=[], invalidated=[], stats_invalidated=[], variables={})
+
+
+def bind_query_variables(**variables: Any) -> None:
+    """
+    Add variables to the query currently being built. Used by the shared
+    sub-queries (e.g. the verification checks) so that their text does not
+    depend on the values and can be cached as a template.
+    """
+    if (context := _query_context.get()) is not None:
+        context["variables"].update(variables)
+
+
+def _is_verified(key: tuple[str, ...]) -> bool:
+    kind = key[0]
+
+    if key in verification_cache:
+        verification_cache_hits.labels(kind).inc()
+        return True
+
+    verification_cache_misses.labels(kind).inc()
+
+    if (context := _query_context.get()) is not None:
+        context["verified"].append(key)
+
+    return False
+
+
+def _apply_pending_cache_updates(context: dict[str, Any]) -> None:
+    for key in context["verified"]:
+        verification_cache.add(key)
+
+    for developer_id, resource_id in context["invalidated"]:
+        verification_cache.invalidate(developer_id, resource_id)
+
+    for owner_type, owner_id in context["stats_invalidated"]:
+        corpus_stats_cache.invalidate(owner_type, owner_id)
+
+
+def invalidate_verification_cache(
+    developer_id: UUID | str, resource_id: UUID | str
+) -> None:
+    """
+    Forget cached checks for a resource that is being deleted. Called from the
+    delete_* query builders; the invalidation is repeated once the delete query
+    has succeeded so that checks run as part of it are not cached again.
+    """
+    verification_cache.invalidate(developer_id, resource_id)
+
+    if (context := _query_context.get()) is not None:
+        context["invalidated"].append((str(developer_id), str(resource_id)))
+
+
+@query_template
+def _verify_developer_id_query() -> str:
+    return """
     matched[count(developer_id)] :=
-        *developers{{
+        *developers{
             developer_id,
-        }}, developer_id = to_uuid("{str(developer_id)}")
+        }, developer_id = to_uuid($verify_developer_id)
         
     ?[exists] :=
         matched[num],
@@ -138,25 +619,32 @@ def verify_developer_id_query(developer_id: UUID | str) -> str:
     """
 
 
-def verify_developer_owns_resource_query(
-    developer_id: UUID | str,
-    resource: str,
-    parents: list[tuple[str, str]] | None = None,
-    **resource_id,
-) -> str:
-    if not do_verify_developer_owns_resource:
+def verify_developer_id_query(developer_id: UUID | str) -> str:
+    if not do_verify_developer:
         return "?[exists] := exists = true"
 
-    parents = parents or []
-    resource_id_key, resource_id_value = next(iter(resource_id.items()))
+    if _is_verified(("developer", str(developer_id))):
+        return "?[exists] := exists = true"
+
+    bind_query_variables(verify_developer_id=str(developer_id))
 
-    parents.append((resource, resource_id_key))
+    return _verify_developer_id_query()
+
+
+@query_template
+def _verify_developer_owns_resource_query(
+    resource: str,
+    resource_id_key: str,
+    parents: tuple[tuple[str, str], ...],
+    resource_id_param: str,
+) -> str:
+    parents = [*parents, (resource, resource_id_key)]
     parent_keys = ["developer_id", *map(lambda x: x[1], parents)]
 
     rule_head = f"""
     found[count({resource_id_key})] :=
-        developer_id = to_uuid("{str(developer_id)}"),
-        {resource_id_key} = to_uuid("{str(resource_id_value)}"),
+        developer_id = to_uuid($verify_developer_id),
+        {resource_id_key} = to_uuid(${resource_id_param}),
     """
 
     rule_body = ""
@@ -172,7 +660,7 @@ def verify_developer_owns_resource_query(
     ?[exists] :=
         found[num],
         exists = num > 0,
-        assert(exists, "Developer does not own resource {resource} with {resource_id_key} {resource_id_value}")
+        assert(exists, "Developer does not own resource {resource} with {resource_id_key}")
 
     :limit 1
     """
@@ -181,15 +669,228 @@ def verify_developer_owns_resource_query(
     return rule
 
 
+def verify_developer_owns_resource_query(
+    developer_id: UUID | str,
+    resource: str,
+    parents: list[tuple[str, str]] | None = None,
+    **resource_id,
+) -> str:
+    if not do_verify_developer_owns_resource:
+        return "?[exists] := exists = true"
+
+    parents = tuple(parents or [])
+    resource_id_key, resource_id_value = next(iter(resource_id.items()))
+
+    cache_key = (
+        "resource",
+        str(developer_id),
+        resource,
+        resource_id_key,
+        str(resource_id_value),
+        "/".join(relation for relation, _ in parents),
+    )
+
+    if _is_verified(cache_key):
+        return "?[exists] := exists = true"
+
+    # The same resource can be checked more than once in a query (e.g. each
+    # owner when searching docs), so number the parameter per check
+    context = _query_context.get()
+    index = len(context["variables"]) if context is not None else 0
+    resource_id_param = f"verify_{resource}_{resource_id_key}_{index}"
+
+    bind_query_variables(
+        verify_developer_id=str(developer_id),
+        **{resource_id_param: str(resource_id_value)},
+    )
+
+    return _verify_developer_owns_resource_query(
+        resource, resource_id_key, parents, resource_id_param
+    )
+
+
 def make_cozo_json_query(fields):
     return ", ".join(f'"{field}": {field}' for field in fields).strip()
 
 
+def _prepare_cozo_query(queries: str | list[str | None]) -> str:
+    if isinstance(queries, str):
+        return queries
+
+    queries = [str(query) for query in queries if query]
+    query = "}\n\n{\n".join(queries)
+    return f"{{ {query} }}"
+
+
+slow_query_logger = logging.getLogger("agents_api.slow_queries")
+
+cozo_query_latency = Histogram(
+    "cozo_query_latency_seconds",
+    "Time taken by Cozo queries, per model function",
+    labelnames=("query", "rows", "error"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+def _rows_label(rows: int | None) -> str:
+    # Row counts are bucketed so that the label has a bounded set of values
+    if rows is None:
+        return ""
+
+    for bound in (0, 1, 10, 100, 1000):
+        if rows <= bound:
+            return str(bound)
+
+    return "+Inf"
+
+
+def _observe_query(
+    name: str, elapsed: float, rows: int | None = None, error: Exception | None = None
+) -> bool:
+    """Record the latency of a query; returns True if it is slow enough to be logged."""
+    cozo_query_latency.labels(
+        name, _rows_label(rows), type(error).__name__ if error else ""
+    ).observe(elapsed)
+
+    # Both are in seconds
+    return 0 < slow_query_threshold < elapsed
+
+
+def _explain_query(queries: str | list[str | None]) -> str:
+    # Only the last query of a chain is explained; the ones before it are checks
+    if not isinstance(queries, str):
+        queries = [str(query) for query in queries if query][-1]
+
+    return f"::explain {{ {queries} }}"
+
+
+def _log_slow_query(
+    name: str,
+    query: str,
+    variables: dict[str, Any],
+    elapsed: float,
+    rows: int | None = None,
+    error: Exception | None = None,
+    plan: Any = None,
+) -> None:
+    slow_query_logger.warning(
+        json.dumps(
+            {
+                "query_name": name,
+                "elapsed": round(elapsed, 6),
+                "rows": rows,
+                "error": repr(error) if error else None,
+                "parameter_sizes": {
+                    key: len(json.dumps(value, default=str))
+                    for key, value in variables.items()
+                },
+                "query": query,
+                "plan": plan,
+            },
+            default=str,
+        )
+    )
+
+
+def _build_cozo_query(
+    func: Callable[..., tuple[str | list[Any], dict]],
+    args: tuple,
+    kwargs: dict,
+    *,
+    debug: bool | None = None,
+    only_on_error: bool = False,
+) -> tuple[str | list[Any], str, dict, dict[str, Any]]:
+    """Call the query builder, returning its queries, the joined query, the variables and the query context."""
+    token = _query_context.set(context := _new_query_context())
+    try:
+        queries, variables = func(*args, **kwargs)
+    finally:
+        _query_context.reset(token)
+
+    variables = {**context["variables"], **variables}
+
+    query = _prepare_cozo_query(queries)
+
+    not only_on_error and debug and print(query)
+    not only_on_error and debug and pprint(
+        dict(
+            variables=variables,
+        )
+    )
+
+    return queries, query, variables, context
+
+
+def _handle_query_error(
+    name: str,
+    query: str,
+    variables: dict,
+    elapsed: float,
+    error: Exception,
+    *,
+    debug: bool | None = None,
+    only_on_error: bool = False,
+) -> NoReturn:
+    from ..clients import cozo
+
+    if _observe_query(name, elapsed, error=error):
+        _log_slow_query(name, query, variables, elapsed, error=error)
+
+    if only_on_error and debug:
+        print(query)
+        pprint(variables)
+
+    debug and print(repr(error))
+
+    if isinstance(error, ConcurrencyLimitExceeded) or cozo.is_resource_busy_error(
+        error
+    ):
+        raise HTTPException(
+            status_code=429, detail="Resource busy. Please try again later."
+        ) from error
+
+    raise error
+
+
+def _query_result_records(
+    name: str, context: dict[str, Any], result: Any, elapsed: float
+) -> tuple[list[dict], bool]:
+    """Decode the result of a successful query; also returns whether it was slow."""
+    # The checks passed, so they can be skipped for a while
+    _apply_pending_cache_updates(context)
+
+    # Need to fix the UUIDs in the result
+    records = cozo_result_to_records(result)
+
+    return records, _observe_query(name, elapsed, rows=len(records))
+
+
+def _query_output(
+    records: list[dict],
+    *,
+    debug: bool | None = None,
+    only_on_error: bool = False,
+    dataframe: bool = False,
+) -> list[dict] | pd.DataFrame:
+    not only_on_error and debug and pprint(
+        dict(
+            result=records,
+        )
+    )
+
+    if dataframe:
+        return pd.DataFrame.from_records(records)
+
+    return records
+
+
 def cozo_query(
     func: Callable[P, tuple[str | list[str | None], dict]] | None = None,
     debug: bool | None = None,
     only_on_error: bool = False,
     timeit: bool = False,
+    dataframe: bool = False,
+    readonly: bool = False,
 ):
     def cozo_query_dec(func: Callable[P, tuple[str | list[Any], dict]]):
         """
@@ -197,80 +898,181 @@ def cozo_query(
         returns a (query string, variables) tuple.
 
         The wrapped function should additionally take a client keyword argument
-        and then run the query using the client, returning a DataFrame.
+        and then run the query using the client, returning a list of row dicts
+        (or a DataFrame when `dataframe=True`). Without a client, the query is
+        routed by `cozo.get_cozo_router()`; `readonly=True` queries may be
+        served by a read replica.
+
+        The latency of every query is recorded in the `cozo_query_latency_seconds`
+        histogram, labeled by the function name, and queries slower than
+        `SLOW_QUERY_THRESHOLD` seconds are written to the `agents_api.slow_queries`
+        log.
         """
 
-        from pprint import pprint
+        @wraps(func)
+        def wrapper(
+            *args: P.args, client=None, **kwargs: P.kwargs
+        ) -> list[dict] | pd.DataFrame:
+            queries, query, variables, context = _build_cozo_query(
+                func, args, kwargs, debug=debug, only_on_error=only_on_error
+            )
+
+            # Run the query
+            from ..clients import cozo
 
-        from tenacity import (
-            retry,
-            retry_if_exception,
-            stop_after_attempt,
-            wait_exponential,
-        )
+            def run(query: str, readonly: bool = readonly) -> dict:
+                if client is not None:
+                    return client.run(query, variables, immutable=readonly)
+
+                return cozo.get_cozo_router().run(
+                    query,
+                    variables,
+                    readonly=readonly,
+                    developer_id=kwargs.get("developer_id"),
+                )
 
-        def is_resource_busy(e: Exception) -> bool:
-            return isinstance(e, HTTPException) and e.status_code == 429
+            start = time.perf_counter()
+            try:
+                # Busy errors shrink the in-flight limit instead of being retried
+                with cozo.limiter.limit():
+                    start = time.perf_counter()
+                    result = run(query)
 
-        @retry(
-            stop=stop_after_attempt(2),
-            wait=wait_exponential(multiplier=1, min=4, max=10),
-            retry=retry_if_exception(is_resource_busy),
-        )
-        @wraps(func)
-        def wrapper(*args: P.args, client=None, **kwargs: P.kwargs) -> pd.DataFrame:
-            queries, variables = func(*args, **kwargs)
+                elapsed = time.perf_counter() - start
+                timeit and print(f"Cozo query time: {elapsed:.2f} seconds")
 
-            if isinstance(queries, str):
-                query = queries
-            else:
-                queries = [str(query) for query in queries if query]
-                query = "}\n\n{\n".join(queries)
-                query = f"{{ {query} }}"
-
-            not only_on_error and debug and print(query)
-            not only_on_error and debug and pprint(
-                dict(
-                    variables=variables,
+            except Exception as e:
+                _handle_query_error(
+                    func.__name__,
+                    query,
+                    variables,
+                    time.perf_counter() - start,
+                    e,
+                    debug=debug,
+                    only_on_error=only_on_error,
+                )
+
+            records, slow = _query_result_records(
+                func.__name__, context, result, elapsed
+            )
+
+            if slow:
+                plan = None
+                if slow_query_explain:
+                    try:
+                        plan = cozo_result_to_records(
+                            run(_explain_query(queries), readonly=True)
+                        )
+                    except Exception as e:
+                        plan = repr(e)
+
+                _log_slow_query(
+                    func.__name__, query, variables, elapsed, len(records), plan=plan
                 )
+
+            return _query_output(
+                records, debug=debug, only_on_error=only_on_error, dataframe=dataframe
+            )
+
+        # Set the wrapped function as an attribute of the wrapper,
+        # forwards the __wrapped__ attribute if it exists.
+        setattr(wrapper, "__wrapped__", getattr(func, "__wrapped__", func))
+
+        return wrapper
+
+    if func is not None and callable(func):
+        return cozo_query_dec(func)
+
+    return cozo_query_dec
+
+
+def cozo_query_async(
+    func: Callable[P, tuple[str | list[str | None], dict]] | None = None,
+    debug: bool | None = None,
+    only_on_error: bool = False,
+    timeit: bool = False,
+    dataframe: bool = False,
+    readonly: bool = False,
+):
+    def cozo_query_dec(func: Callable[P, tuple[str | list[Any], dict]]):
+        """
+        Async counterpart of `cozo_query`. The wrapped function still builds
+        a (query string, variables) tuple synchronously; the query itself is
+        awaited on the pooled async client so it never blocks the event loop.
+
+        A blocking `pycozo` client (e.g. the embedded one used in tests) can
+        still be passed as `client` and is run in a worker thread.
+        """
+
+        @wraps(func)
+        async def wrapper(
+            *args: P.args, client=None, **kwargs: P.kwargs
+        ) -> list[dict] | pd.DataFrame:
+            queries, query, variables, context = _build_cozo_query(
+                func, args, kwargs, debug=debug, only_on_error=only_on_error
             )
 
             # Run the query
             from ..clients import cozo
 
-            try:
-                client = client or cozo.get_cozo_client()
+            async def run(query: str, readonly: bool = readonly) -> dict:
+                if client is None:
+                    return await cozo.get_cozo_router().run_async(
+                        query,
+                        variables,
+                        readonly=readonly,
+                        developer_id=kwargs.get("developer_id"),
+                    )
 
-                start = timeit and time.perf_counter()
-                result = client.run(query, variables)
-                end = timeit and time.perf_counter()
+                if inspect.iscoroutinefunction(client.run):
+                    return await client.run(query, variables, immutable=readonly)
 
-                timeit and print(f"Cozo query time: {end - start:.2f} seconds")
+                return await asyncio.to_thread(
+                    client.run, query, variables, immutable=readonly
+                )
 
-            except Exception as e:
-                if only_on_error and debug:
-                    print(query)
-                    pprint(variables)
+            start = time.perf_counter()
+            try:
+                # Busy errors shrink the in-flight limit instead of being retried
+                async with cozo.limiter.limit_async():
+                    start = time.perf_counter()
+                    result = await run(query)
 
-                debug and print(repr(e))
+                elapsed = time.perf_counter() - start
+                timeit and print(f"Cozo query time: {elapsed:.2f} seconds")
 
-                if "busy" in str(getattr(e, "resp", e)).lower():
-                    raise HTTPException(
-                        status_code=429, detail="Resource busy. Please try again later."
-                    ) from e
+            except Exception as e:
+                _handle_query_error(
+                    func.__name__,
+                    query,
+                    variables,
+                    time.perf_counter() - start,
+                    e,
+                    debug=debug,
+                    only_on_error=only_on_error,
+                )
 
-                raise
+            records, slow = _query_result_records(
+                func.__name__, context, result, elapsed
+            )
 
-            # Need to fix the UUIDs in the result
-            result = result.map(fix_uuid_if_present)
+            if slow:
+                plan = None
+                if slow_query_explain:
+                    try:
+                        plan = cozo_result_to_records(
+                            await run(_explain_query(queries), readonly=True)
+                        )
+                    except Exception as e:
+                        plan = repr(e)
 
-            not only_on_error and debug and pprint(
-                dict(
-                    result=result.to_dict(orient="records"),
+                _log_slow_query(
+                    func.__name__, query, variables, elapsed, len(records), plan=plan
                 )
-            )
 
-            return result
+            return _query_output(
+                records, debug=debug, only_on_error=only_on_error, dataframe=dataframe
+            )
 
         # Set the wrapped function as an attribute of the wrapper,
         # forwards the __wrapped__ attribute if it exists.
@@ -290,33 +1092,51 @@ def wrap_in_class(
     transform: Callable[[dict], dict] | None = None,
     _kind: str | None = None,
 ):
-    def decorator(func: Callable[P, pd.DataFrame]):
+    def _return_data(data: list[dict] | pd.DataFrame):
+        # Convert a DataFrame (from `dataframe=True` queries) to list of dicts
+        if isinstance(data, pd.DataFrame):
+            data = data.to_dict(orient="records")
+
+        if _kind:
+            data = [item for item in data if item.get("_kind") == _kind]
+
+        nonlocal transform
+        transform = transform or (lambda x: x)
+
+        # The keyset of list queries (see `keyset_query`) is not a model field
+        keyset = None
+        if data and "keyset_sort" in data[-1]:
+            keyset = (data[-1]["keyset_sort"], data[-1]["keyset_id"])
+            data = [
+                {k: v for k, v in item.items() if k not in KEYSET_COLUMNS}
+                for item in data
+            ]
+
+        if one:
+            assert len(data) >= 1, "Expected one result, got none"
+            obj: ModelT = cls(**transform(data[0]))
+            return obj
+
+        objs: list[ModelT] = [cls(**item) for item in map(transform, data)]
+        return objs if keyset is None else Page(objs, keyset=keyset)
+
+    def decorator(func: Callable[P, list[dict] | Awaitable[list[dict]]]):
         @wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> ModelT | list[ModelT]:
-            df = func(*args, **kwargs)
-
-            # Convert df to list of dicts
-            if _kind:
-                df = df[df["_kind"] == _kind]
-
-            data = df.to_dict(orient="records")
-
-            nonlocal transform
-            transform = transform or (lambda x: x)
+            return _return_data(func(*args, **kwargs))
 
-            if one:
-                assert len(data) >= 1, "Expected one result, got none"
-                obj: ModelT = cls(**transform(data[0]))
-                return obj
-
-            objs: list[ModelT] = [cls(**item) for item in map(transform, data)]
-            return objs
+        @wraps(func)
+        async def async_wrapper(
+            *args: P.args, **kwargs: P.kwargs
+        ) -> ModelT | list[ModelT]:
+            return _return_data(await func(*args, **kwargs))
 
         # Set the wrapped function as an attribute of the wrapper,
         # forwards the __wrapped__ attribute if it exists.
         setattr(wrapper, "__wrapped__", getattr(func, "__wrapped__", func))
+        setattr(async_wrapper, "__wrapped__", getattr(func, "__wrapped__", func))
 
-        return wrapper
+        return async_wrapper if inspect.iscoroutinefunction(func) else wrapper
 
     return decorator
 
@@ -328,33 +1148,44 @@ def rewrap_exceptions(
     ],
     /,
 ):
-    def decorator(func: Callable[P, T]):
+    def _check_error(error):
+        nonlocal mapping
+
+        for check, transform in mapping.items():
+            should_catch = (
+                isinstance(error, check) if isinstance(check, type) else check(error)
+            )
+
+            if should_catch:
+                new_error = (
+                    transform(str(error))
+                    if isinstance(transform, type)
+                    else transform(error)
+                )
+
+                setattr(new_error, "__cause__", error)
+
+                raise new_error from error
+
+    def decorator(func: Callable[P, T | Awaitable[T]]):
         @wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            nonlocal mapping
-
             try:
                 result: T = func(*args, **kwargs)
 
             except BaseException as error:
-                for check, transform in mapping.items():
-                    should_catch = (
-                        isinstance(error, check)
-                        if isinstance(check, type)
-                        else check(error)
-                    )
-
-                    if should_catch:
-                        new_error = (
-                            transform(str(error))
-                            if isinstance(transform, type)
-                            else transform(error)
-                        )
+                _check_error(error)
+                raise
 
-                        setattr(new_error, "__cause__", error)
+            return result
 
-                        raise new_error from error
+        @wraps(func)
+        async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            try:
+                result: T = await func(*args, **kwargs)
 
+            except BaseException as error:
+                _check_error(error)
                 raise
 
             return result
@@ -362,7 +1193,136 @@ def rewrap_exceptions(
         # Set the wrapped function as an attribute of the wrapper,
         # forwards the __wrapped__ attribute if it exists.
         setattr(wrapper, "__wrapped__", getattr(func, "__wrapped__", func))
+        setattr(async_wrapper, "__wrapped__", getattr(func, "__wrapped__", func))
 
-        return wrapper
+        return async_wrapper if inspect.iscoroutinefunction(func) else wrapper
+
+    return decorator
+
+
+class _BatchState:
+    def __init__(self):
+        # Futures of the keys that are queued or being fetched, shared by
+        # identical concurrent lookups
+        self.futures: dict[tuple[str, ...], asyncio.Future] = {}
+        self.queued: list[tuple[str, ...]] = []
+        self.handle: asyncio.TimerHandle | None = None
+        self.tasks: set[asyncio.Task] = set()
+
+
+class QueryBatcher:
+    """
+    DataLoader-style coalescing of point lookups. Keys requested on the same
+    event loop within `window` seconds are fetched with a single call to
+    `batch_query(keys=[...])`, and records are matched back to their key
+    using `key_columns`. Concurrent lookups of the same key share one future.
+    """
+
+    def __init__(
+        self,
+        batch_query: Callable[..., list[dict] | Awaitable[list[dict]]],
+        key_columns: tuple[str, ...],
+        *,
+        window: float = query_batch_window,
+        max_batch_size: int = query_batch_max_size,
+    ):
+        self.batch_query = batch_query
+        self.key_columns = key_columns
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, _BatchState
+        ] = weakref.WeakKeyDictionary()
+
+    async def load(self, key: tuple[str, ...]) -> dict | None:
+        loop = asyncio.get_running_loop()
+
+        if (state := self._states.get(loop)) is None:
+            state = self._states[loop] = _BatchState()
+
+        if (future := state.futures.get(key)) is None:
+            future = state.futures[key] = loop.create_future()
+            state.queued.append(key)
+
+            if len(state.queued) >= self.max_batch_size:
+                self._dispatch(state)
+            elif state.handle is None:
+                state.handle = loop.call_later(self.window, self._dispatch, state)
+
+        # Shielded so that a cancelled caller does not fail the other waiters
+        return await asyncio.shield(future)
+
+    def _dispatch(self, state: _BatchState) -> None:
+        if state.handle is not None:
+            state.handle.cancel()
+            state.handle = None
+
+        keys, state.queued = state.queued, []
+        if not keys:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._fetch(state, keys))
+        state.tasks.add(task)
+        task.add_done_callback(state.tasks.discard)
+
+    async def _fetch(self, state: _BatchState, keys: list[tuple[str, ...]]) -> None:
+        try:
+            if inspect.iscoroutinefunction(self.batch_query):
+                records = await self.batch_query(keys=[[*key] for key in keys])
+            else:
+                records = await asyncio.to_thread(
+                    self.batch_query, keys=[[*key] for key in keys]
+                )
+
+            found = {
+                tuple(str(record[column]) for column in self.key_columns): record
+                for record in records
+            }
+
+            for key in keys:
+                future = state.futures.pop(key)
+                if not future.done():
+                    future.set_result(found.get(key))
+
+        except Exception as e:
+            for key in keys:
+                future = state.futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+
+
+def coalesce_lookups(
+    batch_query: Callable[..., list[dict] | Awaitable[list[dict]]],
+    *,
+    keys: dict[str, str],
+    cls: Type[ModelT] | Callable[..., ModelT],
+    transform: Callable[[dict], dict] | None = None,
+    not_found: Callable[[], Exception] = partialclass(
+        HTTPException, status_code=404, detail="Resource not found"
+    ),
+):
+    """
+    Attach an async `load(**kwargs)` to a point-lookup model function, which
+    coalesces concurrent lookups into one `batch_query` through a
+    `QueryBatcher`. `keys` maps the function's arguments to the columns of
+    the batch query's result. The decorated function itself is unchanged.
+    """
+
+    batcher = QueryBatcher(batch_query, key_columns=tuple(keys.values()))
+    transform = transform or (lambda x: x)
+
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        async def load(**kwargs) -> ModelT:
+            record = await batcher.load(tuple(str(kwargs[arg]) for arg in keys))
+
+            if record is None:
+                raise not_found()
+
+            return cls(**transform(record))
+
+        setattr(func, "load", load)
+        setattr(func, "batcher", batcher)
+
+        return func
 
     return decorator
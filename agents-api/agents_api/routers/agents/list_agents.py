@@ -4,6 +4,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from ...autogen.openapi_model import Agent, ListResponse
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...dependencies.query_filter import create_filter_extractor
 from ...models.agent.list_agents import list_agents as list_agents_query
@@ -23,6 +24,7 @@ async def list_agents(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Agent]:
     agents = list_agents_query(
         developer_id=x_developer_id,
@@ -30,7 +32,11 @@ async def list_agents(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
         metadata_filter=metadata_filter or {},
     )
 
-    return ListResponse[Agent](items=agents)
+    return ListResponse[Agent](
+        items=agents,
+        next_cursor=next_cursor(agents, limit, sort_by, direction),
+    )
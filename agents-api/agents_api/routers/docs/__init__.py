@@ -1,4 +1,5 @@
 # ruff: noqa: F401
+from .bulk_create_docs import bulk_create_agent_docs, bulk_create_user_docs
 from .create_doc import create_agent_doc, create_user_doc
 from .delete_doc import delete_agent_doc, delete_user_doc
 from .embed import embed
@@ -0,0 +1,183 @@
+import asyncio
+from typing import Annotated, AsyncIterator, Literal
+from uuid import UUID, uuid4
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from starlette.status import HTTP_201_CREATED
+
+from ...activities.types import EmbedDocsPayload
+from ...autogen.openapi_model import CreateDocRequest, ResourceCreatedResponse
+from ...clients import temporal
+from ...common.retry_policies import DEFAULT_RETRY_POLICY
+from ...common.storage_handler import store_in_blob_store_if_large
+from ...common.utils.datetime import utcnow
+from ...dependencies.developer_id import get_developer_id
+from ...env import bulk_ingest_chunk_size, temporal_task_queue
+from ...models.docs.create_docs import create_docs as create_docs_query
+from .create_doc import chunk_doc_content
+from .router import router
+
+
+async def read_ndjson_docs(
+    stream: AsyncIterator[bytes], chunk_size: int
+) -> AsyncIterator[list[CreateDocRequest]]:
+    """Parses a stream of newline delimited JSON docs into chunks of `chunk_size` docs."""
+
+    async def lines() -> AsyncIterator[bytes]:
+        buffer = b""
+
+        async for data in stream:
+            *complete, buffer = (buffer + data).split(b"\n")
+
+            for line in complete:
+                yield line
+
+        yield buffer
+
+    chunk: list[CreateDocRequest] = []
+    line_number = 0
+
+    async for line in lines():
+        line_number += 1
+
+        if not line.strip():
+            continue
+
+        try:
+            chunk.append(CreateDocRequest.model_validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid document on line {line_number}: {e}",
+            )
+
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+async def bulk_create_docs(
+    *,
+    developer_id: UUID,
+    owner_type: Literal["user", "agent"],
+    owner_id: UUID,
+    request: Request,
+) -> ResourceCreatedResponse | JSONResponse:
+    from ...workflows.bulk_embed_docs import BulkEmbedDocsWorkflow
+
+    job_id = uuid4()
+    client = await temporal.get_client()
+
+    # One workflow embeds all the docs of the upload, chunk by chunk
+    handle = await client.start_workflow(
+        BulkEmbedDocsWorkflow.run,
+        task_queue=temporal_task_queue,
+        id=str(job_id),
+        retry_policy=DEFAULT_RETRY_POLICY,
+    )
+
+    docs_created = 0
+
+    try:
+        async for data in read_ndjson_docs(request.stream(), bulk_ingest_chunk_size):
+            # Each chunk is written in its own transaction
+            doc_ids = [uuid4() for _ in data]
+            docs = await create_docs_query(
+                developer_id=developer_id,
+                owner_type=owner_type,
+                owner_id=owner_id,
+                doc_ids=doc_ids,
+                data=data,
+                # Spread over the NLP worker processes
+                chunks=await asyncio.gather(*map(chunk_doc_content, data)),
+            )
+
+            docs_created += len(docs)
+
+            embed_instructions = {
+                doc_id: doc_data.embed_instruction
+                for doc_id, doc_data in zip(doc_ids, data)
+            }
+
+            payloads = [
+                EmbedDocsPayload(
+                    developer_id=developer_id,
+                    doc_id=doc.id,
+                    content=doc.content,
+                    title=doc.title,
+                    embed_instruction=embed_instructions[doc.id],
+                )
+                for doc in docs
+            ]
+
+            await handle.signal(
+                BulkEmbedDocsWorkflow.add_docs,
+                args=[store_in_blob_store_if_large(payloads), len(payloads)],
+            )
+
+    except HTTPException as e:
+        # The chunks written before the failure are kept (and embedded by the
+        # job), so the client gets the job id along with the error
+        return JSONResponse(
+            status_code=e.status_code,
+            content={
+                "error": {
+                    "message": str(e),
+                    "job_id": str(job_id),
+                    "docs_created": docs_created,
+                }
+            },
+        )
+
+    finally:
+        # Docs written before a failure are still embedded
+        await handle.signal(BulkEmbedDocsWorkflow.finish)
+
+    return ResourceCreatedResponse(id=job_id, created_at=utcnow(), jobs=[job_id])
+
+
+@router.post("/users/{user_id}/docs/bulk", status_code=HTTP_201_CREATED, tags=["docs"])
+async def bulk_create_user_docs(
+    user_id: UUID,
+    request: Request,
+    x_developer_id: Annotated[UUID, Depends(get_developer_id)],
+) -> ResourceCreatedResponse:
+    """
+    Creates documents for a user from a stream of newline delimited JSON documents.
+
+    Parameters:
+        user_id (UUID): The unique identifier of the user associated with the documents.
+        request (Request): The request, whose body has one `CreateDocRequest` per line.
+        x_developer_id (UUID): The unique identifier of the developer associated with the documents.
+
+    Returns:
+        ResourceCreatedResponse: The id of the job embedding the documents, whose progress can be polled at `/jobs/{job_id}`.
+    """
+
+    return await bulk_create_docs(
+        developer_id=x_developer_id,
+        owner_type="user",
+        owner_id=user_id,
+        request=request,
+    )
+
+
+@router.post(
+    "/agents/{agent_id}/docs/bulk", status_code=HTTP_201_CREATED, tags=["docs"]
+)
+async def bulk_create_agent_docs(
+    agent_id: UUID,
+    request: Request,
+    x_developer_id: Annotated[UUID, Depends(get_developer_id)],
+) -> ResourceCreatedResponse:
+    return await bulk_create_docs(
+        developer_id=x_developer_id,
+        owner_type="agent",
+        owner_id=agent_id,
+        request=request,
+    )
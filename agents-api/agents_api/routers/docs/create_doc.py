@@ -9,12 +9,30 @@ from ...activities.types import EmbedDocsPayload
 from ...autogen.openapi_model import CreateDocRequest, Doc, ResourceCreatedResponse
 from ...clients import temporal
 from ...common.retry_policies import DEFAULT_RETRY_POLICY
+from ...common.utils.chunking import Chunk, chunk_content_async
 from ...dependencies.developer_id import get_developer_id
-from ...env import temporal_task_queue, testing
+from ...env import (
+    doc_chunk_max_tokens,
+    doc_chunk_overlap_tokens,
+    temporal_task_queue,
+    testing,
+)
 from ...models.docs.create_doc import create_doc as create_doc_query
 from .router import router
 
 
+async def chunk_doc_content(data: CreateDocRequest) -> list[Chunk]:
+    """Splits the content of a doc into snippets, off the event loop."""
+
+    content = [data.content] if isinstance(data.content, str) else data.content
+
+    return await chunk_content_async(
+        content,
+        max_tokens=doc_chunk_max_tokens,
+        overlap_tokens=doc_chunk_overlap_tokens,
+    )
+
+
 async def run_embed_docs_task(
     *,
     developer_id: UUID,
@@ -79,6 +97,7 @@ async def create_user_doc(
         owner_type="user",
         owner_id=user_id,
         data=data,
+        chunks=await chunk_doc_content(data),
     )
 
     embed_job_id = uuid4()
@@ -110,6 +129,7 @@ async def create_agent_doc(
         owner_type="agent",
         owner_id=agent_id,
         data=data,
+        chunks=await chunk_doc_content(data),
     )
 
     embed_job_id = uuid4()
@@ -4,6 +4,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from ...autogen.openapi_model import Doc, ListResponse
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...dependencies.query_filter import create_filter_extractor
 from ...models.docs.list_docs import list_docs as list_docs_query
@@ -21,6 +22,7 @@ async def list_user_docs(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Doc]:
     docs = list_docs_query(
         developer_id=x_developer_id,
@@ -30,10 +32,14 @@ async def list_user_docs(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
         metadata_filter=metadata_filter or {},
     )
 
-    return ListResponse[Doc](items=docs)
+    return ListResponse[Doc](
+        items=docs,
+        next_cursor=next_cursor(docs, limit, sort_by, direction),
+    )
 
 
 @router.get("/agents/{agent_id}/docs", tags=["docs"])
@@ -47,6 +53,7 @@ async def list_agent_docs(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Doc]:
     docs = list_docs_query(
         developer_id=x_developer_id,
@@ -56,7 +63,11 @@ async def list_agent_docs(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
         metadata_filter=metadata_filter or {},
     )
 
-    return ListResponse[Doc](items=docs)
+    return ListResponse[Doc](
+        items=docs,
+        next_cursor=next_cursor(docs, limit, sort_by, direction),
+    )
@@ -14,7 +14,9 @@ from ...autogen.openapi_model import (
 )
 from ...dependencies.developer_id import get_developer_id
 from ...models.docs.mmr import maximal_marginal_relevance
-from ...models.docs.search_docs_by_embedding import search_docs_by_embedding
+from ...models.docs.search_docs_by_quantized_embedding import (
+    search_docs_by_quantized_embedding,
+)
 from ...models.docs.search_docs_by_text import search_docs_by_text
 from ...models.docs.search_docs_hybrid import search_docs_hybrid
 from .router import router
@@ -44,7 +46,7 @@ def get_search_fn_and_params(
             confidence=confidence,
             metadata_filter=metadata_filter,
         ):
-            search_fn = search_docs_by_embedding
+            search_fn = search_docs_by_quantized_embedding
             params = dict(
                 query_embedding=query_embedding,
                 k=k * 3 if search_params.mmr_strength > 0 else k,
@@ -97,7 +99,7 @@ async def search_user_docs(
     search_fn, params = get_search_fn_and_params(search_params)
 
     start = time.time()
-    docs: list[DocReference] = search_fn(
+    docs: list[DocReference] = await search_fn(
         developer_id=x_developer_id,
         owners=[("user", user_id)],
         **params,
@@ -113,7 +115,8 @@ async def search_user_docs(
             [doc.snippet.embedding for doc in docs],
             k=search_params.limit,
         )
-        docs = [doc for i, doc in enumerate(docs) if i in set(indices)]
+        selected = set(indices)
+        docs = [doc for i, doc in enumerate(docs) if i in selected]
 
     end = time.time()
 
@@ -148,7 +151,7 @@ async def search_agent_docs(
     search_fn, params = get_search_fn_and_params(search_params)
 
     start = time.time()
-    docs: list[DocReference] = search_fn(
+    docs: list[DocReference] = await search_fn(
         developer_id=x_developer_id,
         owners=[("agent", agent_id)],
         **params,
@@ -164,7 +167,8 @@ async def search_agent_docs(
             [doc.snippet.embedding for doc in docs],
             k=search_params.limit,
         )
-        docs = [doc for i, doc in enumerate(docs) if i in set(indices)]
+        selected = set(indices)
+        docs = [doc for i, doc in enumerate(docs) if i in selected]
 
     end = time.time()
 
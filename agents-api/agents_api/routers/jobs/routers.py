@@ -49,13 +49,21 @@ async def get_job_status(job_id: UUID) -> JobStatus:
     job_description = await handle.describe()
     state = map_job_status(job_description.status)
 
+    has_progress, progress = False, 0
+
+    # Bulk uploads report how many of their docs have been embedded so far
+    if job_description.workflow_type == "BulkEmbedDocsWorkflow":
+        embedded, total = await handle.query("progress")
+        has_progress = True
+        progress = 100 if state == "succeeded" else 100 * embedded / max(total, 1)
+
     return JobStatus(
         name=job_description.workflow_type,
         reason=f"Execution status: {state}",
         created_at=job_description.start_time,
         updated_at=job_description.execution_time,
         id=job_id,
-        has_progress=False,
-        progress=0,
+        has_progress=has_progress,
+        progress=progress,
         state=state,
     )
@@ -1,14 +1,23 @@
-from typing import Annotated, Optional
+import asyncio
+import logging
+from typing import Annotated, AsyncIterator, Optional
 from uuid import UUID, uuid4
 
-from fastapi import BackgroundTasks, Depends, Header
-from starlette.status import HTTP_201_CREATED
+from fastapi import BackgroundTasks, Depends, Header, HTTPException
+from litellm import stream_chunk_builder
+from litellm.utils import CustomStreamWrapper
+from sse_starlette.sse import EventSourceResponse
+from starlette.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
 
 from ...autogen.openapi_model import (
     ChatInput,
+    ChatOutputChunk,
     ChatResponse,
     ChunkChatResponse,
+    ContextTruncation,
     CreateEntryRequest,
+    Delta,
+    DocReference,
     MessageChatResponse,
 )
 from ...clients import litellm
@@ -16,13 +25,131 @@ from ...common.protocol.developers import Developer
 from ...common.protocol.sessions import ChatContext
 from ...common.utils.datetime import utcnow
 from ...common.utils.template import render_template
+from ...common.utils.truncation import get_token_budget, pack_messages
 from ...dependencies.developer_id import get_developer_data
+from ...exceptions import PromptTooBigError
 from ...models.chat.gather_messages import gather_messages
 from ...models.chat.prepare_chat_context import prepare_chat_context
 from ...models.entry.create_entries import create_entries
 from .metrics import total_tokens_per_user
 from .router import router
 
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Entries of streamed responses being saved, referenced until they are
+_background_tasks: set[asyncio.Task] = set()
+
+
+def save_entries_in_background(**kwargs) -> None:
+    task = asyncio.create_task(asyncio.to_thread(create_entries, **kwargs))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(
+        lambda t: (
+            t.cancelled()
+            or t.exception() is None
+            or logger.error("Could not save the chat entries", exc_info=t.exception())
+        )
+    )
+
+
+async def stream_chat_response(
+    model_response: CustomStreamWrapper,
+    *,
+    developer_id: UUID,
+    session_id: UUID,
+    model: str,
+    messages: list[dict],
+    new_entries: list[CreateEntryRequest] | None,
+    jobs: list[UUID],
+    docs: list[DocReference],
+    truncation: ContextTruncation | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Forwards the chunks of a streamed completion as server-sent events. Once
+    the stream is complete, the response is assembled to record its usage
+    (sent in a last event, without choices) and to save it to the session
+    history along with `new_entries`, unless those are None.
+    """
+
+    response_id, created_at = uuid4(), utcnow()
+    chunks = []
+
+    async for chunk in model_response:
+        chunks.append(chunk)
+
+        # e.g. the usage, sent after the last delta
+        if not chunk.choices:
+            continue
+
+        chunk_response = ChunkChatResponse(
+            id=response_id,
+            created_at=created_at,
+            jobs=jobs,
+            # The doc references and truncation are only sent with the first chunk
+            docs=[] if len(chunks) > 1 else docs,
+            truncation=None if len(chunks) > 1 else truncation,
+            choices=[
+                ChatOutputChunk(
+                    index=choice.index,
+                    # None until the last chunk of the choice
+                    finish_reason=choice.finish_reason,
+                    delta=Delta(
+                        role=choice.delta.role or "assistant",
+                        content=choice.delta.content or "",
+                        tool_calls=[
+                            tool_call.model_dump()
+                            for tool_call in choice.delta.tool_calls
+                        ]
+                        if choice.delta.tool_calls
+                        else None,
+                    ),
+                )
+                for choice in chunk.choices
+            ],
+        )
+
+        yield dict(data=chunk_response.model_dump_json())
+
+    complete_response = (
+        stream_chunk_builder(chunks, messages=messages) if chunks else None
+    )
+    usage = (
+        complete_response.usage.model_dump()
+        if complete_response and complete_response.usage
+        else None
+    )
+
+    if complete_response and new_entries is not None:
+        # FIXME: We need to save all the choices
+        save_entries_in_background(
+            developer_id=developer_id,
+            session_id=session_id,
+            data=[
+                *new_entries,
+                CreateEntryRequest.from_model_input(
+                    model=model,
+                    **complete_response.choices[0].model_dump()["message"],
+                    source="api_response",
+                ),
+            ],
+            mark_session_as_updated=True,
+        )
+
+    total_tokens_per_user.labels(str(developer_id)).inc(
+        amount=(usage or {}).get("total_tokens") or 0
+    )
+
+    usage_response = ChunkChatResponse(
+        id=response_id,
+        created_at=created_at,
+        jobs=jobs,
+        usage=usage,
+        choices=[],
+    )
+
+    yield dict(data=usage_response.model_dump_json())
+
 
 @router.post(
     "/sessions/{session_id}/chat",
@@ -50,9 +177,6 @@ async def chat(
         ChatResponse: The chat response.
     """
 
-    if chat_input.stream:
-        raise NotImplementedError("Streaming is not yet implemented")
-
     # First get the chat context
     chat_context: ChatContext = prepare_chat_context(
         developer_id=developer.id,
@@ -82,16 +206,14 @@ async def chat(
     ]
 
     # Render the system message
+    system_messages: list[dict] = []
     if situation := chat_context.session.situation:
         system_message = dict(
             role="system",
             content=situation,
         )
 
-        system_messages: list[dict] = await render_template(
-            [system_message], variables=env
-        )
-        past_messages = system_messages + past_messages
+        system_messages = await render_template([system_message], variables=env)
 
     # Render the incoming messages
     new_raw_messages = [msg.model_dump() for msg in chat_input.messages]
@@ -101,18 +223,54 @@ async def chat(
     else:
         new_messages = new_raw_messages
 
+    # Count the tokens of the new messages once, to truncate and save them
+    new_message_entries = [
+        CreateEntryRequest.from_model_input(
+            model=settings["model"], **msg, source="api_request"
+        )
+        for msg in new_messages
+    ]
+
+    # Leave out the oldest history entries that don't fit in the token budget
+    truncation = None
+    token_budget = get_token_budget(
+        settings["model"],
+        token_budget=chat_context.session.token_budget,
+        max_tokens=settings.get("max_tokens"),
+    )
+
+    if chat_context.session.context_overflow == "truncate" and token_budget is not None:
+        try:
+            packed = pack_messages(
+                settings["model"],
+                system_messages=system_messages,
+                past_messages=past_messages,
+                new_messages=[
+                    {
+                        **msg,
+                        "token_count": entry.token_count,
+                        "tokenizer": entry.tokenizer,
+                    }
+                    for msg, entry in zip(new_messages, new_message_entries)
+                ],
+                token_budget=token_budget,
+            )
+        except PromptTooBigError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+        past_messages = packed.past_messages
+        truncation = ContextTruncation(
+            token_budget=token_budget,
+            prompt_tokens=packed.prompt_tokens,
+            truncated_entries=packed.truncated_entries,
+        )
+
     # Combine the past messages with the new messages
-    messages = past_messages + new_messages
+    messages = system_messages + past_messages + new_messages
 
     # Get the tools
     tools = settings.get("tools") or chat_context.get_active_tools()
 
-    # FIXME: Truncate chat messages in the chat context
-    # SCRUM-7
-    if chat_context.session.context_overflow == "truncate":
-        # messages = messages[-settings["max_tokens"] :]
-        raise NotImplementedError("Truncation is not yet implemented")
-
     # FIXME: Hotfix for datetime not serializable. Needs investigation
     messages = [
         msg.model_dump() if hasattr(msg, "model_dump") else msg for msg in messages
@@ -122,6 +280,15 @@ async def chat(
         dict(role=m["role"], content=m["content"], user=m.get("user")) for m in messages
     ]
 
+    # Adaptive context handling
+    jobs = []
+    if chat_context.session.context_overflow == "adaptive":
+        # FIXME: Start the adaptive context workflow
+        # SCRUM-8
+
+        # jobs = [await start_adaptive_context_workflow]
+        raise NotImplementedError("Adaptive context is not yet implemented")
+
     # Get the response from the model
     model_response = await litellm.acompletion(
         messages=messages,
@@ -129,18 +296,31 @@ async def chat(
         user=str(developer.id),  # For tracking usage
         tags=developer.tags,  # For filtering models in litellm
         custom_api_key=x_custom_api_key,
+        # Streamed responses only report their usage if asked to
+        **(dict(stream_options={"include_usage": True}) if chat_input.stream else {}),
         **settings,
     )
 
-    # Save the input and the response to the session history
-    if chat_input.save:
-        new_entries = [
-            CreateEntryRequest.from_model_input(
-                model=settings["model"], **msg, source="api_request"
-            )
-            for msg in new_messages
-        ]
+    # The input and the response are saved to the session history
+    new_entries = new_message_entries if chat_input.save else None
 
+    if chat_input.stream:
+        return EventSourceResponse(
+            stream_chat_response(
+                model_response,
+                developer_id=developer.id,
+                session_id=session_id,
+                model=settings["model"],
+                messages=messages,
+                new_entries=new_entries,
+                jobs=jobs,
+                docs=doc_references,
+                truncation=truncation,
+            ),
+            status_code=HTTP_201_CREATED,
+        )
+
+    if new_entries is not None:
         # Add the response to the new entries
         # FIXME: We need to save all the choices
         new_entries.append(
@@ -158,25 +338,13 @@ async def chat(
             mark_session_as_updated=True,
         )
 
-    # Adaptive context handling
-    jobs = []
-    if chat_context.session.context_overflow == "adaptive":
-        # FIXME: Start the adaptive context workflow
-        # SCRUM-8
-
-        # jobs = [await start_adaptive_context_workflow]
-        raise NotImplementedError("Adaptive context is not yet implemented")
-
     # Return the response
-    # FIXME: Implement streaming for chat
-    chat_response_class = (
-        ChunkChatResponse if chat_input.stream else MessageChatResponse
-    )
-    chat_response: ChatResponse = chat_response_class(
+    chat_response: ChatResponse = MessageChatResponse(
         id=uuid4(),
         created_at=utcnow(),
         jobs=jobs,
         docs=doc_references,
+        truncation=truncation,
         usage=model_response.usage.model_dump(),
         choices=[choice.model_dump() for choice in model_response.choices],
     )
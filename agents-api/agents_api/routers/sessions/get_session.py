@@ -13,4 +13,6 @@ from .router import router
 async def get_session(
     session_id: UUID, x_developer_id: Annotated[UUID, Depends(get_developer_id)]
 ) -> Session:
-    return get_session_query(developer_id=x_developer_id, session_id=session_id)
+    return await get_session_query.load(
+        developer_id=x_developer_id, session_id=session_id
+    )
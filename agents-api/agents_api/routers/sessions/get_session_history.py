@@ -1,16 +1,40 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import Depends
+from fastapi import Depends, Query
 
 from ...autogen.openapi_model import History
+from ...common.utils.datetime import utcnow
 from ...dependencies.developer_id import get_developer_id
+from ...env import chat_history_window
 from ...models.entry.get_history import get_history as get_history_query
+from ...models.entry.get_recent_entries import (
+    get_recent_entries as get_recent_entries_query,
+)
 from .router import router
 
 
 @router.get("/sessions/{session_id}/history", tags=["sessions"])
 async def get_session_history(
-    session_id: UUID, x_developer_id: Annotated[UUID, Depends(get_developer_id)]
+    session_id: UUID,
+    x_developer_id: Annotated[UUID, Depends(get_developer_id)],
+    limit: Annotated[int | None, Query(ge=1, lt=1000)] = None,
+    since_entry_id: UUID | None = None,
 ) -> History:
-    return get_history_query(developer_id=x_developer_id, session_id=session_id)
+    if limit is None and since_entry_id is None:
+        return get_history_query(developer_id=x_developer_id, session_id=session_id)
+
+    # Only the latest leaf entries, which no relation has as its head
+    entries = get_recent_entries_query(
+        developer_id=x_developer_id,
+        session_id=session_id,
+        limit=limit or chat_history_window,
+        since_entry_id=since_entry_id,
+    )
+
+    return History(
+        entries=entries,
+        relations=[],
+        session_id=session_id,
+        created_at=utcnow(),
+    )
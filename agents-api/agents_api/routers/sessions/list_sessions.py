@@ -4,6 +4,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from ...autogen.openapi_model import ListResponse, Session
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...dependencies.query_filter import create_filter_extractor
 from ...models.session.list_sessions import list_sessions as list_sessions_query
@@ -20,6 +21,7 @@ async def list_sessions(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Session]:
     sessions = list_sessions_query(
         developer_id=x_developer_id,
@@ -27,7 +29,11 @@ async def list_sessions(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
         metadata_filter=metadata_filter or {},
     )
 
-    return ListResponse[Session](items=sessions)
+    return ListResponse[Session](
+        items=sessions,
+        next_cursor=next_cursor(sessions, limit, sort_by, direction),
+    )
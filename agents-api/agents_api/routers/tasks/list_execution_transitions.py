@@ -5,6 +5,7 @@ from ...autogen.openapi_model import (
     ListResponse,
     Transition,
 )
+from ...common.utils.pagination import next_cursor
 from ...models.execution.list_execution_transitions import (
     list_execution_transitions as list_execution_transitions_query,
 )
@@ -18,6 +19,7 @@ async def list_execution_transitions(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Transition]:
     transitions = list_execution_transitions_query(
         execution_id=execution_id,
@@ -25,9 +27,13 @@ async def list_execution_transitions(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
     )
 
-    return ListResponse[Transition](items=transitions)
+    return ListResponse[Transition](
+        items=transitions,
+        next_cursor=next_cursor(transitions, limit, sort_by, direction),
+    )
 
 
 # TODO: Do we need this?
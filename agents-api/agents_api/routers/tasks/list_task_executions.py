@@ -7,6 +7,7 @@ from ...autogen.openapi_model import (
     Execution,
     ListResponse,
 )
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...models.execution.list_executions import (
     list_executions as list_task_executions_query,
@@ -22,6 +23,7 @@ async def list_task_executions(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Execution]:
     executions = list_task_executions_query(
         task_id=task_id,
@@ -30,5 +32,9 @@ async def list_task_executions(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
+    )
+    return ListResponse[Execution](
+        items=executions,
+        next_cursor=next_cursor(executions, limit, sort_by, direction),
     )
-    return ListResponse[Execution](items=executions)
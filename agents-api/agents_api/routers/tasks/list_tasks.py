@@ -7,6 +7,7 @@ from ...autogen.openapi_model import (
     ListResponse,
     Task,
 )
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...models.task.list_tasks import list_tasks as list_tasks_query
 from .router import router
@@ -20,6 +21,7 @@ async def list_tasks(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[Task]:
     query_results = list_tasks_query(
         agent_id=agent_id,
@@ -28,6 +30,7 @@ async def list_tasks(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
     )
 
     tasks = []
@@ -41,4 +44,7 @@ async def list_tasks(
 
         tasks.append(Task(**row_dict))
 
-    return ListResponse[Task](items=tasks)
+    return ListResponse[Task](
+        items=tasks,
+        next_cursor=next_cursor(query_results, limit, sort_by, direction),
+    )
@@ -4,6 +4,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from ...autogen.openapi_model import ListResponse, User
+from ...common.utils.pagination import next_cursor
 from ...dependencies.developer_id import get_developer_id
 from ...dependencies.query_filter import create_filter_extractor
 from ...models.user.list_users import list_users as list_users_query
@@ -20,6 +21,7 @@ async def list_users(
     offset: int = 0,
     sort_by: Literal["created_at", "updated_at"] = "created_at",
     direction: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
 ) -> ListResponse[User]:
     users = list_users_query(
         developer_id=x_developer_id,
@@ -27,7 +29,11 @@ async def list_users(
         offset=offset,
         sort_by=sort_by,
         direction=direction,
+        cursor=cursor,
         metadata_filter=metadata_filter or {},
     )
 
-    return ListResponse[User](items=users)
+    return ListResponse[User](
+        items=users,
+        next_cursor=next_cursor(users, limit, sort_by, direction),
+    )
@@ -21,8 +21,16 @@ from scalar_fastapi import get_scalar_api_reference
 from temporalio.service import RPCError
 
 from .common.exceptions import BaseCommonException
+from .common.nlp import warm_up_nlp
 from .dependencies.auth import get_api_key
-from .env import api_prefix, hostname, protocol, public_port, sentry_dsn
+from .env import (
+    api_prefix,
+    hostname,
+    nlp_warm_up,
+    protocol,
+    public_port,
+    sentry_dsn,
+)
 from .exceptions import PromptTooBigError
 from .routers import (
     agents,
@@ -161,6 +169,14 @@ app: FastAPI = FastAPI(
 # Enable metrics
 Instrumentator().instrument(app).expose(app)
 
+
+@app.on_event("startup")
+async def warm_up() -> None:
+    # Otherwise spaCy is loaded by the first request that needs it
+    if nlp_warm_up:
+        await asyncio.to_thread(warm_up_nlp)
+
+
 # Create a new router for the docs
 scalar_router = APIRouter()
 
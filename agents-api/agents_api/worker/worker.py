@@ -14,7 +14,7 @@ def create_worker(client: Client) -> Any:
 
     from ..activities import task_steps
     from ..activities.demo import demo_activity
-    from ..activities.embed_docs import embed_docs
+    from ..activities.embed_docs import embed_docs, embed_docs_batch
     from ..activities.excecute_api_call import execute_api_call
     from ..activities.execute_integration import execute_integration
     from ..activities.execute_system import execute_system
@@ -27,6 +27,7 @@ def create_worker(client: Client) -> Any:
     from ..env import (
         temporal_task_queue,
     )
+    from ..workflows.bulk_embed_docs import BulkEmbedDocsWorkflow
     from ..workflows.demo import DemoWorkflow
     from ..workflows.embed_docs import EmbedDocsWorkflow
     from ..workflows.mem_mgmt import MemMgmtWorkflow
@@ -48,6 +49,7 @@ def create_worker(client: Client) -> Any:
             MemMgmtWorkflow,
             MemRatingWorkflow,
             EmbedDocsWorkflow,
+            BulkEmbedDocsWorkflow,
             TaskExecutionWorkflow,
             TruncationWorkflow,
         ],
@@ -55,6 +57,7 @@ def create_worker(client: Client) -> Any:
             *task_activities,
             demo_activity,
             embed_docs,
+            embed_docs_batch,
             execute_integration,
             execute_system,
             execute_api_call,
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+from collections import deque
+from datetime import timedelta
+
+from temporalio import workflow
+
+with workflow.unsafe.imports_passed_through():
+    from ..activities.embed_docs import embed_docs_batch
+    from ..activities.types import EmbedDocsPayload
+    from ..common.protocol.remote import RemoteObject
+    from ..common.retry_policies import DEFAULT_RETRY_POLICY
+
+
+# Give up on an upload whose client went away without finishing it
+IDLE_TIMEOUT = timedelta(hours=1)
+
+# Start a new run (with the pending chunks) once this many chunks were signalled
+# or embedded in the current one, so that the history of a large upload stays bounded
+MAX_CHUNKS_PER_RUN = 500
+
+Chunk = tuple[list[EmbedDocsPayload] | RemoteObject, int]
+
+
+@workflow.defn
+class BulkEmbedDocsWorkflow:
+    """
+    Embeds the docs of a bulk upload. Chunks of docs are signalled by the
+    upload as they are written, and embedded one chunk (activity) at a time
+    until the upload signals that it is finished. Large uploads continue as
+    new runs of the same workflow id, carrying over the pending chunks.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: deque[Chunk] = deque()
+        self.finished = False
+        self.total = 0
+        self.embedded = 0
+        self.chunks_received = 0
+
+    @workflow.signal
+    def add_docs(
+        self, payloads: list[EmbedDocsPayload] | RemoteObject, count: int
+    ) -> None:
+        self.chunks.append((payloads, count))
+        self.total += count
+        self.chunks_received += 1
+
+    @workflow.signal
+    def finish(self) -> None:
+        self.finished = True
+
+    @workflow.query
+    def progress(self) -> tuple[int, int]:
+        """Number of docs embedded so far, and number of docs uploaded so far."""
+        return self.embedded, self.total
+
+    @workflow.run
+    async def run(
+        self,
+        pending_chunks: list[Chunk] = [],
+        total: int = 0,
+        embedded: int = 0,
+        finished: bool = False,
+    ) -> int:
+        # State carried over from the previous run; signals may already have
+        # been handled by this one
+        self.chunks.extendleft(reversed(pending_chunks))
+        self.total += total
+        self.embedded += embedded
+        self.finished = self.finished or finished
+
+        chunks_embedded = 0
+
+        while True:
+            try:
+                await workflow.wait_condition(
+                    lambda: bool(self.chunks) or self.finished, timeout=IDLE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                workflow.logger.warning("Bulk upload timed out waiting for docs")
+                break
+
+            if not self.chunks:
+                break
+
+            # Only once this run made progress, so that runs can't keep
+            # handing the chunks over without embedding any
+            if chunks_embedded and (
+                max(chunks_embedded, self.chunks_received) >= MAX_CHUNKS_PER_RUN
+                or workflow.info().is_continue_as_new_suggested()
+            ):
+                workflow.continue_as_new(
+                    args=[list(self.chunks), self.total, self.embedded, self.finished],
+                    retry_policy=DEFAULT_RETRY_POLICY,
+                )
+
+            payloads, count = self.chunks.popleft()
+
+            await workflow.execute_activity(
+                embed_docs_batch,
+                payloads,
+                schedule_to_close_timeout=timedelta(seconds=600),
+                retry_policy=DEFAULT_RETRY_POLICY,
+            )
+
+            self.embedded += count
+            chunks_embedded += 1
+
+        return self.embedded
@@ -13,10 +13,12 @@ with workflow.unsafe.imports_passed_through():
 @workflow.defn
 class TruncationWorkflow:
     @workflow.run
-    async def run(self, session_id: str, token_count_threshold: int) -> None:
+    async def run(
+        self, developer_id: str, session_id: str, token_count_threshold: int
+    ) -> None:
         return await workflow.execute_activity(
             truncation,
-            args=[session_id, token_count_threshold],
+            args=[developer_id, session_id, token_count_threshold],
             schedule_to_close_timeout=timedelta(seconds=600),
             retry_policy=DEFAULT_RETRY_POLICY,
         )
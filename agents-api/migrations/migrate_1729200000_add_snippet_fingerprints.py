@@ -0,0 +1,42 @@
+# /usr/bin/env python3
+
+MIGRATION_ID = "add_snippet_fingerprints"
+CREATED_AT = 1729200000.0
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Latest snippet embedded for each (developer, content fingerprint), so that
+# unchanged snippets can reuse its embedding instead of being embedded again
+create_snippet_fingerprints_relation = dict(
+    up="""
+    :create snippet_fingerprints {
+        developer_id: Uuid,
+        fingerprint: String,
+        =>
+        doc_id: Uuid,
+        index: Int,
+    }
+    """,
+    down="""
+    ::remove snippet_fingerprints
+    """,
+)
+
+queries_to_run = [
+    create_snippet_fingerprints_relation,
+]
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run)])
@@ -0,0 +1,44 @@
+# /usr/bin/env python3
+
+MIGRATION_ID = "add_snippet_chunks"
+CREATED_AT = 1729300000.0
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Where each snippet was cut from the content it was created with: the index
+# of the content item, the character offsets in it and the number of tokens
+create_snippet_chunks_relation = dict(
+    up="""
+    :create snippet_chunks {
+        doc_id: Uuid,
+        index: Int,
+        =>
+        source_index: Int,
+        start_char: Int,
+        end_char: Int,
+        token_count: Int,
+    }
+    """,
+    down="""
+    ::remove snippet_chunks
+    """,
+)
+
+queries_to_run = [
+    create_snippet_chunks_relation,
+]
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run)])
@@ -0,0 +1,126 @@
+# /usr/bin/env python3
+
+import base64
+
+import numpy as np
+
+MIGRATION_ID = "add_snippet_codes"
+CREATED_AT = 1729400000.0
+
+# Number of docs whose snippets are quantized per transaction by the backfill
+BACKFILL_BATCH_SIZE = 100
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Quantized copies of the snippet embeddings, used to shortlist candidates
+# before re-ranking them with the full precision embeddings: int8 codes (with
+# the scale of each normalized embedding) and packed sign bits
+create_snippet_codes_relation = dict(
+    up="""
+    :create snippet_codes {
+        doc_id: Uuid,
+        index: Int,
+        =>
+        code: Bytes,
+        bits: Bytes,
+        scale: Float,
+    }
+    """,
+    down="""
+    ::remove snippet_codes
+    """,
+)
+
+queries_to_run = [
+    create_snippet_codes_relation,
+]
+
+
+def records(result) -> list[dict]:
+    if isinstance(result, dict):
+        return [dict(zip(result["headers"], row)) for row in result["rows"]]
+
+    return result.to_dict(orient="records")
+
+
+def encode(code: np.ndarray) -> str:
+    return base64.b64encode(code.tobytes()).decode()
+
+
+# Kept in sync with `agents_api.common.utils.quantization` (at the time of
+# this migration)
+def quantize(embeddings: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    x = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    x = x / np.where(norms == 0, 1, norms)
+
+    scales = np.abs(x).max(axis=1) / 127
+    codes = np.rint(x / np.where(scales == 0, 1, scales)[:, None]).astype(np.int8)
+    bits = np.packbits(x > 0, axis=1)
+
+    return codes, bits, scales
+
+
+def backfill_snippet_codes(client):
+    doc_ids = [
+        row["doc_id"] for row in records(client.run("?[doc_id] := *docs{doc_id}"))
+    ]
+
+    for start in range(0, len(doc_ids), BACKFILL_BATCH_SIZE):
+        batch = [[doc_id] for doc_id in doc_ids[start : start + BACKFILL_BATCH_SIZE]]
+
+        snippets = records(
+            client.run(
+                """
+                input[doc_id_str] <- $doc_ids
+
+                ?[doc_id, index, embedding] :=
+                    input[doc_id_str],
+                    doc_id = to_uuid(doc_id_str),
+                    *snippets { doc_id, index, embedding },
+                    !is_null(embedding)
+                """,
+                {"doc_ids": batch},
+            )
+        )
+
+        if not snippets:
+            continue
+
+        codes, bits, scales = quantize([s["embedding"] for s in snippets])
+
+        client.run(
+            """
+            input[doc_id_str, index, code_b64, bits_b64, scale] <- $rows
+
+            ?[doc_id, index, code, bits, scale] :=
+                input[doc_id_str, index, code_b64, bits_b64, scale],
+                doc_id = to_uuid(doc_id_str),
+                code = decode_base64(code_b64),
+                bits = decode_base64(bits_b64)
+
+            :put snippet_codes { doc_id, index => code, bits, scale }
+            """,
+            {
+                "rows": [
+                    [str(s["doc_id"]), s["index"], encode(c), encode(b), float(scale)]
+                    for s, c, b, scale in zip(snippets, codes, bits, scales)
+                ]
+            },
+        )
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+    backfill_snippet_codes(client)
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run)])
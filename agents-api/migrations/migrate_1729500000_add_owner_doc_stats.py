@@ -0,0 +1,67 @@
+# /usr/bin/env python3
+
+MIGRATION_ID = "add_owner_doc_stats"
+CREATED_AT = 1729500000.0
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Number of docs and snippets of each owner, kept up to date by the queries
+# creating and deleting docs so that searches can be planned without counting
+create_owner_doc_stats_relation = dict(
+    up="""
+    :create owner_doc_stats {
+        owner_type: String,
+        owner_id: Uuid,
+        =>
+        doc_count: Int,
+        snippet_count: Int,
+    }
+    """,
+    down="""
+    ::remove owner_doc_stats
+    """,
+)
+
+backfill_owner_doc_stats = dict(
+    up="""
+    doc_counts[owner_type, owner_id, count(doc_id)] :=
+        *docs { owner_type, owner_id, doc_id }
+
+    snippet_counts[owner_type, owner_id, count(key)] :=
+        *docs { owner_type, owner_id, doc_id },
+        *snippets { doc_id, index },
+        key = [doc_id, index]
+
+    ?[owner_type, owner_id, doc_count, snippet_count] :=
+        doc_counts[owner_type, owner_id, doc_count],
+        snippet_counts[owner_type, owner_id, snippet_count]
+
+    ?[owner_type, owner_id, doc_count, snippet_count] :=
+        doc_counts[owner_type, owner_id, doc_count],
+        not snippet_counts[owner_type, owner_id, _],
+        snippet_count = 0
+
+    :put owner_doc_stats { owner_type, owner_id => doc_count, snippet_count }
+    """,
+    down="",
+)
+
+queries_to_run = [
+    create_owner_doc_stats_relation,
+    backfill_owner_doc_stats,
+]
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run) if q["down"]])
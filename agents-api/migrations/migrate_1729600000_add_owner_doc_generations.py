@@ -0,0 +1,41 @@
+# /usr/bin/env python3
+
+MIGRATION_ID = "add_owner_doc_generations"
+CREATED_AT = 1729600000.0
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Counter bumped whenever the docs (or snippet embeddings) of an owner change,
+# so that cached search results can be keyed by it. Missing rows count as 0.
+create_owner_doc_generations_relation = dict(
+    up="""
+    :create owner_doc_generations {
+        owner_type: String,
+        owner_id: Uuid,
+        =>
+        generation: Int,
+    }
+    """,
+    down="""
+    ::remove owner_doc_generations
+    """,
+)
+
+queries_to_run = [
+    create_owner_doc_generations_relation,
+]
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run)])
@@ -0,0 +1,40 @@
+# /usr/bin/env python3
+
+MIGRATION_ID = "add_entries_created_at_index"
+CREATED_AT = 1729700000.0
+
+
+def run(client, *queries):
+    joiner = "}\n\n{"
+
+    query = joiner.join(queries)
+    query = f"{{\n{query}\n}}"
+    client.run(query)
+
+
+# Entries of a session in `created_at` order (with the rest of their keys), so
+# that the latest entries can be found without reading the whole history
+create_entries_created_at_index = dict(
+    up="""
+    ::index create entries:by_session_created_at {
+        session_id,
+        created_at,
+        source,
+    }
+    """,
+    down="""
+    ::index drop entries:by_session_created_at
+    """,
+)
+
+queries_to_run = [
+    create_entries_created_at_index,
+]
+
+
+def up(client):
+    run(client, *[q["up"] for q in queries_to_run])
+
+
+def down(client):
+    run(client, *[q["down"] for q in reversed(queries_to_run)])
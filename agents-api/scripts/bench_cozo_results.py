@@ -0,0 +1,69 @@
+"""
+Micro-benchmark for decoding Cozo query results into row dicts.
+
+Compares the previous DataFrame round trip (`DataFrame.map(fix_uuid_if_present)`
+followed by `to_dict(orient="records")`) with `cozo_result_to_records`.
+
+Usage:
+    poetry run python -m scripts.bench_cozo_results --num_rows=10000
+"""
+
+import timeit
+from uuid import uuid4
+
+import fire
+import pandas as pd
+
+from agents_api.models.utils import cozo_result_to_records, fix_uuid_if_present
+
+
+def make_result(num_rows: int) -> dict:
+    headers = [
+        "id",
+        "model",
+        "name",
+        "about",
+        "created_at",
+        "updated_at",
+        "metadata",
+        "default_settings",
+        "instructions",
+    ]
+
+    rows = [
+        [
+            str(uuid4()),
+            "gpt-4o-mini",
+            f"agent {i}",
+            "about " * 10,
+            1729000000.0 + i,
+            1729000000.0 + i,
+            {"tag": "test", "owner_id": list(uuid4().bytes)},
+            {"temperature": 0.7, "top_p": 1.0, "preset": None},
+            ["be nice", "be brief"],
+        ]
+        for i in range(num_rows)
+    ]
+
+    return {"headers": headers, "rows": rows}
+
+
+def dataframe_round_trip(result: dict) -> list[dict]:
+    df = pd.DataFrame(columns=result["headers"], data=result["rows"])
+    return df.map(fix_uuid_if_present).to_dict(orient="records")
+
+
+def run(num_rows: int = 10_000, repeat: int = 5) -> None:
+    result = make_result(num_rows)
+    assert dataframe_round_trip(result) == cozo_result_to_records(result)
+
+    for name, fn in [
+        ("dataframe", dataframe_round_trip),
+        ("records", cozo_result_to_records),
+    ]:
+        best = min(timeit.repeat(lambda: fn(result), number=1, repeat=repeat))
+        print(f"{name:>10}: {best * 1e6 / num_rows:8.2f} us/row ({best:.4f}s total)")
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
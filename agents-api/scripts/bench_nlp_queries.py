@@ -0,0 +1,134 @@
+"""
+Micro-benchmark for the keyword matching and proximity grouping stages of the
+full-text search query builder, over long paragraphs.
+
+Compares the previous implementations (a shared PhraseMatcher whose patterns
+are replaced for every sentence, and a list-based sliding window unioning every
+pair in it) with `KeywordMatcher.find_matches` and `find_proximity_groups`,
+after checking that they build the same queries.
+
+Usage:
+    poetry run python -m scripts.bench_nlp_queries --num_tokens=5000
+"""
+
+import random
+import timeit
+from collections import defaultdict
+
+import fire
+from spacy.matcher import PhraseMatcher
+
+from agents_api.common.nlp import (
+    WHITESPACE_RE,
+    KeywordMatcher,
+    build_query,
+    extract_keywords,
+    find_proximity_groups,
+    get_nlp,
+)
+
+WORDS = (
+    "the agent reads documents about Paris and the Eiffel Tower while the user "
+    "asks questions on machine learning models search engines and vector "
+    "databases in New York City during the summer of the year"
+).split()
+
+
+def make_paragraph(num_tokens: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+
+    while sum(len(s) for s in sentences) < num_tokens:
+        sentences.append(rng.choices(WORDS, k=rng.randint(8, 30)))
+
+    return " ".join(" ".join(s).capitalize() + "." for s in sentences)
+
+
+shared_matcher = None
+
+
+def previous_find_matches(doc, keywords: list[str]) -> dict[str, list[int]]:
+    global shared_matcher
+
+    nlp = get_nlp()
+    shared_matcher = shared_matcher or PhraseMatcher(nlp.vocab, attr="LOWER")
+    keyword_positions = defaultdict(list)
+
+    if "KEYWORDS" in shared_matcher:
+        shared_matcher.remove("KEYWORDS")
+    shared_matcher.add("KEYWORDS", [nlp.make_doc(kw) for kw in keywords])
+
+    for _, start, end in shared_matcher(doc):
+        normalized = WHITESPACE_RE.sub(" ", doc[start:end].text).lower().strip()
+        keyword_positions[normalized].append(start)
+
+    return keyword_positions
+
+
+def previous_find_proximity_groups(
+    keywords: list[str], keyword_positions: dict[str, list[int]], n: int = 10
+) -> list[set[str]]:
+    if len(keywords) <= 1:
+        return [{kw} for kw in keywords]
+
+    positions = sorted(
+        (pos, kw) for kw in keywords for pos in keyword_positions.get(kw, ())
+    )
+    parent = {kw: kw for kw in keywords}
+
+    def find(u: str) -> str:
+        if parent[u] != u:
+            parent[u] = find(parent[u])
+        return parent[u]
+
+    window = []
+    for pos, kw in positions:
+        while window and pos - window[0][0] > n:
+            window.pop(0)
+
+        for _, w_kw in window:
+            parent[find(kw)] = find(w_kw)
+
+        window.append((pos, kw))
+
+    groups = defaultdict(set)
+    for kw in keywords:
+        groups[find(kw)].add(kw)
+
+    return list(groups.values())
+
+
+def run(num_tokens: int = 5000, top_n: int = 50, n: int = 10, repeat: int = 5):
+    nlp = get_nlp()
+    matcher = KeywordMatcher()
+
+    # A single long "sentence", so that each stage runs over thousands of tokens
+    doc = nlp(make_paragraph(num_tokens))
+    keywords = extract_keywords(doc, top_n)
+
+    keyword_positions = matcher.find_matches(doc, keywords)
+    assert keyword_positions == previous_find_matches(doc, keywords)
+
+    # Lowercased, like the positions found by the matcher
+    keywords = list(keyword_positions)
+    assert build_query(find_proximity_groups(keywords, keyword_positions, n), n) == (
+        build_query(previous_find_proximity_groups(keywords, keyword_positions, n), n)
+    )
+
+    print(f"{len(doc)} tokens, {len(keywords)} keywords")
+
+    for name, fn in [
+        ("previous matcher", lambda: previous_find_matches(doc, keywords)),
+        ("matcher", lambda: matcher.find_matches(doc, keywords)),
+        (
+            "previous grouping",
+            lambda: previous_find_proximity_groups(keywords, keyword_positions, n),
+        ),
+        ("grouping", lambda: find_proximity_groups(keywords, keyword_positions, n)),
+    ]:
+        best = min(timeit.repeat(fn, number=10, repeat=repeat)) / 10
+        print(f"{name:>18}: {best * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
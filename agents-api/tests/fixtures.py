@@ -23,6 +23,7 @@ from agents_api.models.agent.delete_agent import delete_agent
 from agents_api.models.developer.get_developer import get_developer
 from agents_api.models.docs.create_doc import create_doc
 from agents_api.models.docs.delete_doc import delete_doc
+from agents_api.models.entry.delete_entries import delete_entries_for_session
 from agents_api.models.execution.create_execution import create_execution
 from agents_api.models.execution.create_execution_transition import (
     create_execution_transition,
@@ -49,6 +50,7 @@ def cozo_client(migrations_dir: str = "./migrations"):
     client = CozoClient()
 
     setattr(app.state, "cozo_client", client)
+    setattr(app.state, "async_cozo_client", client)
 
     init(client)
     apply(client, migrations_dir=migrations_dir, all_=True)
@@ -164,6 +166,33 @@ def test_session(
     )
 
 
+@fixture(scope="test")
+def test_new_session(
+    cozo_client=cozo_client,
+    developer_id=test_developer_id,
+    test_agent=test_agent,
+):
+    # For tests that add entries, which the other tests shouldn't see
+    session = create_session(
+        developer_id=developer_id,
+        data=CreateSessionRequest(agent=test_agent.id),
+        client=cozo_client,
+    )
+
+    yield session
+
+    delete_entries_for_session(
+        developer_id=developer_id,
+        session_id=session.id,
+        client=cozo_client,
+    )
+    delete_session(
+        developer_id=developer_id,
+        session_id=session.id,
+        client=cozo_client,
+    )
+
+
 @fixture(scope="global")
 def test_doc(
     client=cozo_client,
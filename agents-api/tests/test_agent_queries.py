@@ -1,6 +1,8 @@
 # Tests for agent queries
+import asyncio
 from uuid import uuid4
 
+from fastapi import HTTPException
 from ward import raises, test
 
 from agents_api.autogen.openapi_model import (
@@ -11,6 +13,7 @@ from agents_api.autogen.openapi_model import (
     ResourceUpdatedResponse,
     UpdateAgentRequest,
 )
+from agents_api.common.utils.pagination import encode_cursor, next_cursor
 from agents_api.models.agent.create_agent import create_agent
 from agents_api.models.agent.create_or_update_agent import create_or_update_agent
 from agents_api.models.agent.delete_agent import delete_agent
@@ -79,6 +82,21 @@ def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
     assert isinstance(result, Agent)
 
 
+@test("model: concurrent get agent lookups are coalesced")
+async def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
+    first, second, missing = await asyncio.gather(
+        get_agent.load(agent_id=agent.id, developer_id=developer_id),
+        get_agent.load(agent_id=agent.id, developer_id=developer_id),
+        get_agent.load(agent_id=uuid4(), developer_id=developer_id),
+        return_exceptions=True,
+    )
+
+    assert isinstance(first, Agent)
+    assert first == second
+    assert first.id == agent.id
+    assert isinstance(missing, Exception)
+
+
 @test("model: delete agent")
 def _(client=cozo_client, developer_id=test_developer_id):
     temp_agent = create_agent(
@@ -161,3 +179,42 @@ def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
 
     assert isinstance(result, list)
     assert all(isinstance(agent, Agent) for agent in result)
+
+
+@test("model: list agents with a cursor")
+def _(client=cozo_client, developer_id=test_developer_id):
+    for i in range(3):
+        create_agent(
+            developer_id=developer_id,
+            data=CreateAgentRequest(
+                name=f"paged agent {i}",
+                about="test agent about",
+                model="gpt-4o-mini",
+            ),
+            client=client,
+        )
+
+    everything = list_agents(developer_id=developer_id, limit=1000, client=client)
+
+    seen, cursor = [], None
+    while True:
+        page = list_agents(
+            developer_id=developer_id, limit=2, cursor=cursor, client=client
+        )
+        seen.extend(agent.id for agent in page)
+
+        cursor = next_cursor(page, 2, "created_at", "desc")
+        if cursor is None:
+            break
+
+    assert seen == [agent.id for agent in everything]
+
+
+@test("model: list agents rejects a cursor for another sort order")
+def _(client=cozo_client, developer_id=test_developer_id):
+    cursor = encode_cursor("updated_at", "desc", 0, uuid4())
+
+    with raises(HTTPException) as exc:
+        list_agents(developer_id=developer_id, cursor=cursor, client=client)
+
+    assert exc.raised.status_code == 400
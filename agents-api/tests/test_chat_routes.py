@@ -1,13 +1,24 @@
 # Tests for session queries
 
+import json
+import time
+
 from ward import test
 
-from agents_api.autogen.openapi_model import ChatInput, CreateSessionRequest
+from agents_api.autogen.openapi_model import (
+    ChatInput,
+    CreateEntryRequest,
+    CreateSessionRequest,
+)
 from agents_api.clients import litellm
 from agents_api.common.protocol.sessions import ChatContext
 from agents_api.models.chat.gather_messages import gather_messages
 from agents_api.models.chat.prepare_chat_context import prepare_chat_context
+from agents_api.models.entry.create_entries import create_entries
+from agents_api.models.entry.delete_entries import delete_entries_for_session
+from agents_api.models.entry.list_entries import list_entries
 from agents_api.models.session.create_session import create_session
+from agents_api.models.session.delete_session import delete_session
 from tests.fixtures import (
     cozo_client,
     make_request,
@@ -15,10 +26,12 @@ from tests.fixtures import (
     test_agent,
     test_developer,
     test_developer_id,
+    test_new_session,
     test_session,
     test_tool,
     test_user,
 )
+from tests.utils import patch_embed_acompletion_stream
 
 
 @test("chat: check that patching libs works")
@@ -139,6 +152,117 @@ async def _(
     acompletion.assert_called()
 
 
+@test("chat: sessions that truncate their context leave out the oldest entries")
+async def _(
+    make_request=make_request,
+    developer_id=test_developer_id,
+    agent=test_agent,
+    mocks=patch_embed_acompletion,
+    client=cozo_client,
+):
+    session = create_session(
+        developer_id=developer_id,
+        data=CreateSessionRequest(
+            agent=agent.id,
+            situation="test session about",
+            context_overflow="truncate",
+            token_budget=1000,
+        ),
+        client=client,
+    )
+
+    # The session and its entries are deleted so that the other tests don't see them
+    try:
+        # Saved separately, so that they are created in order
+        [old_entry], _ = [
+            create_entries(
+                developer_id=developer_id,
+                session_id=session.id,
+                data=[
+                    CreateEntryRequest.from_model_input(
+                        model=agent.model,
+                        role="user",
+                        content=content,
+                        source="api_request",
+                    )
+                ],
+                client=client,
+            )
+            for content in ["old " * 2000, "recent"]
+        ]
+
+        (_, acompletion) = mocks
+
+        response = make_request(
+            method="POST",
+            url=f"/sessions/{session.id}/chat",
+            json={"messages": [{"role": "user", "content": "hello"}]},
+        )
+
+        response.raise_for_status()
+
+        truncation = response.json()["truncation"]
+        assert truncation["token_budget"] == 1000
+        assert truncation["prompt_tokens"] <= 1000
+        assert truncation["truncated_entries"] == [str(old_entry.id)]
+
+        messages = json.dumps(acompletion.call_args.kwargs["messages"])
+        assert "old old" not in messages
+        assert "recent" in messages
+
+    finally:
+        delete_entries_for_session(
+            developer_id=developer_id, session_id=session.id, client=client
+        )
+        delete_session(developer_id=developer_id, session_id=session.id, client=client)
+
+
+@test("chat: streamed responses are sent as server-sent events")
+def _(
+    make_request=make_request,
+    client=cozo_client,
+    developer_id=test_developer_id,
+    session=test_new_session,
+):
+    with patch_embed_acompletion_stream() as (_, acompletion):
+        response = make_request(
+            method="POST",
+            url=f"/sessions/{session.id}/chat",
+            json={"messages": [{"role": "user", "content": "hello"}], "stream": True},
+        )
+
+    response.raise_for_status()
+    assert acompletion.call_args.kwargs["stream"] is True
+
+    events = [
+        json.loads(line.removeprefix("data:"))
+        for line in response.text.splitlines()
+        if line.startswith("data:")
+    ]
+
+    content = "".join(
+        choice["delta"]["content"] for event in events for choice in event["choices"]
+    )
+
+    assert content == "Hello, world!"
+    assert [event["choices"][0]["finish_reason"] for event in events[:-1]] == [
+        None,
+        "stop",
+    ]
+    assert events[-1]["choices"] == []
+    assert events[-1]["usage"] is not None
+
+    # The entries are saved in the background once the stream is complete
+    time.sleep(0.5)
+
+    entries = list_entries(
+        developer_id=developer_id, session_id=session.id, client=client
+    )
+
+    assert [entry.role for entry in entries] == ["user", "assistant"]
+    assert "Hello, world!" in entries[-1].model_dump_json()
+
+
 @test("model: prepare chat context")
 def _(
     client=cozo_client,
@@ -0,0 +1,54 @@
+# Tests for splitting doc content into snippets
+from ward import raises, test
+
+from agents_api.common.utils.chunking import (
+    chunk_content,
+    chunk_content_async,
+    chunk_text,
+)
+
+text = " ".join(f"This is sentence number {i}." for i in range(30))
+
+
+@test("chunking: snippets end at sentence boundaries and overlap")
+def _():
+    chunks = list(chunk_text(text, max_tokens=20, overlap_tokens=7))
+
+    assert len(chunks) > 1
+    assert all(chunk.token_count <= 20 for chunk in chunks)
+    assert all(chunk.content.endswith(".") for chunk in chunks)
+    assert all(text[c.start_char : c.end_char] == c.content for c in chunks)
+
+    # Each snippet starts with the last sentence of the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        last_sentence = previous.content.rsplit(". ", 1)[-1]
+        assert chunk.content.startswith(last_sentence)
+
+
+@test("chunking: sentences longer than the limit are split")
+def _():
+    chunks = list(chunk_text("word " * 50, max_tokens=16))
+
+    assert [chunk.token_count for chunk in chunks] == [16, 16, 16, 2]
+
+
+@test("chunking: short and empty content items are kept as they are")
+def _():
+    chunks = list(chunk_content(["A short snippet.", ""], max_tokens=20))
+
+    assert [(c.source_index, c.content) for c in chunks] == [
+        (0, "A short snippet."),
+        (1, ""),
+    ]
+
+    with raises(ValueError):
+        list(chunk_text(text, max_tokens=10, overlap_tokens=10))
+
+
+@test("chunking: content is chunked the same way off the event loop")
+async def _():
+    content = [text, "A short snippet."]
+
+    chunks = await chunk_content_async(content, max_tokens=20, overlap_tokens=7)
+
+    assert chunks == list(chunk_content(content, max_tokens=20, overlap_tokens=7))
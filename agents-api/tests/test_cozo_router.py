@@ -0,0 +1,129 @@
+# Tests for routing Cozo queries between the primary and read replicas
+import json
+from contextvars import copy_context
+from uuid import uuid4
+
+import httpx
+from cozo_migrate.api import apply, init
+from pycozo import Client as CozoClient
+from pycozo.client import QueryException
+from ward import fixture, raises, test
+
+from agents_api.clients.cozo import AsyncClient, CozoEndpoint, CozoRouter
+from agents_api.models.agent.list_agents import list_agents
+from agents_api.web import app
+from tests.fixtures import cozo_client, test_agent, test_developer_id
+
+
+@fixture(scope="test")
+def replica(developer_id=test_developer_id, migrations_dir: str = "./migrations"):
+    # A separate in-memory database standing in for a (lagging) read replica
+    client = CozoClient()
+
+    init(client)
+    apply(client, migrations_dir=migrations_dir, all_=True)
+
+    client.run(
+        f"""
+    ?[developer_id, email, settings] <- [["{str(developer_id)}", "developers@julep.ai", {{}}]]
+    :put developers {{ developer_id, email, settings }}
+    """
+    )
+
+    return CozoEndpoint("replica", client)
+
+
+@test("router: reads go to the least loaded healthy replica, writes to the primary")
+def _():
+    first, second = (
+        CozoEndpoint("first", CozoClient()),
+        CozoEndpoint("second", CozoClient()),
+    )
+    router = CozoRouter([first, second])
+
+    def check():
+        first.in_flight = 1
+        assert router.select(readonly=True) is second
+
+        second.mark_unhealthy(60)
+        assert router.select(readonly=True) is first
+
+        first.mark_unhealthy(60)
+        assert router.select(readonly=True) is None
+
+        assert router.select(readonly=False) is None
+
+    copy_context().run(check)
+
+
+@test("router: reads stick to the primary after a write")
+def _():
+    router = CozoRouter([CozoEndpoint("replica", CozoClient())])
+    developer_id, other_developer_id = uuid4(), uuid4()
+
+    def write_then_read():
+        router.record_write(developer_id)
+        assert router.select(readonly=True, developer_id=developer_id) is None
+
+    copy_context().run(write_then_read)
+
+    # A later request by the same developer still reads its writes ...
+    assert router.select(readonly=True, developer_id=developer_id) is None
+
+    # ... while other developers are served by the replica
+    assert router.select(readonly=True, developer_id=other_developer_id) is not None
+
+
+@test("router: read-only model functions are served by the replica")
+def _(
+    client=cozo_client,
+    developer_id=test_developer_id,
+    agent=test_agent,
+    replica=replica,
+):
+    app.state.cozo_router = CozoRouter([replica], read_your_writes_window=0)
+
+    try:
+        # The agent only exists on the primary
+        from_replica = copy_context().run(list_agents, developer_id=developer_id)
+        from_primary = list_agents(developer_id=developer_id, client=client)
+
+    finally:
+        app.state.cozo_router = None
+
+    assert not any(a.id == agent.id for a in from_replica)
+    assert any(a.id == agent.id for a in from_primary)
+
+
+@test("router: the async client sends immutable queries and raises on errors")
+async def _():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+
+        if requests[-1]["script"] == "bad":
+            return httpx.Response(400, json={"ok": False, "message": "parser error"})
+
+        if requests[-1]["script"] == "down":
+            return httpx.Response(502, text="Bad Gateway")
+
+        return httpx.Response(200, json={"ok": True, "headers": ["a"], "rows": [[1]]})
+
+    client = AsyncClient("http://cozo")
+    client.http = httpx.AsyncClient(
+        base_url="http://cozo", transport=httpx.MockTransport(handler)
+    )
+
+    result = await client.run("?[a] <- [[1]]", {}, immutable=True)
+
+    assert result["rows"] == [[1]]
+    assert requests[-1]["immutable"] is True
+
+    with raises(QueryException):
+        await client.run("bad")
+
+    with raises(httpx.HTTPStatusError):
+        await client.run("down")
+
+    await client.close()
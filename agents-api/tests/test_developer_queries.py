@@ -19,6 +19,14 @@ def _(client=cozo_client, developer_id=test_developer_id):
     assert developer.id
 
 
+@test("model: get developer through the coalescing loader")
+async def _(client=cozo_client, developer_id=test_developer_id):
+    developer = await get_developer.load(developer_id=developer_id)
+
+    assert isinstance(developer, Developer)
+    assert developer.id == developer_id
+
+
 @test("model: verify developer exists")
 def _(client=cozo_client, developer_id=test_developer_id):
     verify_developer(
@@ -1,15 +1,30 @@
 # Tests for entry queries
 
+from uuid import uuid4
+
+import numpy as np
 from ward import test
 
 from agents_api.autogen.openapi_model import CreateDocRequest
+from agents_api.common.utils.pagination import next_cursor
 from agents_api.models.docs.create_doc import create_doc
+from agents_api.models.docs.create_docs import create_docs
 from agents_api.models.docs.delete_doc import delete_doc
 from agents_api.models.docs.embed_snippets import embed_snippets
 from agents_api.models.docs.get_doc import get_doc
+from agents_api.models.docs.get_owner_doc_stats import get_owner_doc_stats
+from agents_api.models.docs.get_snippet_embeddings import get_snippet_embeddings
 from agents_api.models.docs.list_docs import list_docs
+from agents_api.models.docs.mmr import (
+    maximal_marginal_relevance,
+    maximal_marginal_relevance_batch,
+)
 from agents_api.models.docs.search_docs_by_embedding import search_docs_by_embedding
+from agents_api.models.docs.search_docs_by_quantized_embedding import (
+    search_docs_by_quantized_embedding,
+)
 from agents_api.models.docs.search_docs_by_text import search_docs_by_text
+from agents_api.models.docs.search_docs_hybrid import search_docs_hybrid
 from tests.fixtures import (
     EMBEDDING_SIZE,
     cozo_client,
@@ -41,6 +56,28 @@ def _(
     )
 
 
+@test("model: create docs in bulk")
+async def _(client=cozo_client, developer_id=test_developer_id, user=test_user):
+    doc_ids = [uuid4(), uuid4()]
+
+    created = await create_docs(
+        developer_id=developer_id,
+        owner_type="user",
+        owner_id=user.id,
+        doc_ids=doc_ids,
+        data=[
+            CreateDocRequest(title="Hello", content="World"),
+            CreateDocRequest(title="Goodbye", content=["Cruel", "World"]),
+        ],
+        client=client,
+    )
+
+    assert sorted(doc.id for doc in created) == sorted(doc_ids)
+
+    doc = get_doc(developer_id=developer_id, doc_id=doc_ids[1], client=client)
+    assert doc.content == ["Cruel", "World"]
+
+
 @test("model: get docs")
 def _(client=cozo_client, doc=test_doc, developer_id=test_developer_id):
     get_doc(
@@ -69,6 +106,46 @@ def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
     )
 
 
+@test("model: doc stats follow doc creation and deletion")
+async def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
+    async def stats():
+        [row] = await get_owner_doc_stats(
+            developer_id=developer_id, owners=[("agent", agent.id)], client=client
+        )
+
+        return row["doc_count"], row["snippet_count"]
+
+    create_doc(
+        developer_id=developer_id,
+        owner_type="agent",
+        owner_id=agent.id,
+        data=CreateDocRequest(title="Hello", content=["World"]),
+        client=client,
+    )
+
+    doc_count, snippet_count = await stats()
+
+    doc = create_doc(
+        developer_id=developer_id,
+        owner_type="agent",
+        owner_id=agent.id,
+        data=CreateDocRequest(title="Hello", content=["Cruel", "World"]),
+        client=client,
+    )
+
+    assert await stats() == (doc_count + 1, snippet_count + 2)
+
+    delete_doc(
+        developer_id=developer_id,
+        doc_id=doc.id,
+        owner_type="agent",
+        owner_id=agent.id,
+        client=client,
+    )
+
+    assert await stats() == (doc_count, snippet_count)
+
+
 @test("model: list docs")
 def _(
     client=cozo_client, developer_id=test_developer_id, doc=test_doc, agent=test_agent
@@ -84,8 +161,43 @@ def _(
     assert len(result) >= 1
 
 
+@test("model: list docs with a cursor")
+async def _(client=cozo_client, developer_id=test_developer_id, user=test_user):
+    await create_docs(
+        developer_id=developer_id,
+        owner_type="user",
+        owner_id=user.id,
+        data=[
+            CreateDocRequest(title=f"Paged doc {i}", content=["Paged"])
+            for i in range(5)
+        ],
+        client=client,
+    )
+
+    list_options = dict(
+        developer_id=developer_id,
+        owner_type="user",
+        owner_id=user.id,
+        include_without_embeddings=True,
+        client=client,
+    )
+
+    everything = list_docs(limit=1000, **list_options)
+
+    seen, cursor = [], None
+    while True:
+        page = list_docs(limit=2, cursor=cursor, **list_options)
+        seen.extend(doc.id for doc in page)
+
+        cursor = next_cursor(page, 2, "created_at", "desc")
+        if cursor is None:
+            break
+
+    assert seen == [doc.id for doc in everything]
+
+
 @test("model: search docs by text")
-def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
+async def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     create_doc(
         developer_id=developer_id,
         owner_type="agent",
@@ -96,7 +208,7 @@ def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
         client=client,
     )
 
-    result = search_docs_by_text(
+    result = await search_docs_by_text(
         developer_id=developer_id,
         owners=[("agent", agent.id)],
         query="funny",
@@ -106,8 +218,37 @@ def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     assert len(result) >= 1
 
 
+@test("model: cached search results are invalidated by new docs")
+async def _(client=cozo_client, user=test_user, developer_id=test_developer_id):
+    def create():
+        return create_doc(
+            developer_id=developer_id,
+            owner_type="user",
+            owner_id=user.id,
+            data=CreateDocRequest(title="Zanzibar", content=["Zanzibar is an island"]),
+            client=client,
+        )
+
+    async def search():
+        return await search_docs_by_text(
+            developer_id=developer_id,
+            owners=[("user", user.id)],
+            query="zanzibar",
+            k=100,
+            client=client,
+        )
+
+    create()
+    first = await search()
+
+    assert [doc.id for doc in await search()] == [doc.id for doc in first]
+
+    doc = create()
+    assert doc.id in [result.id for result in await search()]
+
+
 @test("model: search docs by embedding")
-def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
+async def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     doc = create_doc(
         developer_id=developer_id,
         owner_type="agent",
@@ -117,7 +258,7 @@ def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     )
 
     ### Add embedding to the snippet
-    embed_snippets(
+    await embed_snippets(
         developer_id=developer_id,
         doc_id=doc.id,
         snippet_indices=[0],
@@ -128,7 +269,7 @@ def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     ### Search
     query_embedding = [0.99] * EMBEDDING_SIZE
 
-    result = search_docs_by_embedding(
+    result = await search_docs_by_embedding(
         developer_id=developer_id,
         owners=[("agent", agent.id)],
         query_embedding=query_embedding,
@@ -138,12 +279,86 @@ def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
     assert len(result) >= 1
 
 
+@test("model: search docs by quantized embedding")
+async def _(client=cozo_client, user=test_user, developer_id=test_developer_id):
+    half = EMBEDDING_SIZE // 2
+    # Their components must not sum to zero, see `embed_snippets`
+    embeddings = {
+        "Left": [1.0] * half + [-1.2] * half,
+        "Right": [-1.2] * half + [1.0] * half,
+    }
+
+    for title, embedding in embeddings.items():
+        doc = create_doc(
+            developer_id=developer_id,
+            owner_type="user",
+            owner_id=user.id,
+            data=CreateDocRequest(title=title, content=[f"{title} snippet"]),
+            client=client,
+        )
+
+        await embed_snippets(
+            developer_id=developer_id,
+            doc_id=doc.id,
+            snippet_indices=[0],
+            embeddings=[embedding],
+            client=client,
+        )
+
+    query_embedding = [0.9] * half + [-1.1] * half
+
+    for quantization in ["int8", "binary"]:
+        result = await search_docs_by_quantized_embedding(
+            developer_id=developer_id,
+            owners=[("user", user.id)],
+            query_embedding=query_embedding,
+            k=1,
+            quantization=quantization,
+            rerank_factor=1,
+            client=client,
+        )
+
+        assert [doc.title for doc in result] == ["Left"]
+        assert result[0].distance < 0.05
+
+
+@test("model: search docs hybrid")
+async def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
+    doc = create_doc(
+        developer_id=developer_id,
+        owner_type="agent",
+        owner_id=agent.id,
+        data=CreateDocRequest(title="Hello", content=["The world is a funny place"]),
+        client=client,
+    )
+
+    await embed_snippets(
+        developer_id=developer_id,
+        doc_id=doc.id,
+        snippet_indices=[0],
+        embeddings=[[1.0] * EMBEDDING_SIZE],
+        client=client,
+    )
+
+    # Both legs run concurrently on the same (embedded) client
+    result = await search_docs_hybrid(
+        developer_id=developer_id,
+        owners=[("agent", agent.id)],
+        query="funny",
+        query_embedding=[0.99] * EMBEDDING_SIZE,
+        text_search_options={"client": client},
+        embed_search_options={"client": client},
+    )
+
+    assert len(result) >= 1
+
+
 @test("model: embed snippets")
-def _(client=cozo_client, developer_id=test_developer_id, doc=test_doc):
+async def _(client=cozo_client, developer_id=test_developer_id, doc=test_doc):
     snippet_indices = [0]
     embeddings = [[1.0] * EMBEDDING_SIZE]
 
-    result = embed_snippets(
+    result = await embed_snippets(
         developer_id=developer_id,
         doc_id=doc.id,
         snippet_indices=snippet_indices,
@@ -153,3 +368,82 @@ def _(client=cozo_client, developer_id=test_developer_id, doc=test_doc):
 
     assert result is not None
     assert result.id == doc.id
+
+
+@test("model: embeddings of fingerprinted snippets can be reused")
+async def _(client=cozo_client, agent=test_agent, developer_id=test_developer_id):
+    doc = create_doc(
+        developer_id=developer_id,
+        owner_type="agent",
+        owner_id=agent.id,
+        data=CreateDocRequest(title="Hello", content=["Reused", "Not reused"]),
+        client=client,
+    )
+
+    await embed_snippets(
+        developer_id=developer_id,
+        doc_id=doc.id,
+        snippet_indices=[0],
+        embeddings=[[0.5] * EMBEDDING_SIZE],
+        fingerprints=["fingerprint-reused"],
+        client=client,
+    )
+
+    result = await get_snippet_embeddings(
+        developer_id=developer_id,
+        fingerprints=["fingerprint-reused", "fingerprint-unknown"],
+        client=client,
+    )
+
+    assert [row["fingerprint"] for row in result] == ["fingerprint-reused"]
+    assert result[0]["embedding"] == [0.5] * EMBEDDING_SIZE
+
+    delete_doc(
+        developer_id=developer_id,
+        doc_id=doc.id,
+        owner_type="agent",
+        owner_id=agent.id,
+        client=client,
+    )
+
+    # The fingerprints of the deleted snippets are deleted with them
+    result = client.run(
+        """
+        ?[fingerprint] :=
+            *snippet_fingerprints { fingerprint },
+            fingerprint = "fingerprint-reused"
+        """
+    )
+
+    assert len(result) == 0
+
+
+@test("model: mmr picks relevant but diverse embeddings")
+def _():
+    query = np.array([1.0, 0.0])
+    embeddings = [[1.0, 0.0], [0.99, 0.01], [0.7, 0.7]]
+
+    # The near-duplicate of the first pick loses to the more diverse one
+    assert maximal_marginal_relevance(query, embeddings, lambda_mult=0.3, k=2) == [
+        0,
+        2,
+    ]
+    assert maximal_marginal_relevance(query, embeddings, lambda_mult=1.0, k=2) == [
+        0,
+        1,
+    ]
+
+
+@test("model: batched mmr matches mmr of each query")
+def _():
+    rng = np.random.default_rng(42)
+    queries = rng.normal(size=(4, 16))
+    candidates = [list(rng.normal(size=(n, 16))) for n in (12, 0, 3, 30)]
+
+    batched = maximal_marginal_relevance_batch(queries, candidates, 0.3, k=5)
+
+    assert batched == [
+        maximal_marginal_relevance(query, embeddings, 0.3, k=5)
+        for query, embeddings in zip(queries, candidates)
+    ]
+    assert [len(idxs) for idxs in batched] == [5, 0, 3, 5]
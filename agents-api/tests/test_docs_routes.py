@@ -1,3 +1,4 @@
+import json
 import time
 
 from ward import skip, test
@@ -53,6 +54,59 @@ async def _(make_request=make_request, agent=test_agent):
         assert len(result["jobs"]) > 0
 
 
+@test("route: bulk create agent docs")
+async def _(make_request=make_request, agent=test_agent):
+    async with patch_testing_temporal():
+        body = "\n".join(
+            json.dumps(dict(title=f"Bulk Doc {i}", content=[f"Bulk document {i}."]))
+            for i in range(3)
+        )
+
+        response = make_request(
+            method="POST",
+            url=f"/agents/{agent.id}/docs/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 201
+
+        result = response.json()
+        assert result["jobs"] == [result["id"]]
+
+        response = make_request(
+            method="GET",
+            url=f"/agents/{agent.id}/docs",
+        )
+
+        titles = {doc["title"] for doc in response.json()["items"]}
+        assert {"Bulk Doc 0", "Bulk Doc 1", "Bulk Doc 2"} <= titles
+
+
+@test("route: bulk create docs rejects invalid lines")
+async def _(make_request=make_request, user=test_user):
+    async with patch_testing_temporal():
+        body = "\n".join(
+            [json.dumps(dict(title="Valid Doc", content="Valid.")), "{not json"]
+        )
+
+        response = make_request(
+            method="POST",
+            url=f"/users/{user.id}/docs/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 400
+
+        error = response.json()["error"]
+        assert "line 2" in error["message"]
+
+        # The job embedding the docs written before the error is returned
+        assert error["job_id"]
+        assert error["docs_created"] == 0
+
+
 @test("route: delete doc")
 async def _(make_request=make_request, agent=test_agent):
     async with patch_testing_temporal():
@@ -0,0 +1,54 @@
+# Tests for the micro-batching scheduler of embedding requests
+import asyncio
+
+from ward import raises, test
+
+from agents_api.common.utils.embedding_batcher import EmbeddingBatcher
+
+
+def make_batcher(calls: list, **kwargs) -> EmbeddingBatcher:
+    async def embed(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    return EmbeddingBatcher(embed, **{"max_batch_size": 4, "max_wait": 0.01, **kwargs})
+
+
+@test("embedding batcher: concurrent callers share full batches")
+async def _():
+    calls = []
+    batcher = make_batcher(calls)
+
+    results = await asyncio.gather(
+        batcher.embed(["a", "bb", "ccc"]),
+        batcher.embed(["dddd", "eeeee"]),
+        batcher.embed(["ffffff"]),
+    )
+
+    assert results == [[[1.0], [2.0], [3.0]], [[4.0], [5.0]], [[6.0]]]
+    assert calls == [["a", "bb", "ccc", "dddd"], ["eeeee", "ffffff"]]
+
+
+@test("embedding batcher: partial batches are flushed after the max wait")
+async def _():
+    calls = []
+    batcher = make_batcher(calls, max_wait=0.01)
+
+    assert await asyncio.wait_for(batcher.embed(["a"]), timeout=1) == [[1.0]]
+    assert calls == [["a"]]
+
+
+@test("embedding batcher: errors are raised to every caller in the batch")
+async def _():
+    async def embed(texts: list[str]) -> list[list[float]]:
+        raise ValueError("embedding service is down")
+
+    batcher = EmbeddingBatcher(embed, max_batch_size=4, max_wait=0.01)
+
+    results = await asyncio.gather(
+        batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+    with raises(ValueError):
+        await batcher.embed(["c"])
@@ -0,0 +1,101 @@
+# Tests for the embedding cache in front of the embedding service
+import asyncio
+
+from ward import raises, test
+
+from agents_api.common.utils.embedding_cache import (
+    EmbeddingCache,
+    embedding_cache_key,
+)
+
+
+def make_embed(calls: list, delay: float = 0):
+    async def embed(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        await asyncio.sleep(delay)
+
+        return [[float(len(text)), 1.0] for text in texts]
+
+    return embed
+
+
+@test("embedding cache: keys ignore surrounding whitespace, but not the model")
+def _():
+    assert embedding_cache_key("m", 2, " hello\n") == embedding_cache_key(
+        "m", 2, "hello"
+    )
+    assert embedding_cache_key("m", 2, "hello") != embedding_cache_key("n", 2, "hello")
+    assert embedding_cache_key("m", 2, "hello") != embedding_cache_key("m", 3, "hello")
+
+
+@test("embedding cache: repeated texts are only embedded once")
+async def _():
+    cache, calls = EmbeddingCache(maxsize=10), []
+    keys = [embedding_cache_key("m", 2, text) for text in ("a", "bb", "a")]
+
+    first = await cache.embed(keys, ["a", "bb", "a"], make_embed(calls))
+    second = await cache.embed(keys[:2], ["a", "bb"], make_embed(calls))
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == first[:2]
+    assert calls == [["a", "bb"]]
+
+
+@test("embedding cache: concurrent requests for the same text share one call")
+async def _():
+    cache, calls = EmbeddingCache(maxsize=0), []
+    key = embedding_cache_key("m", 2, "hello")
+
+    results = await asyncio.gather(
+        *[
+            cache.embed([key], ["hello"], make_embed(calls, delay=0.01))
+            for _ in range(5)
+        ]
+    )
+
+    assert results == [[[5.0, 1.0]]] * 5
+    assert calls == [["hello"]]
+
+
+@test("embedding cache: shared tier is used on misses, and its errors are ignored")
+async def _():
+    shared = {}
+
+    async def get_shared(key: str) -> bytes | None:
+        if key == "broken":
+            raise ConnectionError("blob store is down")
+
+        return shared.get(key)
+
+    async def put_shared(key: str, body: bytes) -> None:
+        shared[key] = body
+
+    calls = []
+    first = EmbeddingCache(maxsize=10, get_shared=get_shared, put_shared=put_shared)
+    await first.embed(["k", "broken"], ["abc", "d"], make_embed(calls))
+    await asyncio.sleep(0)
+
+    # Another instance finds the embedding in the shared tier
+    second = EmbeddingCache(maxsize=10, get_shared=get_shared)
+    assert await second.embed(["k"], ["abc"], make_embed(calls)) == [[3.0, 1.0]]
+    assert calls == [["abc", "d"]]
+
+
+@test("embedding cache: errors are raised to every request waiting on the call")
+async def _():
+    cache = EmbeddingCache(maxsize=10)
+
+    async def failing_embed(texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(0.01)
+        raise ValueError("embedding service is down")
+
+    results = await asyncio.gather(
+        cache.embed(["k"], ["text"], failing_embed),
+        cache.embed(["k"], ["text"], failing_embed),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+    with raises(ValueError):
+        await cache.embed(["k"], ["text"], failing_embed)
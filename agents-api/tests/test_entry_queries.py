@@ -9,13 +9,15 @@ import time
 
 from ward import test
 
-from agents_api.autogen.openapi_model import CreateEntryRequest
+from agents_api.autogen.openapi_model import CreateEntryRequest, CreateSessionRequest
 from agents_api.models.entry.create_entries import create_entries
 from agents_api.models.entry.delete_entries import delete_entries
 from agents_api.models.entry.get_history import get_history
+from agents_api.models.entry.get_recent_entries import get_recent_entries
 from agents_api.models.entry.list_entries import list_entries
+from agents_api.models.session.create_session import create_session
 from agents_api.models.session.get_session import get_session
-from tests.fixtures import cozo_client, test_developer_id, test_session
+from tests.fixtures import cozo_client, test_agent, test_developer_id, test_session
 
 MODEL = "gpt-4o-mini"
 
@@ -154,6 +156,51 @@ def _(client=cozo_client, developer_id=test_developer_id, session=test_session):
     assert result.entries[0].id
 
 
+@test("model: get recent entries")
+def _(client=cozo_client, developer_id=test_developer_id, agent=test_agent):
+    session = create_session(
+        developer_id=developer_id,
+        data=CreateSessionRequest(agent=agent.id),
+        client=client,
+    )
+
+    # Saved separately, so that they are created in order
+    entries = [
+        create_entries(
+            developer_id=developer_id,
+            session_id=session.id,
+            data=[
+                CreateEntryRequest.from_model_input(
+                    model=MODEL,
+                    role="user",
+                    source="api_request",
+                    content=f"test entry content {i}",
+                )
+            ],
+            client=client,
+        )[0]
+        for i in range(3)
+    ]
+
+    latest = get_recent_entries(
+        developer_id=developer_id,
+        session_id=session.id,
+        limit=2,
+        client=client,
+    )
+
+    assert [entry.id for entry in latest] == [entry.id for entry in entries[1:]]
+
+    since_first = get_recent_entries(
+        developer_id=developer_id,
+        session_id=session.id,
+        since_entry_id=entries[0].id,
+        client=client,
+    )
+
+    assert [entry.id for entry in since_first] == [entry.id for entry in entries[1:]]
+
+
 @test("model: delete entries")
 def _(client=cozo_client, developer_id=test_developer_id, session=test_session):
     """
@@ -0,0 +1,106 @@
+# Tests for the adaptive concurrency limiter in front of Cozo
+import asyncio
+
+from ward import raises, test
+
+from agents_api.common.utils.limiter import AdaptiveLimiter, ConcurrencyLimitExceeded
+
+
+def make_limiter(**kwargs) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        "test",
+        **{
+            "initial_limit": 2,
+            "min_limit": 1,
+            "max_limit": 4,
+            "max_queue": 1,
+            "timeout": 0.05,
+            "latency_target": 0.01,
+            "is_overload": lambda e: "busy" in str(e),
+            **kwargs,
+        },
+    )
+
+
+@test("limiter: busy errors halve the limit, fast calls raise it")
+def _():
+    limiter = make_limiter()
+
+    with raises(ValueError):
+        with limiter.limit():
+            raise ValueError("resource busy")
+
+    assert limiter.limit_value == 1
+
+    for _ in range(10):
+        with limiter.limit():
+            pass
+
+    assert limiter.limit_value > 1
+    assert limiter.in_flight == 0
+
+
+@test("limiter: calls over the limit queue, and are shed when the queue is full")
+async def _():
+    limiter = make_limiter()
+
+    async def call(delay: float) -> str:
+        async with limiter.limit_async():
+            await asyncio.sleep(delay)
+
+        return "ok"
+
+    results = await asyncio.gather(
+        call(0.02), call(0.02), call(0), call(0), return_exceptions=True
+    )
+
+    assert results[:3] == ["ok", "ok", "ok"]
+    assert isinstance(results[3], ConcurrencyLimitExceeded)
+    assert results[3].reason == "queue_full"
+    assert limiter.in_flight == 0
+
+
+@test("limiter: queued calls are shed after their deadline")
+async def _():
+    limiter = make_limiter()
+
+    async def call(delay: float) -> str:
+        async with limiter.limit_async():
+            await asyncio.sleep(delay)
+
+        return "ok"
+
+    results = await asyncio.gather(
+        call(0.2), call(0.2), call(0), return_exceptions=True
+    )
+
+    assert isinstance(results[2], ConcurrencyLimitExceeded)
+    assert results[2].reason == "deadline"
+
+
+@test("limiter: sync calls over the limit on an event loop are shed right away")
+async def _():
+    limiter = make_limiter(timeout=5.0)
+
+    async def hold() -> None:
+        async with limiter.limit_async():
+            await asyncio.sleep(0.05)
+
+    def call() -> str:
+        with limiter.limit():
+            return "ok"
+
+    holders = [asyncio.create_task(hold()) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Waiting would block the loop, so the holders could never release
+    with raises(ConcurrencyLimitExceeded) as exc:
+        call()
+
+    assert exc.raised.reason == "event_loop"
+
+    # Off the loop (e.g. in a worker thread), sync calls still queue for a slot
+    assert await asyncio.to_thread(call) == "ok"
+
+    await asyncio.gather(*holders)
+    assert limiter.in_flight == 0
@@ -0,0 +1,222 @@
+# Tests for the helpers in agents_api.models.utils
+import json
+import logging
+from uuid import UUID, uuid4
+
+import pandas as pd
+from prometheus_client import REGISTRY
+from ward import test
+
+from agents_api.models import utils
+from agents_api.models.agent.list_agents import list_agents
+from agents_api.models.utils import (
+    VerificationCache,
+    cozo_result_to_records,
+    invalidate_verification_cache,
+    metadata_filter_query,
+    metadata_filter_variables,
+    query_templates,
+    verification_cache,
+    verify_developer_id_query,
+    verify_developer_owns_resource_query,
+)
+from tests.fixtures import cozo_client, test_developer_id
+
+
+@test("utils: cozo result rows are decoded into records")
+def _():
+    owner_id = uuid4()
+
+    records = cozo_result_to_records(
+        {
+            "headers": ["id", "metadata", "snippets"],
+            "rows": [
+                ["a", None, []],
+                [
+                    "b",
+                    {"owner_id": list(owner_id.bytes)},
+                    [{"id": list(owner_id.bytes)}],
+                ],
+            ],
+        }
+    )
+
+    assert records[0] == {"id": "a", "metadata": None, "snippets": []}
+    assert records[1]["id"] == "b"
+    assert records[1]["metadata"]["owner_id"] == owner_id
+    assert isinstance(records[1]["snippets"][0]["id"], UUID)
+
+
+@test("utils: missing values of dataframe results decode to None")
+def _():
+    records = cozo_result_to_records(
+        pd.DataFrame({"id": ["a", "b"], "token_budget": [1000, None]})
+    )
+
+    assert records == [
+        {"id": "a", "token_budget": 1000},
+        {"id": "b", "token_budget": None},
+    ]
+
+
+@test("utils: empty cozo result decodes to no records")
+def _():
+    assert cozo_result_to_records({"headers": ["id"], "rows": []}) == []
+
+
+@test("utils: uuids nested in json payloads are fixed at any depth")
+def _():
+    agent_id, tool_id = uuid4(), uuid4()
+
+    [record] = cozo_result_to_records(
+        {
+            "headers": ["toolsets"],
+            "rows": [
+                [
+                    [
+                        {
+                            "agent_id": list(agent_id.bytes),
+                            "tools": [{"id": list(tool_id.bytes), "name": "t"}],
+                        }
+                    ]
+                ]
+            ],
+        }
+    )
+
+    [toolset] = record["toolsets"]
+    assert toolset["agent_id"] == agent_id
+    assert toolset["tools"][0]["id"] == tool_id
+
+
+@test("utils: id-like lists that are not uuids are left alone")
+def _():
+    [record] = cozo_result_to_records(
+        {"headers": ["metadata"], "rows": [[{"item_id": [1, 2, 3]}]]}
+    )
+
+    assert record["metadata"] == {"item_id": [1, 2, 3]}
+
+
+@test("utils: verification cache expires and invalidates entries")
+def _():
+    developer_id, agent_id, task_id = str(uuid4()), str(uuid4()), str(uuid4())
+    cache = VerificationCache(ttl=60, maxsize=10)
+
+    agent_key = ("resource", developer_id, "agents", "agent_id", agent_id, "")
+    task_key = ("resource", developer_id, "tasks", "task_id", task_id, "agents")
+
+    cache.add(agent_key)
+    cache.add(task_key)
+    assert agent_key in cache and task_key in cache
+
+    # Deleting the agent also drops checks of resources nested under agents
+    cache.invalidate(developer_id, agent_id)
+    assert agent_key not in cache and task_key not in cache
+
+    expired = VerificationCache(ttl=-1, maxsize=10)
+    expired.add(agent_key)
+    assert agent_key not in expired
+
+
+@test("utils: cached ownership checks are skipped in the query")
+def _():
+    developer_id, agent_id = uuid4(), uuid4()
+    verification_cache.add(("developer", str(developer_id)))
+
+    assert verify_developer_id_query(developer_id) == "?[exists] := exists = true"
+
+    invalidate_verification_cache(developer_id, developer_id)
+    assert "assert(exists" in verify_developer_id_query(developer_id)
+    assert "assert(exists" in verify_developer_owns_resource_query(
+        developer_id, "agents", agent_id=agent_id
+    )
+
+
+@test("utils: metadata filters are rendered once per set of keys")
+def _():
+    keys, variables = metadata_filter_variables({"b": 1, "a": "x"})
+    other_keys, other_variables = metadata_filter_variables({"a": "y", "b": 2})
+
+    assert keys == other_keys == ("a", "b")
+    assert variables == {"metadata_filter_0": "x", "metadata_filter_1": 1}
+    assert other_variables == {"metadata_filter_0": "y", "metadata_filter_1": 2}
+
+    assert metadata_filter_query(keys) == (
+        'metadata->"a" == $metadata_filter_0, metadata->"b" == $metadata_filter_1'
+    )
+    assert metadata_filter_query(keys) is metadata_filter_query(other_keys)
+
+
+@test("utils: ownership check text does not depend on the ids")
+def _():
+    developer_id = uuid4()
+
+    first = verify_developer_owns_resource_query(
+        developer_id, "agents", agent_id=uuid4()
+    )
+    second = verify_developer_owns_resource_query(
+        developer_id, "agents", agent_id=uuid4()
+    )
+
+    assert first == second
+    assert str(developer_id) not in first
+    assert (
+        "agents_api.models.utils._verify_developer_owns_resource_query"
+        in query_templates
+    )
+
+
+def query_count(name: str) -> float:
+    return sum(
+        sample.value
+        for metric in REGISTRY.collect()
+        if metric.name == "cozo_query_latency_seconds"
+        for sample in metric.samples
+        if sample.name.endswith("_count") and sample.labels["query"] == name
+    )
+
+
+@test("utils: queries are timed per function, and slow ones are logged")
+def _(client=cozo_client, developer_id=test_developer_id):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    utils.slow_query_logger.addHandler(handler)
+
+    before = query_count("list_agents")
+
+    threshold, utils.slow_query_threshold = utils.slow_query_threshold, 1e-9
+    try:
+        list_agents(developer_id=developer_id, client=client)
+    finally:
+        utils.slow_query_threshold = threshold
+        utils.slow_query_logger.removeHandler(handler)
+
+    assert query_count("list_agents") == before + 1
+
+    [record] = records
+    entry = json.loads(record.getMessage())
+    assert entry["query_name"] == "list_agents"
+    assert "developer_id" in entry["parameter_sizes"]
+    assert "*agents" in entry["query"]
+
+
+@test("utils: queries under the slow query threshold are not logged")
+def _(client=cozo_client, developer_id=test_developer_id):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    utils.slow_query_logger.addHandler(handler)
+
+    threshold = utils.slow_query_threshold
+    try:
+        # The threshold is in seconds, and 0 disables the log
+        for value in [60.0, 0.0]:
+            utils.slow_query_threshold = value
+            list_agents(developer_id=developer_id, client=client)
+    finally:
+        utils.slow_query_threshold = threshold
+        utils.slow_query_logger.removeHandler(handler)
+
+    assert records == []
@@ -0,0 +1,102 @@
+# Tests for the full-text search query builder
+import random
+from collections import defaultdict
+
+from ward import test
+
+from agents_api.common.nlp import (
+    KeywordMatcher,
+    build_query,
+    custom_query_cache,
+    find_proximity_groups,
+    get_nlp,
+    paragraph_to_custom_queries,
+    text_to_custom_queries,
+)
+
+paragraph = "The Eiffel Tower is in Paris. It was built by Gustave Eiffel in 1889."
+
+
+@test("nlp: queries built off the event loop match the inline ones")
+async def _():
+    custom_query_cache.clear()
+    expected = paragraph_to_custom_queries(paragraph)
+
+    custom_query_cache.clear()
+    assert await text_to_custom_queries(paragraph) == expected
+    assert expected
+
+    # Whitespace differences hit the cache
+    assert (
+        await text_to_custom_queries(f"  {paragraph.replace(' ', '   ')}\n") == expected
+    )
+
+
+def window_proximity_groups(
+    keywords: list[str], keyword_positions: dict[str, list[int]], n: int
+) -> list[set[str]]:
+    # The previous implementation: union with every position in a sliding window
+    if len(keywords) <= 1:
+        return [{kw} for kw in keywords]
+
+    positions = sorted((pos, kw) for kw in keywords for pos in keyword_positions[kw])
+    parent = {kw: kw for kw in keywords}
+
+    def find(u: str) -> str:
+        while parent[u] != u:
+            u = parent[u]
+        return u
+
+    window = []
+    for pos, kw in positions:
+        while window and pos - window[0][0] > n:
+            window.pop(0)
+
+        for _, w_kw in window:
+            parent[find(kw)] = find(w_kw)
+
+        window.append((pos, kw))
+
+    groups = defaultdict(set)
+    for kw in keywords:
+        groups[find(kw)].add(kw)
+
+    return list(groups.values())
+
+
+@test("nlp: proximity groups match the sliding window ones")
+def _():
+    rng = random.Random(0)
+
+    for _ in range(500):
+        keywords = [f"kw{i}" for i in range(rng.randint(0, 12))]
+        keyword_positions = {
+            kw: rng.sample(range(300), rng.randint(0, 5)) for kw in keywords
+        }
+        n = rng.randint(0, 20)
+
+        expected = window_proximity_groups(keywords, keyword_positions, n)
+        groups = find_proximity_groups(keywords, keyword_positions, n)
+
+        assert groups == expected
+        assert build_query(groups, n) == build_query(expected, n)
+
+    keyword_positions = {"eiffel tower": [1], "paris": [5], "gustave eiffel": [40]}
+    groups = find_proximity_groups(list(keyword_positions), keyword_positions, 10)
+
+    assert build_query(groups, 10) == (
+        'NEAR/10("eiffel tower" "paris") OR "gustave eiffel"'
+    )
+
+
+@test("nlp: keyword matchers can be used for different keyword sets")
+def _():
+    matcher = KeywordMatcher()
+    doc = get_nlp()(paragraph)
+
+    first = matcher.find_matches(doc, ["Eiffel Tower", "Paris"])
+    second = matcher.find_matches(doc, ["Gustave Eiffel"])
+
+    assert dict(first) == {"eiffel tower": [1], "paris": [5]}
+    assert dict(second) == {"gustave eiffel": [11]}
+    assert matcher.find_matches(doc, ["Eiffel Tower", "Paris"]) == first
@@ -0,0 +1,42 @@
+# Tests for quantized embeddings
+import numpy as np
+from ward import test
+
+from agents_api.common.utils.quantization import (
+    binary_similarity,
+    decode_codes,
+    encode_code,
+    int8_similarity,
+    quantize_binary,
+    quantize_int8,
+)
+
+rng = np.random.default_rng(42)
+embeddings = rng.normal(size=(200, 64)).astype(np.float32)
+query = rng.normal(size=64).astype(np.float32)
+
+exact = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)) @ (
+    query / np.linalg.norm(query)
+)
+
+
+@test("quantization: int8 similarities are close to the exact ones")
+def _():
+    codes, scales = quantize_int8(embeddings)
+    codes = decode_codes([encode_code(code) for code in codes], np.int8)
+
+    assert codes.dtype == np.int8
+    assert np.abs(int8_similarity(query, codes, scales) - exact).max() < 0.02
+
+
+@test("quantization: binary codes shortlist the nearest embeddings")
+def _():
+    bits = quantize_binary(embeddings)
+    assert bits.shape == (200, 8)
+
+    # A query close to one of the embeddings
+    near = embeddings[7] + 0.3 * rng.normal(size=64).astype(np.float32)
+    scores = binary_similarity(near, bits, 64)
+
+    assert 7 in np.argsort(-scores)[:10].tolist()
+    assert np.all((-1 <= scores) & (scores <= 1))
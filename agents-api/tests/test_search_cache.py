@@ -0,0 +1,41 @@
+# Tests for the doc search result cache
+from uuid import uuid4
+
+from ward import test
+
+from agents_api.common.utils.search_cache import SearchResultCache, search_cache_key
+
+developer_id = uuid4()
+owner_id = uuid4()
+
+
+@test("search cache: keys change with the owners' generations and the parameters")
+def _():
+    def key(generation=0, **params):
+        params = dict(query="hello", k=3, metadata_filter={}) | params
+        return search_cache_key(
+            "text", developer_id, [("user", owner_id, generation)], params
+        )
+
+    assert key() == key()
+    assert key(metadata_filter={}, k=3) == key(k=3, metadata_filter={})
+    assert key() != key(generation=1)
+    assert key() != key(k=4)
+    assert key() != key(metadata_filter={"a": 1})
+    assert key(query_embedding=[0.1, 0.2]) == key(query_embedding=[0.1, 0.2])
+    assert key(query_embedding=[0.1, 0.2]) != key(query_embedding=[0.2, 0.1])
+
+
+@test("search cache: entries are evicted when full")
+def _():
+    cache = SearchResultCache(ttl=60, maxsize=2)
+
+    for key in "abc":
+        cache.put(key, [key])
+
+    assert cache.get("a") is None
+    assert cache.get("c") == ["c"]
+
+    disabled = SearchResultCache(ttl=0, maxsize=2)
+    disabled.put("a", ["a"])
+    assert disabled.get("a") is None
@@ -0,0 +1,58 @@
+# Tests for the embedding search planner
+from ward import test
+
+from agents_api.common.utils.corpus_stats import CorpusStats, CorpusStatsCache
+from agents_api.common.utils.search_plan import (
+    MAX_ANN_CANDIDATES,
+    plan_embedding_search,
+)
+
+options = dict(k=10, confidence=0.5, ef=50, ann_threshold=1000)
+
+
+@test("search plan: small owners are scanned exactly")
+def _():
+    total = CorpusStats(1000, 1_000_000)
+
+    assert (
+        plan_embedding_search(CorpusStats(0, 0), total, **options).strategy == "empty"
+    )
+
+    plan = plan_embedding_search(CorpusStats(10, 1000), total, **options)
+    assert (plan.strategy, plan.k, plan.ef, plan.radius) == ("knn", 10, 50, 0.5)
+
+
+@test("search plan: ann searches over-fetch for the owners' share of the index")
+def _():
+    whole = plan_embedding_search(
+        CorpusStats(100, 10_000), CorpusStats(100, 10_000), **options
+    )
+    assert (whole.strategy, whole.k) == ("ann", 10)
+    assert whole.ef >= 2 * whole.k
+
+    tenth = plan_embedding_search(
+        CorpusStats(100, 10_000), CorpusStats(1000, 100_000), **options
+    )
+    assert tenth.k == 100
+    assert tenth.ef >= max(whole.ef, 2 * tenth.k)
+
+    tiny = plan_embedding_search(
+        CorpusStats(100, 10_000), CorpusStats(10**6, 10**9), **options
+    )
+    assert tiny.k == tiny.ef == MAX_ANN_CANDIDATES
+
+
+@test("corpus stats cache: entries are dropped when invalidated")
+def _():
+    cache = CorpusStatsCache(ttl=60, maxsize=2)
+    cache.put("agent", "a", CorpusStats(1, 2))
+    assert cache.get("agent", "a") == CorpusStats(1, 2)
+
+    cache.invalidate("agent", "a")
+    assert cache.get("agent", "a") is None
+
+    for owner_id in "abc":
+        cache.put("agent", owner_id, CorpusStats(1, 2))
+
+    assert cache.get("agent", "a") is None
+    assert cache.get("agent", "c") == CorpusStats(1, 2)
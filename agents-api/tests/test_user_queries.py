@@ -12,6 +12,7 @@ from agents_api.autogen.openapi_model import (
     UpdateUserRequest,
     User,
 )
+from agents_api.common.utils.pagination import next_cursor
 from agents_api.models.user.create_or_update_user import create_or_update_user
 from agents_api.models.user.create_user import create_user
 from agents_api.models.user.get_user import get_user
@@ -116,3 +117,34 @@ def _(client=cozo_client, developer_id=test_developer_id, user=test_user):
     assert isinstance(result, list)
     assert len(result) >= 1
     assert all(isinstance(user, User) for user in result)
+
+
+@test("model: list users with a cursor")
+def _(client=cozo_client, developer_id=test_developer_id):
+    for i in range(3):
+        create_user(
+            developer_id=developer_id,
+            data=CreateUserRequest(name=f"paged user {i}", about="test user about"),
+            client=client,
+        )
+
+    everything = list_users(
+        developer_id=developer_id, limit=1000, direction="asc", client=client
+    )
+
+    seen, cursor = [], None
+    while True:
+        page = list_users(
+            developer_id=developer_id,
+            limit=2,
+            direction="asc",
+            cursor=cursor,
+            client=client,
+        )
+        seen.extend(user.id for user in page)
+
+        cursor = next_cursor(page, 2, "created_at", "asc")
+        if cursor is None:
+            break
+
+    assert seen == [user.id for user in everything]
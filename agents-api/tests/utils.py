@@ -94,6 +94,37 @@ def patch_embed_acompletion(output={"role": "assistant", "content": "Hello, worl
         yield embed, acompletion
 
 
+@contextmanager
+def patch_embed_acompletion_stream(deltas: list[str] = ["Hello", ", world!"]):
+    chunks = [
+        ModelResponse(
+            id="fake_id",
+            stream=True,
+            model="gpt-4o-mini",
+            choices=[
+                dict(
+                    index=0,
+                    delta=dict(role="assistant" if i == 0 else None, content=delta),
+                    finish_reason="stop" if i == len(deltas) - 1 else None,
+                )
+            ],
+        )
+        for i, delta in enumerate(deltas)
+    ]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    with patch("agents_api.clients.litellm.aembedding") as embed, patch(
+        "agents_api.clients.litellm.acompletion"
+    ) as acompletion:
+        embed.return_value = [[1.0] * EMBEDDING_SIZE]
+        acompletion.side_effect = lambda **kwargs: stream()
+
+        yield embed, acompletion
+
+
 @contextmanager
 def patch_integration_service(output: dict = {"result": "ok"}):
     with patch(